@@ -0,0 +1,6 @@
+"""
+Benchmarks for the Data Assistant project.
+
+Each module is runnable with ``python -m new_data_assistant_project.benchmarks.<name>``
+and works on a temporary copy of the database, never on the app database itself.
+"""
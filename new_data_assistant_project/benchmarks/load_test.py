@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Load test: N concurrent synthetic participants running full study sessions.
+
+Each participant registers, logs in through ``AuthManager.login``, completes the
+comprehensive assessment, works through the eight GlobalMart tasks in the chat
+(``ChatManager.process_user_message`` plus explanation feedback) and submits the
+final ``ComprehensiveFeedback``. The LLM is the stub from ``pipeline_benchmark``
+with a configurable synthetic latency, so nothing goes over the network.
+
+For every concurrency level (a fresh copy of the app database each) it reports
+throughput, per-operation latency and error rates, and SQLite lock contention:
+"database is locked" errors, plus a probe thread that tries to take the write
+lock without waiting every few milliseconds and records how often it is held.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from new_data_assistant_project.benchmarks.pipeline_benchmark import (
+    APP_DB, StubTransport, _distribution, _git_commit
+)
+from new_data_assistant_project.src.agents.globalmart_prompts import STUDY_TASK_PROMPTS
+from new_data_assistant_project.src.agents.llm_transport import set_llm_transport
+from new_data_assistant_project.src.database.models import ComprehensiveFeedback, ExplanationFeedback, User
+from new_data_assistant_project.src.database.schema import create_tables
+from new_data_assistant_project.src.database.write_behind import flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("register", "login", "assessment", "chat", "explanation_feedback", "comprehensive_feedback")
+DOMAINS = ("data_analysis_fundamentals", "business_analytics", "forecasting_statistics",
+           "data_visualization", "domain_knowledge_retail")
+
+
+class LockProbe:
+    """Samples how often the SQLite write lock is held by someone else."""
+
+    def __init__(self, db_path: str, interval: float = 0.005):
+        self.db_path = db_path
+        self.interval = interval
+        self.samples = 0
+        self.busy = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lock-probe", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        return {"samples": self.samples, "busy": self.busy,
+                "busy_ratio": self.busy / self.samples if self.samples else None}
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=0, isolation_level=None)
+        try:
+            while not self._stop.wait(self.interval):
+                self.samples += 1
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("ROLLBACK")
+                except sqlite3.OperationalError:
+                    self.busy += 1
+        finally:
+            conn.close()
+
+
+class LoadRecorder:
+    """Thread-safe per-operation latencies and errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {operation: [] for operation in OPERATIONS}
+        self.errors: Dict[str, int] = {operation: 0 for operation in OPERATIONS}
+        self.locked_errors = 0
+        self.sessions_completed = 0
+
+    def measure(self, operation: str, fn, *args, **kwargs):
+        """Run fn, record its latency and count a falsy result or an exception as an error."""
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            failed = result is False
+        except Exception as e:
+            result, failed = None, True
+            if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+                with self._lock:
+                    self.locked_errors += 1
+            logger.error(f"{operation} failed: {e}")
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[operation].append(elapsed)
+            if failed:
+                self.errors[operation] += 1
+        if failed:
+            raise RuntimeError(f"{operation} failed")
+        return result
+
+
+def _participant(index: int, db_path: str, recorder: LoadRecorder, think_time: float, seed: int):
+    """One full study session."""
+    from new_data_assistant_project.src.agents.clt_cft_agent import CLTCFTAgent
+    from new_data_assistant_project.src.utils.auth_manager import AuthManager
+    from new_data_assistant_project.src.utils.chat_manager import ChatManager
+
+    rng = random.Random(seed + index)
+    username, password = f"load_participant_{index}_{seed}", "load-test-password"
+
+    def register():
+        user = User.create_user(username, password)
+        user.save(db_path)
+        return user
+
+    # The managers are bound to the app database in __init__; point them at the copy
+    auth_manager = AuthManager.__new__(AuthManager)
+    auth_manager.db_path = db_path
+    chat_manager = ChatManager.__new__(ChatManager)
+    chat_manager.db_path = db_path
+    # Like the task page, every participant session builds its own agent
+    chat_manager.agent = CLTCFTAgent(user_profiles_path=os.path.join(os.path.dirname(db_path), "profiles.json"),
+                                     database_path=db_path)
+
+    try:
+        recorder.measure("register", register)
+        success, _ = recorder.measure("login", auth_manager.login, username, password)
+        if not success:
+            raise RuntimeError("login rejected")
+        user = User.get_by_username(db_path, username)
+
+        scores = {domain: rng.randint(0, 4) for domain in DOMAINS}
+        recorder.measure("assessment", user.complete_comprehensive_assessment, db_path, scores)
+
+        for task in STUDY_TASK_PROMPTS:
+            time.sleep(think_time * rng.uniform(0.5, 1.5))
+            response, explanation_given, _ = recorder.measure(
+                "chat", chat_manager.process_user_message, user, task["prompt"])
+            if response.startswith("❌"):
+                with recorder._lock:
+                    recorder.errors["chat"] += 1
+                continue
+
+            def give_feedback():
+                # The feedback form resolves the (possibly still buffered) session row first
+                chat = chat_manager._get_user_chat_history(user.id)[-1]
+                session_id = chat_manager._resolve_session_id(chat)
+                if session_id is None:
+                    return False
+                ExplanationFeedback.create_feedback(
+                    user.id, session_id, explanation_given,
+                    was_needed=rng.random() < 0.6, was_helpful=rng.random() < 0.7
+                ).save(db_path, wait=False)
+            recorder.measure("explanation_feedback", give_feedback)
+
+        feedback = ComprehensiveFeedback.create_feedback(
+            user.id, rng.randint(1, 5), "load test", rng.randint(1, 5), "load test",
+            rng.randint(1, 5), "load test", rng.randint(1, 5), "load test",
+            rng.random() < 0.5, "load test", "Mostly accurate", 1, "Yes", 0)
+        recorder.measure("comprehensive_feedback", feedback.save, db_path)
+        with recorder._lock:
+            recorder.sessions_completed += 1
+    except RuntimeError:
+        pass  # already recorded; the participant drops out like a real one would
+
+
+def run_level(concurrency: int, participants: int, think_time: float = 0.0,
+              ramp_up: float = 0.0, seed: int = 42) -> Dict[str, Any]:
+    """Run all participants at one concurrency level on a fresh database copy."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        shutil.copy(APP_DB, db_path)
+        create_tables(db_path)
+
+        recorder = LoadRecorder()
+        probe = LockProbe(db_path)
+        probe.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="participant") as pool:
+            for index in range(participants):
+                pool.submit(_participant, index, db_path, recorder, think_time, seed)
+                if ramp_up:
+                    time.sleep(ramp_up / participants)
+        flush_pending_writes(db_path)
+        wall_seconds = time.perf_counter() - started
+        lock_stats = probe.stop()
+
+    operations = {}
+    for operation in OPERATIONS:
+        summary = _distribution(recorder.latencies[operation])
+        count = summary["count"]
+        summary["errors"] = recorder.errors[operation]
+        summary["error_rate"] = recorder.errors[operation] / count if count else None
+        operations[operation] = summary
+    total_ops = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "concurrency": concurrency,
+        "participants": participants,
+        "sessions_completed": recorder.sessions_completed,
+        "wall_seconds": wall_seconds,
+        "sessions_per_minute": recorder.sessions_completed / wall_seconds * 60 if wall_seconds else None,
+        "chat_requests_per_second": len(recorder.latencies["chat"]) / wall_seconds if wall_seconds else None,
+        "error_rate": sum(recorder.errors.values()) / total_ops if total_ops else None,
+        "operations": operations,
+        "lock_contention": dict(lock_stats, locked_errors=recorder.locked_errors),
+    }
+
+
+def run(concurrency_levels: List[int], participants: Optional[int] = None, llm_latency_ms: float = 50.0,
+        think_time: float = 0.0, ramp_up: float = 0.0, seed: int = 42) -> Dict[str, Any]:
+    set_llm_transport(StubTransport(llm_latency_ms))
+    levels = [run_level(level, participants or level, think_time, ramp_up, seed)
+              for level in concurrency_levels]
+    return {
+        "benchmark": "load_test",
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "config": {"llm_latency_ms": llm_latency_ms, "think_time": think_time,
+                   "ramp_up": ramp_up, "seed": seed},
+        "levels": levels,
+    }
+
+
+def _print_report(results: Dict[str, Any]):
+    print(f"📊 Load test (stub LLM {results['config']['llm_latency_ms']:.0f} ms, "
+          f"commit {results['git_commit'] or 'unknown'})")
+    for level in results["levels"]:
+        lock = level["lock_contention"]
+        print(f"\n  concurrency {level['concurrency']}: {level['sessions_completed']}/{level['participants']} sessions, "
+              f"{level['sessions_per_minute']:.1f} sessions/min, {level['chat_requests_per_second']:.2f} chat req/s, "
+              f"error rate {level['error_rate'] or 0:.1%}")
+        print(f"    write lock busy {lock['busy_ratio'] or 0:.1%} of {lock['samples']} probes, "
+              f"{lock['locked_errors']} 'database is locked' errors")
+        for operation, summary in level["operations"].items():
+            if summary["count"]:
+                print(f"    {operation:24s} n={summary['count']:5d} p50 {summary['p50_ms']:9.2f} ms | "
+                      f"p95 {summary['p95_ms']:9.2f} ms | errors {summary['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma-separated concurrency levels to run one after another")
+    parser.add_argument("--participants", type=int,
+                        help="Participants per level (default: same as the concurrency)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Synthetic delay per stub LLM call")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds between a participant's tasks")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which participants are started")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    results = run([int(level) for level in args.concurrency.split(",")], args.participants,
+                  args.llm_latency_ms, args.think_time, args.ramp_up, args.seed)
+    _print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
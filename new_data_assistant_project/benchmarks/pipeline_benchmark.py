@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the question-answering pipeline.
+
+Runs the GlobalMart study tasks through ``CLTCFTAgent.execute_query`` and
+``ChatManager.process_user_message`` against a temporary copy of the app
+database. Nothing goes over the network. The LLM is either a stub that returns
+canned, well-formed responses per stage (``--llm stub``, the default) or a
+cassette recorded with ``DATA_ASSISTANT_LLM_MODE=record`` (``--llm replay``).
+
+Reports per-stage latency distributions (from the tracing spans), throughput,
+peak memory, cache hit rates and LLM token usage. Results are written as JSON so
+runs on different commits can be compared with ``--compare``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from new_data_assistant_project.src.agents.globalmart_prompts import STUDY_TASK_PROMPTS
+from new_data_assistant_project.src.agents.llm_transport import (
+    ReplayMessage, ReplayTextBlock, ReplayTransport, ReplayUsage, set_llm_transport
+)
+from new_data_assistant_project.src.database.llm_calls import get_llm_calls
+from new_data_assistant_project.src.database.models import User
+from new_data_assistant_project.src.database.schema import create_tables
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import current_span
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+APP_DB = PROJECT_DIR / "src" / "database" / "superstore.db"
+USER_LEVELS = ("Beginner", "Intermediate", "Expert")
+
+# Plausible SQL for each study task, so the stub exercises real query execution
+STUB_SQL = {
+    1: "SELECT Region, Category, SUM(Sales) AS total_sales, SUM(Profit) AS total_profit "
+       "FROM superstore GROUP BY Region, Category ORDER BY total_sales DESC",
+    2: "SELECT substr(Order_Date, -4) AS year, Category, Region, SUM(Sales) AS total_sales "
+       "FROM superstore GROUP BY year, Category, Region ORDER BY year, total_sales DESC",
+    3: "SELECT Segment, COUNT(DISTINCT Customer_ID) AS customers, SUM(Profit) AS total_profit, "
+       "SUM(Profit) / COUNT(DISTINCT Customer_ID) AS profit_per_customer "
+       "FROM superstore GROUP BY Segment ORDER BY total_profit DESC",
+    4: "SELECT Category, Sub_Category, Region, Segment, SUM(Sales) AS sales, SUM(Profit) AS profit, "
+       "SUM(Profit) / SUM(Sales) AS margin, AVG(Discount) AS avg_discount "
+       "FROM superstore GROUP BY Category, Sub_Category, Region, Segment ORDER BY profit DESC",
+    5: "SELECT substr(Order_Date, -4) AS year, SUM(Sales) AS sales, SUM(Profit) AS profit "
+       "FROM superstore GROUP BY year ORDER BY year",
+    6: "SELECT Category, Segment, SUM(Sales) AS sales, SUM(Profit) AS profit, COUNT(DISTINCT Order_ID) AS orders "
+       "FROM superstore GROUP BY Category, Segment ORDER BY profit DESC",
+    7: "SELECT Category, Sub_Category, SUM(Profit) AS profit, AVG(Discount) AS avg_discount "
+       "FROM superstore GROUP BY Category, Sub_Category HAVING SUM(Profit) < 0 ORDER BY profit",
+    8: "SELECT substr(Order_Date, -4) AS year, Region, SUM(Sales) AS sales, SUM(Profit) AS profit "
+       "FROM superstore GROUP BY year, Region ORDER BY year, Region",
+}
+DEFAULT_SQL = "SELECT Category, SUM(Sales) AS total_sales FROM superstore GROUP BY Category"
+
+
+class StubTransport:
+    """
+    Deterministic offline LLM: answers each stage with a canned, parseable response.
+
+    The stage is taken from the enclosing ``llm.<stage>`` span opened by LLMClient.
+    """
+
+    mode = "stub"
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._sql_by_prompt = {task["prompt"]: STUB_SQL.get(task["id"], DEFAULT_SQL)
+                               for task in STUDY_TASK_PROMPTS}
+
+    def create(self, **request) -> ReplayMessage:
+        span = current_span()
+        stage = span.name.split(".", 1)[1] if span is not None and span.name.startswith("llm.") else ""
+        prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+        text = self._respond(stage, prompt)
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+        prompt_chars = len(prompt) + len(str(request.get("system", "")))
+        return ReplayMessage(
+            id=f"stub-{stage}", model=request.get("model", "stub"),
+            content=[ReplayTextBlock(text=text)], stop_reason="end_turn",
+            usage=ReplayUsage(input_tokens=prompt_chars // 4, output_tokens=len(text) // 4),
+        )
+
+    def _respond(self, stage: str, prompt: str) -> str:
+        if stage == "sql_generation":
+            question = prompt.split("Generate SQL for:", 1)[-1].strip()
+            sql = self._sql_by_prompt.get(question, DEFAULT_SQL)
+            return f"REASONING: Aggregate the superstore table for the requested dimensions.\nSQL: {sql}"
+        if stage == "task_assessment":
+            return json.dumps({
+                "intrinsic_load": 6.0, "task_sql_concept": "aggregation", "explanation_needed": True,
+                "explanation_type": "basic", "reasoning": "Stubbed assessment",
+                "task_classification": "Data Analysis", "user_capability_threshold": 5.0,
+                "final_complexity_score": 6.0,
+            })
+        if stage == "explanation_decision":
+            return json.dumps({"explanation_needed": True, "explanation_type": "basic",
+                               "reasoning": "Stubbed decision"})
+        if stage == "explanation_generation":
+            return ("EXPLANATION:\nThe query groups the orders by the requested dimensions and sums "
+                    "sales and profit for each group.\n\nThis shows where revenue and margin come from.\n\n"
+                    "SQL_CONCEPTS:\nGROUP BY, SUM, ORDER BY\n\n"
+                    "LEARNING_OBJECTIVES:\nAggregate data, compare groups")
+        return "The query aggregates the superstore data step by step."
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _prepare_database(tmp: str) -> str:
+    """Copy the app database, add the app tables and one user per level."""
+    db_path = os.path.join(tmp, "bench.db")
+    shutil.copy(APP_DB, db_path)
+    create_tables(db_path)
+    return db_path
+
+
+def _create_users(db_path: str) -> List[User]:
+    users = []
+    for level in USER_LEVELS:
+        user = User.create_user(f"bench_{level.lower()}_{int(time.time() * 1000)}", "benchmark")
+        user.user_level_category = level
+        user.has_completed_assessment = True
+        user.save(db_path)
+        users.append(user)
+    return users
+
+
+def _workload(users: List[User], iterations: int) -> List[tuple]:
+    return [(user, task["prompt"]) for _ in range(iterations)
+            for task in STUDY_TASK_PROMPTS for user in users]
+
+
+def _distribution(values: List[float]) -> Dict[str, Any]:
+    """Summary in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(values),
+        "mean_ms": statistics.mean(values) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _cache_delta(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    delta = {}
+    for cache, stats in after.items():
+        hits = stats["hits"] - before.get(cache, {}).get("hits", 0)
+        misses = stats["misses"] - before.get(cache, {}).get("misses", 0)
+        if hits + misses:
+            delta[cache] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+    return delta
+
+
+def _llm_usage(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    input_tokens = sum(call["input_tokens"] for call in calls)
+    cache_read = sum(call["cache_read_input_tokens"] for call in calls)
+    cache_write = sum(call["cache_creation_input_tokens"] for call in calls)
+    prompt_tokens = input_tokens + cache_read + cache_write
+    return {
+        "calls": len(calls),
+        "failed_calls": sum(1 for call in calls if not call["success"]),
+        "input_tokens": input_tokens,
+        "output_tokens": sum(call["output_tokens"] for call in calls),
+        "prompt_cache_hit_rate": cache_read / prompt_tokens if prompt_tokens else None,
+    }
+
+
+def _run_target(name: str, call, workload: List[tuple], db_path: str, trace_memory: bool) -> Dict[str, Any]:
+    """Run the workload through one entry point and collect its measurements."""
+    collector = get_metrics_collector()
+    caches_before = collector.cache_stats()
+    llm_calls_before = len(get_llm_calls(db_path, days=None))
+    started_at = time.time()
+    if trace_memory:
+        tracemalloc.start()
+
+    durations, errors, rss_peak = [], 0, None
+    wall_started = time.perf_counter()
+    for user, prompt in workload:
+        request_started = time.perf_counter()
+        try:
+            if not call(user, prompt):
+                errors += 1
+        except Exception as e:
+            logging.getLogger(__name__).error(f"{name} request failed: {e}")
+            errors += 1
+        durations.append(time.perf_counter() - request_started)
+        sample = collector.sample_resources()
+        if sample is not None:
+            rss_peak = max(rss_peak or 0.0, sample["process_rss_mb"])
+    wall_seconds = time.perf_counter() - wall_started
+
+    python_peak_mb = None
+    if trace_memory:
+        python_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    window = time.time() - started_at
+    stages = {stage: _distribution([sample.seconds for sample in collector.latency_samples(stage, window)])
+              for stage in sorted(collector.stages())}
+    return {
+        "requests": len(workload),
+        "errors": errors,
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(workload) / wall_seconds if wall_seconds else None,
+        "end_to_end": _distribution(durations),
+        "stages": {stage: summary for stage, summary in stages.items() if summary["count"]},
+        "memory": {"rss_peak_mb": rss_peak, "python_peak_mb": python_peak_mb},
+        "caches": _cache_delta(caches_before, collector.cache_stats()),
+        "llm": _llm_usage(get_llm_calls(db_path, days=None)[llm_calls_before:]),
+    }
+
+
+def run(llm: str = "stub", cassette: Optional[str] = None, iterations: int = 1,
+        targets: tuple = ("agent", "chat"), stub_latency_ms: float = 0.0,
+        trace_memory: bool = False) -> Dict[str, Any]:
+    """Run the benchmark and return the result document."""
+    if llm == "replay":
+        transport = ReplayTransport(cassette) if cassette else ReplayTransport()
+    else:
+        transport = StubTransport(stub_latency_ms)
+    set_llm_transport(transport)
+
+    # Imported after the transport is installed; the agents pick it up on construction
+    from new_data_assistant_project.src.agents.clt_cft_agent import CLTCFTAgent
+
+    results = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "config": {"llm": llm, "cassette": cassette, "iterations": iterations,
+                   "stub_latency_ms": stub_latency_ms, "tasks": len(STUDY_TASK_PROMPTS),
+                   "user_levels": list(USER_LEVELS)},
+        "targets": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = _prepare_database(tmp)
+        users = _create_users(db_path)
+        agent = CLTCFTAgent(user_profiles_path=os.path.join(tmp, "user_profiles.json"), database_path=db_path)
+        workload = _workload(users, iterations)
+
+        if "agent" in targets:
+            def call_agent(user: User, prompt: str) -> bool:
+                query_result, _ = agent.execute_query(user.username, prompt)
+                return query_result.success
+            results["targets"]["agent"] = _run_target("agent", call_agent, workload, db_path, trace_memory)
+
+        if "chat" in targets:
+            from new_data_assistant_project.src.utils.chat_manager import ChatManager
+            # Bypass __init__, which binds the manager to the app database
+            manager = ChatManager.__new__(ChatManager)
+            manager.db_path = db_path
+            manager.agent = agent
+
+            def call_chat(user: User, prompt: str) -> bool:
+                response, _, _ = manager.process_user_message(user, prompt)
+                return not response.startswith("❌")
+            results["targets"]["chat"] = _run_target("chat", call_chat, workload, db_path, trace_memory)
+    return results
+
+
+def _print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"📊 Pipeline benchmark ({results['config']['llm']} LLM, commit {results['git_commit'] or 'unknown'})")
+    for target, data in results["targets"].items():
+        print(f"\n  {target}: {data['requests']} requests, {data['errors']} errors, "
+              f"{data['throughput_rps']:.2f} req/s, RSS peak {data['memory']['rss_peak_mb'] or 0:.0f} MB")
+        base_stages = (baseline or {}).get("targets", {}).get(target, {}).get("stages", {})
+        rows = [("end_to_end", data["end_to_end"])] + list(data["stages"].items())
+        base_rows = dict([("end_to_end", (baseline or {}).get("targets", {}).get(target, {}).get("end_to_end", {}))]
+                         + list(base_stages.items()))
+        for stage, summary in rows:
+            line = f"    {stage:32s} p50 {summary['p50_ms']:9.2f} ms | p95 {summary['p95_ms']:9.2f} ms"
+            base = base_rows.get(stage) or {}
+            if base.get("p50_ms"):
+                change = (summary["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100
+                line += f" | p50 {change:+6.1f}% vs baseline"
+            print(line)
+        for cache, stats in data["caches"].items():
+            print(f"    cache {cache:26s} hit rate {stats['hit_rate']:.1%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        print(f"    LLM calls {data['llm']['calls']}, tokens in/out "
+              f"{data['llm']['input_tokens']}/{data['llm']['output_tokens']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", choices=("stub", "replay"), default="stub", help="LLM backend")
+    parser.add_argument("--cassette", help="Cassette for --llm replay (default: DATA_ASSISTANT_LLM_CASSETTE)")
+    parser.add_argument("--iterations", type=int, default=1, help="Passes over the study tasks per user level")
+    parser.add_argument("--targets", default="agent,chat", help="Comma-separated: agent, chat")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Synthetic delay per stub LLM call")
+    parser.add_argument("--trace-memory", action="store_true", help="Also measure the Python heap peak (slower)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    results = run(args.llm, args.cassette, args.iterations, tuple(args.targets.split(",")),
+                  args.stub_latency_ms, args.trace_memory)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-lookup overhead of the user repository vs. the old per-call SQL.
+
+The baseline reproduces what models.User did before the repository layer existed:
+open a connection, run the 21-column SELECT, unpack the row positionally, close.
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from new_data_assistant_project.src.database.schema import create_tables
+from new_data_assistant_project.src.database.models import User
+from new_data_assistant_project.src.database.repository import USER_COLUMNS, UserRepository
+
+
+def _legacy_get_by_id(db_path: str, user_id: int) -> User:
+    """Baseline lookup: new connection and positional unpacking per call."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return User(
+        id=row[0], username=row[1], password_hash=row[2], role=row[3],
+        created_at=datetime.fromisoformat(row[4]),
+        last_login=datetime.fromisoformat(row[5]) if row[5] else None,
+        sql_expertise_level=row[6], cognitive_load_capacity=row[7],
+        has_completed_assessment=bool(row[8]),
+        data_analysis_fundamentals=row[9], business_analytics=row[10],
+        forecasting_statistics=row[11], data_visualization=row[12],
+        domain_knowledge_retail=row[13], total_assessment_score=row[14],
+        user_level_category=row[15], sql_concept_levels={}, prior_query_history=[],
+        learning_preferences={}, age=row[16], gender=row[17], profession=row[18],
+        education_level=row[19], study_training=row[20]
+    )
+
+
+def _populate(db_path: str, n_users: int):
+    """Create the schema and n_users synthetic participants."""
+    create_tables(db_path)
+    conn = sqlite3.connect(db_path)
+    now = datetime.now().isoformat()
+    conn.executemany(
+        """
+        INSERT INTO users (username, password_hash, role, created_at, sql_expertise_level,
+                           cognitive_load_capacity, has_completed_assessment, age, gender)
+        VALUES (?, ?, 'user', ?, 2, 3, 1, ?, 'Not specified')
+        """,
+        [(f"bench_user_{i}", hashlib.sha256(str(i).encode()).hexdigest(), now, 20 + i % 40)
+         for i in range(n_users)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _time_per_call(fn, ids) -> list:
+    samples = []
+    for user_id in ids:
+        start = time.perf_counter()
+        fn(user_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _summary(samples: list) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"mean {statistics.mean(samples) * 1e6:8.1f} µs | p95 {p95 * 1e6:8.1f} µs"
+
+
+def run(n_users: int = 1000, lookups: int = 5000):
+    """Run all scenarios and print a comparison table."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        _populate(db_path, n_users)
+        ids = [1 + (i * 7919) % n_users for i in range(lookups)]
+
+        repository = UserRepository(db_path)
+        repository.get_by_id(ids[0])  # warm the connection and statement cache
+
+        legacy = _time_per_call(lambda user_id: _legacy_get_by_id(db_path, user_id), ids)
+        single = _time_per_call(repository.get_by_id, ids)
+
+        start = time.perf_counter()
+        batch = repository.get_many_by_ids(ids)
+        batch_per_lookup = (time.perf_counter() - start) / len(ids)
+
+        repository.close()
+
+    print(f"📊 User lookup benchmark ({n_users} users, {lookups} lookups)")
+    print(f"  legacy get_by_id      : {_summary(legacy)}")
+    print(f"  repository get_by_id  : {_summary(single)}")
+    print(f"  repository batch      : {batch_per_lookup * 1e6:8.1f} µs per id ({len(batch)} distinct users)")
+    print(f"  speedup (mean, single): {statistics.mean(legacy) / statistics.mean(single):.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000, help="Number of synthetic users")
+    parser.add_argument("--lookups", type=int, default=5000, help="Number of lookups per scenario")
+    args = parser.parse_args()
+    run(args.users, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
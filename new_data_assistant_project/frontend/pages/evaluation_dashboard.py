@@ -16,8 +16,9 @@ def robust_import_modules():
         from new_data_assistant_project.src.database.models import ExplanationFeedback, User, ChatSession
         from new_data_assistant_project.src.utils.path_utils import get_absolute_path
         from new_data_assistant_project.src.utils.auth_manager import AuthManager
+        from new_data_assistant_project.src.database.chat_search import search_chat_history
         print("✅ Evaluation Dashboard: Absolute imports successful")
-        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager
+        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager, search_chat_history
     except ImportError as e:
         print(f"❌ Absolute imports failed: {e}")
     
@@ -26,8 +27,9 @@ def robust_import_modules():
         from src.database.models import ExplanationFeedback, User, ChatSession
         from src.utils.path_utils import get_absolute_path
         from src.utils.auth_manager import AuthManager
+        from src.database.chat_search import search_chat_history
         print("✅ Evaluation Dashboard: Direct imports successful")
-        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager
+        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager, search_chat_history
     except ImportError as e:
         print(f"❌ Direct imports failed: {e}")
     
@@ -36,8 +38,9 @@ def robust_import_modules():
         from src.database.models import ExplanationFeedback, User, ChatSession
         from src.utils.path_utils import get_absolute_path
         from src.utils.auth_manager import AuthManager
+        from src.database.chat_search import search_chat_history
         print("✅ Evaluation Dashboard: Relative imports successful")
-        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager
+        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager, search_chat_history
     except ImportError as e:
         print(f"❌ Relative imports failed: {e}")
     
@@ -50,27 +53,68 @@ def robust_import_modules():
         from database.models import ExplanationFeedback, User, ChatSession
         from utils.path_utils import get_absolute_path
         from utils.auth_manager import AuthManager
+        from database.chat_search import search_chat_history
         print("✅ Evaluation Dashboard: Manual path imports successful")
-        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager
+        return ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager, search_chat_history
     except ImportError as e:
         print(f"❌ Manual path imports failed: {e}")
         st.error(f"❌ Could not import required modules: {e}")
         st.stop()
 
 # Import modules
-ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager = robust_import_modules()
+(ExplanationFeedback, User, ChatSession, get_absolute_path, AuthManager,
+ search_chat_history) = robust_import_modules()
 
-# Import ComprehensiveFeedback model
+# Import dashboard aggregations
 try:
-    from new_data_assistant_project.src.database.models import ComprehensiveFeedback
-    print("✅ ComprehensiveFeedback import successful")
+    from new_data_assistant_project.src.database import dashboard_queries as dashboard_data
+except ImportError:
+    from src.database import dashboard_queries as dashboard_data
+
+# Import in-process metrics collector
+try:
+    from new_data_assistant_project.src.utils.metrics_collector import (
+        get_metrics_collector, PIPELINE_STAGES, REQUEST_STAGE
+    )
 except ImportError:
     try:
-        from src.database.models import ComprehensiveFeedback
-        print("✅ ComprehensiveFeedback direct import successful")
+        from src.utils.metrics_collector import get_metrics_collector, PIPELINE_STAGES, REQUEST_STAGE
     except ImportError:
-        print("❌ ComprehensiveFeedback import failed")
-        ComprehensiveFeedback = None
+        print("❌ Metrics collector import failed")
+        get_metrics_collector = None
+
+# Import trace reader
+try:
+    from new_data_assistant_project.src.utils.tracing import load_recent_traces
+except ImportError:
+    try:
+        from src.utils.tracing import load_recent_traces
+    except ImportError:
+        print("❌ Tracing import failed")
+        load_recent_traces = None
+
+# Import LLM call accounting
+try:
+    from new_data_assistant_project.src.database.llm_calls import get_llm_calls
+except ImportError:
+    try:
+        from src.database.llm_calls import get_llm_calls
+    except ImportError:
+        print("❌ LLM call accounting import failed")
+        get_llm_calls = None
+
+# Import prediction accuracy tracker
+try:
+    from new_data_assistant_project.src.database.prediction_accuracy import PredictionAccuracyTracker
+except ImportError:
+    try:
+        from src.database.prediction_accuracy import PredictionAccuracyTracker
+    except ImportError:
+        print("❌ PredictionAccuracyTracker import failed")
+        PredictionAccuracyTracker = None
+
+# Number of newest feedback rows listed in the feedback tables
+FEEDBACK_TABLE_ROWS = 200
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -89,11 +133,14 @@ def render_evaluation_dashboard():
         return
     
     # Dashboard tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         "📈 Overview", 
         "👥 User Analytics", 
         "💬 Feedback Analysis", 
-        "📊 System Metrics"
+        "📊 System Metrics",
+        "🔎 Chat Search",
+        "🧭 Traces",
+        "💰 LLM Usage"
     ])
     
     with tab1:
@@ -107,6 +154,15 @@ def render_evaluation_dashboard():
         
     with tab4:
         render_system_metrics_tab()
+        
+    with tab5:
+        render_chat_search_tab()
+        
+    with tab6:
+        render_traces_tab()
+        
+    with tab7:
+        render_llm_usage_tab()
 
 def render_overview_tab():
     """Render the overview tab with key metrics."""
@@ -120,90 +176,69 @@ def render_overview_tab():
     db_path = getattr(auth_manager, 'db_path', 'src/database/superstore.db')
     
     try:
-        users = User.get_all_users(db_path)
-        total_users = len(users) if users else 0
-        
-        # Calculate age statistics
-        ages = [user.age for user in users if user.age is not None]
-        avg_age = round(sum(ages) / len(ages), 1) if ages else 0
-        min_age = min(ages) if ages else 0
-        max_age = max(ages) if ages else 0
-        
-        with col1:
-            st.metric(
-                label="Total Users",
-                value=total_users,
-                delta="5 this week"
-            )
-        
-        with col2:
-            st.metric(
-                label="Average Age",
-                value=f"{avg_age} years",
-                delta=f"Range: {min_age}-{max_age}"
-            )
-        
-        with col3:
-            st.metric(
-                label="Chat Sessions",
-                value="156",
-                delta="23 today"
-            )
-        
-        with col4:
-            st.metric(
-                label="System Uptime",
-                value="99.8%",
-                delta="0.1%"
-            )
+        user_summary = dashboard_data.get_user_summary(db_path)
+        session_summary = dashboard_data.get_session_summary(db_path)
     except Exception as e:
-        # Fallback to sample data if there's an error
+        logger.error(f"Error loading overview metrics: {e}")
+        st.error(f"Error loading overview metrics: {e}")
+        return
+    
     with col1:
         st.metric(
             label="Total Users",
-            value="42",
-            delta="5 this week"
+            value=user_summary['total_users'],
+            delta=f"{user_summary['new_this_week']} this week"
         )
     
     with col2:
-            st.metric(
-                label="Average Age",
-                value="25 years",
-                delta="Range: 18-45"
-            )
-        
-        with col3:
+        st.metric(
+            label="Average Age",
+            value=f"{user_summary['avg_age']} years",
+            delta=f"Range: {user_summary['min_age']}-{user_summary['max_age']}"
+        )
+    
+    with col3:
         st.metric(
             label="Chat Sessions",
-            value="156",
-            delta="23 today"
+            value=session_summary['total_sessions'],
+            delta=f"{session_summary['sessions_today']} today"
         )
     
     with col4:
         st.metric(
-            label="System Uptime",
-            value="99.8%",
-            delta="0.1%"
+            label="Active Users",
+            value=session_summary['active_users_week'],
+            delta="last 7 days",
+            delta_color="off"
         )
     
     # Activity chart
     st.subheader("📈 Activity Trends")
     
-    # Generate sample data
-    dates = pd.date_range(start='2024-01-01', end='2024-01-31', freq='D')
-    activity_data = pd.DataFrame({
-        'Date': dates,
-        'Sessions': [15, 23, 18, 31, 25, 19, 28] * 4 + [20, 25, 22]
-    })
+    activity_data = pd.DataFrame(dashboard_data.get_daily_session_counts(db_path, days=30))
+    activity_data.columns = ['Date', 'Sessions']
     
     fig = px.line(
         activity_data, 
         x='Date', 
         y='Sessions',
-        title='Daily Chat Sessions'
+        title='Daily Chat Sessions (30 days)'
     )
     st.plotly_chart(fig, use_container_width=True)
 
+def render_breakdown_chart(counts, label: str, title: str, kind: str = 'bar'):
+    """Render (value, count) pairs as a bar or pie chart."""
+    if not counts:
+        st.info(f"No {label.lower()} data available")
+        return
+    
+    data = pd.DataFrame(counts, columns=[label, 'Count'])
+    if kind == 'pie':
+        fig = px.pie(data, values='Count', names=label, title=title)
+    else:
+        fig = px.bar(data, x=label, y='Count', title=title)
+    st.plotly_chart(fig, use_container_width=True)
+
 def render_user_analytics_tab():
     """Render user analytics and behavior patterns."""
     st.subheader("👥 User Behavior Analytics")
@@ -213,184 +248,71 @@ def render_user_analytics_tab():
     db_path = getattr(auth_manager, 'db_path', 'src/database/superstore.db')
     
     try:
-        users = User.get_all_users(db_path)
+        if not dashboard_data.get_user_summary(db_path)['total_users']:
+            st.info("No users found in the database")
+            return
         
-        if users:
-            # User role distribution
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.subheader("User Role Distribution")
-                role_counts = {}
-                for user in users:
-                    role_counts[user.role] = role_counts.get(user.role, 0) + 1
-                
-                if role_counts:
-                    role_data = pd.DataFrame({
-                        'Role': list(role_counts.keys()),
-                        'Count': list(role_counts.values())
-                    })
-                    
-                    fig = px.pie(
-                        role_data, 
-                        values='Count', 
-                        names='Role',
-                        title='User Distribution by Role'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No user data available")
-            
-            with col2:
-                st.subheader("Assessment Completion Status")
-                completed = sum(1 for user in users if user.has_completed_assessment)
-                not_completed = len(users) - completed
-                
-                completion_data = pd.DataFrame({
-                    'Status': ['Completed', 'Not Completed'],
-                    'Count': [completed, not_completed]
-                })
-                
-                fig = px.pie(
-                    completion_data, 
-                    values='Count', 
-                    names='Status',
-                    title='Assessment Completion Status'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # User demographics
-            st.subheader("👤 User Demographics")
-            
-            # Age distribution
-            age_counts = {}
-            for user in users:
-                if user.age:
-                    age_counts[user.age] = age_counts.get(user.age, 0) + 1
-            
-            if age_counts:
-                age_data = pd.DataFrame({
-                    'Age': list(age_counts.keys()),
-                    'Count': list(age_counts.values())
-                })
-                age_data = age_data.sort_values('Age')
-                
-                fig = px.bar(
-                    age_data, 
-                    x='Age', 
-                    y='Count',
-                    title='User Distribution by Age'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("No age data available")
-            
-            # Gender distribution
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                gender_counts = {}
-                for user in users:
-                    if user.gender:
-                        gender_counts[user.gender] = gender_counts.get(user.gender, 0) + 1
-                
-                if gender_counts:
-                    gender_data = pd.DataFrame({
-                        'Gender': list(gender_counts.keys()),
-                        'Count': list(gender_counts.values())
-                    })
-                    
-                    fig = px.bar(
-                        gender_data, 
-                        x='Gender', 
-                        y='Count',
-                        title='User Distribution by Gender'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No gender data available")
-            
-            with col2:
-                # Education level distribution
-                education_counts = {}
-                for user in users:
-                    if user.education_level:
-                        education_counts[user.education_level] = education_counts.get(user.education_level, 0) + 1
-                
-                if education_counts:
-                    education_data = pd.DataFrame({
-                        'Education Level': list(education_counts.keys()),
-                        'Count': list(education_counts.values())
-                    })
-                    
-                    fig = px.bar(
-                        education_data, 
-                        x='Education Level', 
-                        y='Count',
-                        title='User Distribution by Education Level'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No education data available")
-            
-            # User assessment levels
-            st.subheader("📊 User Assessment Levels")
-            level_counts = {}
-            for user in users:
-                if user.user_level_category:
-                    level_counts[user.user_level_category] = level_counts.get(user.user_level_category, 0) + 1
-            
-            if level_counts:
-                level_data = pd.DataFrame({
-                    'Level': list(level_counts.keys()),
-                    'Count': list(level_counts.values())
-                })
-                
-                fig = px.bar(
-                    level_data, 
-                    x='Level', 
-                    y='Count',
-                    title='User Distribution by Assessment Level'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Recent user table with real data
-            st.subheader("📋 Recent User Activity")
-            
-            # Prepare user data for display
-            user_display_data = []
-            for user in users[:10]:  # Show last 10 users
-                user_display_data.append({
-                    'Username': user.username,
-                    'Role': user.role,
-                    'Age': user.age or 'Not Specified',
-                    'Assessment Level': user.user_level_category or 'Not Assessed',
-                    'Gender': user.gender or 'Not Specified',
-                    'Profession': user.profession or 'Not Specified',
-                    'Education': user.education_level or 'Not Specified',
-                    'Created': user.created_at.strftime('%Y-%m-%d') if user.created_at else 'Unknown'
-                })
-            
-            if user_display_data:
-                user_df = pd.DataFrame(user_display_data)
-                st.dataframe(user_df, use_container_width=True)
-            else:
-                st.info("No user data available")
-                
+        # User role distribution
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("User Role Distribution")
+            render_breakdown_chart(dashboard_data.get_user_breakdown(db_path, 'role'),
+                                   'Role', 'User Distribution by Role', kind='pie')
+        
+        with col2:
+            st.subheader("Assessment Completion Status")
+            completion = dict(dashboard_data.get_user_breakdown(db_path, 'has_completed_assessment'))
+            completed = sum(count for value, count in completion.items() if value)
+            not_completed = sum(count for value, count in completion.items() if not value)
+            render_breakdown_chart([('Completed', completed), ('Not Completed', not_completed)],
+                                   'Status', 'Assessment Completion Status', kind='pie')
+        
+        # User demographics
+        st.subheader("👤 User Demographics")
+        render_breakdown_chart(dashboard_data.get_user_breakdown(db_path, 'age'),
+                               'Age', 'User Distribution by Age')
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            render_breakdown_chart(dashboard_data.get_user_breakdown(db_path, 'gender'),
+                                   'Gender', 'User Distribution by Gender')
+        
+        with col2:
+            render_breakdown_chart(dashboard_data.get_user_breakdown(db_path, 'education_level'),
+                                   'Education Level', 'User Distribution by Education Level')
+        
+        # User assessment levels
+        st.subheader("📊 User Assessment Levels")
+        render_breakdown_chart(dashboard_data.get_user_breakdown(db_path, 'user_level_category'),
+                               'Level', 'User Distribution by Assessment Level')
+        
+        # Most recently created users
+        st.subheader("📋 Recent User Activity")
+        
+        user_display_data = [
+            {
+                'Username': user['username'],
+                'Role': user['role'],
+                'Age': user['age'] or 'Not Specified',
+                'Assessment Level': user['user_level_category'] or 'Not Assessed',
+                'Gender': user['gender'] or 'Not Specified',
+                'Profession': user['profession'] or 'Not Specified',
+                'Education': user['education_level'] or 'Not Specified',
+                'Created': dashboard_data.format_timestamp(user['created_at'], '%Y-%m-%d')
+            }
+            for user in dashboard_data.get_recent_users(db_path, limit=10)
+        ]
+        
+        if user_display_data:
+            st.dataframe(pd.DataFrame(user_display_data), use_container_width=True)
         else:
-            st.info("No users found in the database")
+            st.info("No user data available")
             
     except Exception as e:
+        logger.error(f"Error loading user analytics: {e}")
         st.error(f"Error loading user data: {e}")
-        # Fallback to sample data
-        st.subheader("📋 Sample User Data (Fallback)")
-        recent_users = pd.DataFrame({
-            'Username': ['user1', 'user2', 'user3', 'admin1', 'user4'],
-            'Last Active': ['2024-01-15 14:30', '2024-01-15 12:15', '2024-01-14 16:45', '2024-01-15 09:20', '2024-01-13 11:30'],
-            'Sessions': [15, 8, 23, 45, 3],
-            'Status': ['Active', 'Active', 'Inactive', 'Active', 'New']
-        })
-        st.dataframe(recent_users, use_container_width=True)
 
 def render_feedback_analysis_tab():
     """Render feedback analysis and sentiment trends."""
@@ -406,185 +328,463 @@ def render_feedback_analysis_tab():
     # Explanation Feedback Analysis
     st.markdown("### 📝 Explanation Feedback Analysis")
     
-    if ExplanationFeedback:
-        feedback_data = ExplanationFeedback.get_all_feedback(db_path)
+    summary = dashboard_data.get_explanation_feedback_summary(db_path)
+    
+    if summary['total_feedback']:
+        feedback_df = pd.DataFrame([
+            {
+                'Username': fb['username'],
+                'Explanation Given': bool(fb['explanation_given']),
+                'Was Needed': None if fb['was_needed'] is None else bool(fb['was_needed']),
+                'Was Helpful': None if fb['was_helpful'] is None else bool(fb['was_helpful']),
+                'Would Have Been Needed': None if fb['would_have_been_needed'] is None else bool(fb['would_have_been_needed']),
+                'Date': dashboard_data.format_timestamp(fb['created_at'])
+            }
+            for fb in dashboard_data.get_recent_explanation_feedback(db_path, limit=FEEDBACK_TABLE_ROWS)
+        ])
         
-        if feedback_data:
-            # Convert to DataFrame for analysis
-            feedback_df = pd.DataFrame([
-                {
-                    'Username': getattr(fb, 'username', 'Unknown'),
-                    'Explanation Given': fb.explanation_given,
-                    'Was Needed': fb.was_needed,
-                    'Was Helpful': fb.was_helpful,
-                    'Would Have Been Needed': fb.would_have_been_needed,
-                    'Date': fb.created_at.strftime('%Y-%m-%d %H:%M')
-                }
-                for fb in feedback_data
-            ])
-            
-            st.dataframe(feedback_df, use_container_width=True)
-            
-            # Summary statistics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Feedback", len(feedback_data))
-    with col2:
-                explanations_given = sum(1 for fb in feedback_data if fb.explanation_given)
-                st.metric("Explanations Given", explanations_given)
-            with col3:
-                helpful_explanations = sum(1 for fb in feedback_data if fb.was_helpful)
-                st.metric("Helpful Explanations", helpful_explanations)
-        else:
-            st.info("No explanation feedback data available yet.")
+        st.dataframe(feedback_df, use_container_width=True)
+        if summary['total_feedback'] > FEEDBACK_TABLE_ROWS:
+            st.caption(f"Showing the newest {FEEDBACK_TABLE_ROWS} of {summary['total_feedback']} entries.")
+        
+        # Summary statistics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Feedback", summary['total_feedback'])
+        with col2:
+            st.metric("Explanations Given", summary['explanations_given'])
+        with col3:
+            st.metric("Helpful Explanations", summary['helpful_explanations'])
     else:
-        st.warning("ExplanationFeedback model not available.")
+        st.info("No explanation feedback data available yet.")
     
     # Comprehensive Research Feedback Analysis
     st.markdown("### 🔬 Comprehensive Research Feedback Analysis")
     
-    if ComprehensiveFeedback:
-        comprehensive_feedback_data = ComprehensiveFeedback.get_all_feedback(db_path)
+    comp_summary = dashboard_data.get_comprehensive_feedback_summary(db_path)
+    total = comp_summary['total_feedback']
+    
+    if total:
+        comp_feedback_df = pd.DataFrame([
+            {
+                'Username': fb['username'],
+                'Frequency Rating': fb['frequency_rating'],
+                'Explanation Quality': fb['explanation_quality_rating'],
+                'System Helpfulness': fb['system_helpfulness_rating'],
+                'Learning Improvement': fb['learning_improvement_rating'],
+                'Auto Explanation': bool(fb['auto_explanation']),
+                'System Accuracy': fb['system_accuracy'],
+                'Recommendation': fb['recommendation'],
+                'Date': dashboard_data.format_timestamp(fb['created_at'])
+            }
+            for fb in dashboard_data.get_recent_comprehensive_feedback(db_path, limit=FEEDBACK_TABLE_ROWS)
+        ])
         
-        if comprehensive_feedback_data:
-            # Convert to DataFrame for analysis
-            comp_feedback_df = pd.DataFrame([
-                {
-                    'Username': getattr(fb, 'username', 'Unknown'),
-                    'Frequency Rating': fb.frequency_rating,
-                    'Explanation Quality': fb.explanation_quality_rating,
-                    'System Helpfulness': fb.system_helpfulness_rating,
-                    'Learning Improvement': fb.learning_improvement_rating,
-                    'Auto Explanation': fb.auto_explanation,
-                    'System Accuracy': fb.system_accuracy,
-                    'Recommendation': fb.recommendation,
-                    'Date': fb.created_at.strftime('%Y-%m-%d %H:%M')
-                }
-                for fb in comprehensive_feedback_data
-            ])
-            
-            st.dataframe(comp_feedback_df, use_container_width=True)
-            
-            # Summary statistics for comprehensive feedback
-            col1, col2, col3, col4 = st.columns(4)
+        st.dataframe(comp_feedback_df, use_container_width=True)
+        if total > FEEDBACK_TABLE_ROWS:
+            st.caption(f"Showing the newest {FEEDBACK_TABLE_ROWS} of {total} entries.")
+        
+        # Summary statistics for comprehensive feedback
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Research Feedback", total)
+        with col2:
+            st.metric("Avg. Explanation Quality", f"{comp_summary['avg_explanation_quality']:.1f}/5")
+        with col3:
+            st.metric("Avg. System Helpfulness", f"{comp_summary['avg_system_helpfulness']:.1f}/5")
+        with col4:
+            st.metric("Positive Recommendations", f"{comp_summary['positive_recommendations']}/{total}")
+        
+        # Detailed feedback analysis (distributions are counted over all feedback, not just the table)
+        st.markdown("#### 📊 Detailed Feedback Analysis")
+        
+        distributions = [
+            ("Explanation Frequency Preferences", 'frequency_rating'),
+            ("Explanation Quality Ratings", 'explanation_quality_rating'),
+            ("System Helpfulness Ratings", 'system_helpfulness_rating'),
+            ("Learning Improvement Ratings", 'learning_improvement_rating'),
+            ("Auto-Explanation Preferences", 'auto_explanation'),
+            ("System Accuracy Beliefs", 'system_accuracy'),
+            ("System Recommendations", 'recommendation'),
+        ]
+        for title, column in distributions:
+            st.subheader(title)
+            counts = dashboard_data.get_feedback_distribution(db_path, column)
+            if column == 'auto_explanation':
+                counts = [(bool(value), count) for value, count in counts]
+            st.bar_chart(pd.Series({str(value): count for value, count in counts}))
+        
+    else:
+        st.info("No comprehensive research feedback data available yet.")
+
+    # Explanation prediction accuracy (read from the trigger-maintained counters)
+    st.markdown("### 🎯 Explanation Prediction Accuracy")
+    
+    if PredictionAccuracyTracker:
+        window_options = {"All time": None, "Last 30 days": 30, "Last 7 days": 7}
+        window_label = st.selectbox("Time window", list(window_options), key="prediction_accuracy_window")
+        days = window_options[window_label]
+        
+        tracker = PredictionAccuracyTracker(db_path)
+        metrics = tracker.get_accuracy_metrics(days=days)
+        
+        if metrics['total_predictions'] > 0:
+            col1, col2, col3, col4, col5 = st.columns(5)
             with col1:
-                st.metric("Total Research Feedback", len(comprehensive_feedback_data))
+                st.metric("Predictions", metrics['total_predictions'])
             with col2:
-                avg_quality = sum(fb.explanation_quality_rating for fb in comprehensive_feedback_data) / len(comprehensive_feedback_data)
-                st.metric("Avg. Explanation Quality", f"{avg_quality:.1f}/5")
+                st.metric("Accuracy", f"{metrics['accuracy']:.1%}")
             with col3:
-                avg_helpfulness = sum(fb.system_helpfulness_rating for fb in comprehensive_feedback_data) / len(comprehensive_feedback_data)
-                st.metric("Avg. System Helpfulness", f"{avg_helpfulness:.1f}/5")
+                st.metric("Precision", f"{metrics['precision']:.1%}")
             with col4:
-                positive_recommendations = sum(1 for fb in comprehensive_feedback_data if fb.recommendation == 'Yes')
-                st.metric("Positive Recommendations", f"{positive_recommendations}/{len(comprehensive_feedback_data)}")
-            
-            # Detailed feedback analysis
-            st.markdown("#### 📊 Detailed Feedback Analysis")
-            
-            # Frequency rating distribution
-            st.subheader("Explanation Frequency Preferences")
-            frequency_counts = comp_feedback_df['Frequency Rating'].value_counts().sort_index()
-            st.bar_chart(frequency_counts)
-            
-            # Explanation quality distribution
-            st.subheader("Explanation Quality Ratings")
-            quality_counts = comp_feedback_df['Explanation Quality'].value_counts().sort_index()
-            st.bar_chart(quality_counts)
-            
-            # System helpfulness distribution
-            st.subheader("System Helpfulness Ratings")
-            helpfulness_counts = comp_feedback_df['System Helpfulness'].value_counts().sort_index()
-            st.bar_chart(helpfulness_counts)
-            
-            # Learning improvement distribution
-            st.subheader("Learning Improvement Ratings")
-            learning_counts = comp_feedback_df['Learning Improvement'].value_counts().sort_index()
-            st.bar_chart(learning_counts)
-            
-            # Auto-explanation preferences
-            st.subheader("Auto-Explanation Preferences")
-            auto_explanation_counts = comp_feedback_df['Auto Explanation'].value_counts()
-            st.bar_chart(auto_explanation_counts)
-            
-            # System accuracy beliefs
-            st.subheader("System Accuracy Beliefs")
-            accuracy_counts = comp_feedback_df['System Accuracy'].value_counts()
-            st.bar_chart(accuracy_counts)
-            
-            # Recommendations
-            st.subheader("System Recommendations")
-            recommendation_counts = comp_feedback_df['Recommendation'].value_counts()
-            st.bar_chart(recommendation_counts)
+                st.metric("Recall", f"{metrics['recall']:.1%}")
+            with col5:
+                st.metric("F1 Score", f"{metrics['f1_score']:.2f}")
             
+            daily = tracker.get_daily_metrics(days=days or 90)
+            if daily:
+                daily_df = pd.DataFrame(daily)
+                fig = px.line(
+                    daily_df,
+                    x='day',
+                    y=['accuracy', 'precision', 'recall', 'f1_score'],
+                    title='Daily Prediction Metrics'
+                )
+                st.plotly_chart(fig, use_container_width=True)
         else:
-            st.info("No comprehensive research feedback data available yet.")
+            st.info("No explanation predictions recorded in this window.")
     else:
-        st.warning("ComprehensiveFeedback model not available.")
+        st.warning("PredictionAccuracyTracker not available.")
 
 def render_system_metrics_tab():
     """Render system performance and technical metrics."""
     st.subheader("🔧 System Performance Metrics")
     
+    if get_metrics_collector is None:
+        st.warning("Metrics collector not available.")
+        return
+    
+    metrics = get_metrics_collector()
+    window_options = {"Last 15 minutes": 15 * 60, "Last hour": 60 * 60, "Since start": None}
+    window_label = st.selectbox("Time window", list(window_options), index=1, key="system_metrics_window")
+    window_seconds = window_options[window_label]
+    
+    st.caption(
+        f"Collected in this app process since {datetime.fromtimestamp(metrics.started_at).strftime('%Y-%m-%d %H:%M')}; "
+        "figures reset when the app restarts."
+    )
+    
     # System health indicators
+    request_summary = metrics.latency_summary(REQUEST_STAGE, window_seconds)
+    resource_samples = metrics.resource_samples(window_seconds)
+    latest = resource_samples[-1] if resource_samples else None
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Response Time", "1.2s", "-0.3s")
+        st.metric(
+            "Response Time (p50)",
+            f"{request_summary['p50']:.2f}s" if request_summary['count'] else "–",
+            f"p95 {request_summary['p95']:.2f}s · p99 {request_summary['p99']:.2f}s" if request_summary['count'] else None,
+            delta_color="off"
+        )
     
     with col2:
-        st.metric("Error Rate", "0.8%", "-0.2%")
+        st.metric(
+            "Error Rate",
+            f"{request_summary['error_rate']:.1%}",
+            f"{request_summary['count']} requests",
+            delta_color="off"
+        )
     
     with col3:
-        st.metric("CPU Usage", "45%", "5%")
+        st.metric("CPU Usage", f"{latest['process_cpu_percent']:.0f}%" if latest else "–",
+                  f"host {latest['system_cpu_percent']:.0f}%" if latest else None, delta_color="off")
     
     with col4:
-        st.metric("Memory Usage", "62%", "3%")
+        st.metric("Memory Usage", f"{latest['process_rss_mb']:.0f} MB" if latest else "–",
+                  f"host {latest['system_memory_percent']:.0f}%" if latest else None, delta_color="off")
+    
+    # Per-stage latency percentiles
+    st.subheader("⏱️ Stage Latencies")
+    
+    stages = [REQUEST_STAGE] + list(PIPELINE_STAGES)
+    stages += [stage for stage in metrics.stages() if stage not in stages]
+    summaries = [metrics.latency_summary(stage, window_seconds) for stage in stages]
+    summaries = [summary for summary in summaries if summary['count']]
+    
+    if summaries:
+        stage_df = pd.DataFrame([
+            {
+                'Stage': summary['stage'],
+                'Count': summary['count'],
+                'p50 (ms)': round(summary['p50'] * 1000, 1),
+                'p95 (ms)': round(summary['p95'] * 1000, 1),
+                'p99 (ms)': round(summary['p99'] * 1000, 1),
+                'Max (ms)': round(summary['max'] * 1000, 1),
+                'Errors': f"{summary['error_rate']:.1%}"
+            }
+            for summary in summaries
+        ])
+        st.dataframe(stage_df, hide_index=True, use_container_width=True)
+        
+        request_samples = metrics.latency_samples(REQUEST_STAGE, window_seconds)
+        if request_samples:
+            request_df = pd.DataFrame({
+                'Time': [datetime.fromtimestamp(sample.timestamp) for sample in request_samples],
+                'Response Time (ms)': [sample.seconds * 1000 for sample in request_samples]
+            })
+            fig = px.scatter(request_df, x='Time', y='Response Time (ms)', title='Request Response Times')
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No requests recorded in this window yet.")
     
-    # Performance trends
-    st.subheader("📈 Performance Trends")
+    # Resource usage
+    st.subheader("📈 Resource Usage")
     
-    perf_data = pd.DataFrame({
-        'Time': pd.date_range(start='2024-01-15 00:00', periods=24, freq='H'),
-        'Response Time (ms)': [1200, 1150, 1300, 1100, 1250, 1180, 1220] * 3 + [1190, 1160, 1140],
-        'CPU Usage (%)': [45, 42, 48, 40, 46, 44, 47] * 3 + [43, 41, 39],
-        'Memory Usage (%)': [62, 60, 65, 58, 63, 61, 64] * 3 + [59, 57, 55]
-    })
+    if resource_samples:
+        resource_df = pd.DataFrame(resource_samples)
+        resource_df['Time'] = pd.to_datetime(resource_df['timestamp'], unit='s')
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fig = px.line(resource_df, x='Time', y=['process_cpu_percent', 'system_cpu_percent'],
+                          title='CPU Usage (%)')
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            fig = px.line(resource_df, x='Time', y='process_rss_mb', title='App Memory (MB)')
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No resource samples yet (psutil samples every few seconds).")
+
+def render_chat_search_tab():
+    """Render full-text search over chat messages, responses and generated SQL."""
+    st.subheader("🔎 Chat History Search")
     
-    # Response time chart
-    fig = px.line(
-        perf_data, 
-        x='Time', 
-        y='Response Time (ms)',
-        title='System Response Time (24h)'
+    auth_manager = AuthManager()
+    db_path = getattr(auth_manager, 'db_path', 'src/database/superstore.db')
+    page_size = 20
+    
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        query = st.text_input(
+            "Search messages, responses and SQL",
+            placeholder='e.g. revenue region, "profit margin", categor*',
+            key="chat_search_query"
+        )
+    with col2:
+        username = st.text_input("Username (optional)", key="chat_search_username")
+    with col3:
+        order = st.selectbox("Sort by", ["relevance", "recent"], key="chat_search_order")
+    
+    if not query.strip():
+        st.info("Enter search terms to find chat sessions. Terms are combined with AND; append * for prefix matches.")
+        return
+    
+    user_id = None
+    if username.strip():
+        user = User.get_by_username(db_path, username.strip())
+        if not user:
+            st.warning(f"User '{username.strip()}' not found.")
+            return
+        user_id = user.id
+    
+    # Start from the first page whenever the search changes
+    search_key = (query, username, order)
+    if st.session_state.get('chat_search_key') != search_key:
+        st.session_state.chat_search_key = search_key
+        st.session_state.chat_search_offset = 0
+    offset = st.session_state.get('chat_search_offset', 0)
+    
+    try:
+        page = search_chat_history(db_path, query, user_id=user_id, limit=page_size, offset=offset, order=order)
+    except Exception as e:
+        st.error(f"Error searching chat history: {e}")
+        return
+    
+    if not page.hits:
+        st.info("No matching chat sessions found.")
+        return
+    
+    st.caption(f"Results {offset + 1}–{offset + len(page.hits)} · {page.elapsed_ms:.1f} ms")
+    
+    for hit in page.hits:
+        created = hit.created_at.strftime('%Y-%m-%d %H:%M') if hit.created_at else 'Unknown'
+        with st.container():
+            st.markdown(f"**{hit.username or f'User {hit.user_id}'}** · {created} · session #{hit.session_id}")
+            st.markdown(f"🧑‍💻 {hit.user_message}")
+            if hit.response_snippet:
+                st.markdown(f"🤖 {hit.response_snippet}")
+            if hit.sql_snippet:
+                st.markdown(f"🗄️ `{hit.sql_snippet.replace('**', '')}`")
+            st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if offset > 0 and st.button("⬅️ Previous", key="chat_search_prev"):
+            st.session_state.chat_search_offset = max(0, offset - page_size)
+            st.rerun()
+    with col2:
+        if page.has_more and st.button("Next ➡️", key="chat_search_next"):
+            st.session_state.chat_search_offset = offset + page_size
+            st.rerun()
+
+def render_traces_tab():
+    """Render recent request traces as a span waterfall."""
+    st.subheader("🧭 Request Traces")
+    
+    if load_recent_traces is None:
+        st.warning("Tracing module not available.")
+        return
+    
+    traces = load_recent_traces(limit=100)
+    if not traces:
+        st.info("No traces recorded yet. Traces are written for every chat request.")
+        return
+    
+    slow_only = st.checkbox("Only requests slower than 5s", key="traces_slow_only")
+    if slow_only:
+        traces = [trace for trace in traces if trace['duration_ms'] > 5000]
+    
+    trace_rows = [
+        {
+            'Started': datetime.fromtimestamp(trace['root']['start_ns'] / 1e9).strftime('%Y-%m-%d %H:%M:%S'),
+            'Request': trace['root']['name'],
+            'User ID': trace['root']['attributes'].get('user_id'),
+            'Duration (ms)': round(trace['duration_ms'], 1),
+            'Spans': len(trace['spans']),
+            'Status': 'error' if trace['root']['status'] == 2 else 'ok',
+            'Trace ID': trace['trace_id'],
+        }
+        for trace in traces
+    ]
+    if not trace_rows:
+        st.info("No traces match the filter.")
+        return
+    st.dataframe(pd.DataFrame(trace_rows), hide_index=True, use_container_width=True)
+    
+    trace_id = st.selectbox(
+        "Inspect trace",
+        [row['Trace ID'] for row in trace_rows],
+        format_func=lambda tid: next(f"{row['Started']} · {row['Duration (ms)']} ms · {tid[:8]}"
+                                     for row in trace_rows if row['Trace ID'] == tid),
+        key="traces_selected"
+    )
+    trace = next(trace for trace in traces if trace['trace_id'] == trace_id)
+    
+    # Waterfall: one bar per span, indented by depth, offset from the root start
+    depth = {}
+    for span in trace['spans']:
+        depth[span['span_id']] = depth.get(span['parent_span_id'], -1) + 1
+    root_start = trace['root']['start_ns']
+    span_rows = [
+        {
+            'Span': '  ' * depth[span['span_id']] + span['name'],
+            'Start (ms)': (span['start_ns'] - root_start) / 1e6,
+            'Duration (ms)': (span['end_ns'] - span['start_ns']) / 1e6,
+            'Status': 'error' if span['status'] == 2 else 'ok',
+            'Attributes': ', '.join(f"{key}={value}" for key, value in span['attributes'].items()),
+            'Error': span['status_message'],
+        }
+        for span in trace['spans']
+    ]
+    span_df = pd.DataFrame(span_rows)
+    
+    fig = go.Figure(go.Bar(
+        y=span_df['Span'],
+        x=span_df['Duration (ms)'],
+        base=span_df['Start (ms)'],
+        orientation='h',
+        marker_color=['#d62728' if status == 'error' else '#1f77b4' for status in span_df['Status']],
+        hovertext=span_df['Attributes'],
+    ))
+    fig.update_layout(
+        title=f"Trace {trace_id[:8]} ({trace['duration_ms']:.0f} ms)",
+        xaxis_title='Time since request start (ms)',
+        yaxis=dict(autorange='reversed'),
+        height=max(250, 40 * len(span_rows))
     )
     st.plotly_chart(fig, use_container_width=True)
     
-    # Resource usage
-    col1, col2 = st.columns(2)
+    st.dataframe(span_df.round({'Start (ms)': 1, 'Duration (ms)': 1}), hide_index=True, use_container_width=True)
+
+def render_llm_usage_tab():
+    """Render token, cost and latency breakdowns of the LLM calls."""
+    st.subheader("💰 LLM Usage and Cost")
+    
+    if get_llm_calls is None:
+        st.warning("LLM call accounting not available.")
+        return
+    
+    auth_manager = AuthManager()
+    db_path = getattr(auth_manager, 'db_path', 'src/database/superstore.db')
     
+    window_options = {"Last 7 days": 7, "Last 30 days": 30, "All time": None}
+    window_label = st.selectbox("Time window", list(window_options), index=1, key="llm_usage_window")
+    calls = get_llm_calls(db_path, days=window_options[window_label])
+    
+    if not calls:
+        st.info("No LLM calls recorded in this window.")
+        return
+    
+    calls_df = pd.DataFrame(calls)
+    calls_df['user_level'] = calls_df['user_level'].fillna('Unlinked')
+    
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        fig = px.line(perf_data, x='Time', y='CPU Usage (%)', title='CPU Usage')
-        st.plotly_chart(fig, use_container_width=True)
+        st.metric("LLM Calls", len(calls_df), f"{int(calls_df['retries'].sum())} retries", delta_color="off")
+    with col2:
+        st.metric("Estimated Cost", f"${calls_df['cost_usd'].sum():.2f}")
+    with col3:
+        st.metric("Tokens (in / out)",
+                  f"{int(calls_df['input_tokens'].sum()):,} / {int(calls_df['output_tokens'].sum()):,}")
+    with col4:
+        st.metric("Latency p95", f"{calls_df['latency_ms'].quantile(0.95) / 1000:.2f}s",
+                  f"p50 {calls_df['latency_ms'].quantile(0.5) / 1000:.2f}s", delta_color="off")
+    
+    def breakdown(group_column: str) -> pd.DataFrame:
+        grouped = calls_df.groupby(group_column)
+        table = pd.DataFrame({
+            'Calls': grouped.size(),
+            'Input Tokens': grouped['input_tokens'].sum(),
+            'Output Tokens': grouped['output_tokens'].sum(),
+            'Cache Read Tokens': grouped['cache_read_input_tokens'].sum(),
+            'Cost ($)': grouped['cost_usd'].sum().round(4),
+            'Cost / Call ($)': grouped['cost_usd'].mean().round(5),
+            'p50 (ms)': grouped['latency_ms'].quantile(0.5).round(0),
+            'p95 (ms)': grouped['latency_ms'].quantile(0.95).round(0),
+            'Retries': grouped['retries'].sum(),
+            'Error Rate': (1 - grouped['success'].mean()).round(3),
+        })
+        return table.sort_values('Cost ($)', ascending=False)
+    
+    # Per pipeline stage
+    st.subheader("🧩 By Pipeline Stage")
+    stage_table = breakdown('stage')
+    st.dataframe(stage_table, use_container_width=True)
     
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(stage_table.reset_index(), x='stage', y='Cost ($)', title='Cost by Stage')
+        st.plotly_chart(fig, use_container_width=True)
     with col2:
-        fig = px.line(perf_data, x='Time', y='Memory Usage (%)', title='Memory Usage')
+        fig = px.box(calls_df, x='stage', y='latency_ms', title='Latency by Stage (ms)')
         st.plotly_chart(fig, use_container_width=True)
     
-    # System logs (sample)
-    st.subheader("📝 Recent System Events")
-    
-    logs = pd.DataFrame({
-        'Timestamp': ['2024-01-15 14:30:00', '2024-01-15 14:25:00', '2024-01-15 14:20:00'],
-        'Level': ['INFO', 'WARNING', 'INFO'],
-        'Message': [
-            'User login successful',
-            'High memory usage detected',
-            'Database backup completed'
-        ]
-    })
+    # Per user level (through the chat session the calls belong to)
+    st.subheader("🎓 By User Level")
+    level_table = breakdown('user_level')
+    st.dataframe(level_table, use_container_width=True)
     
-    st.dataframe(logs, use_container_width=True)
+    fig = px.bar(
+        calls_df.groupby(['user_level', 'stage'])['cost_usd'].sum().reset_index(),
+        x='user_level', y='cost_usd', color='stage',
+        title='Cost by User Level and Stage', labels={'cost_usd': 'Cost ($)', 'user_level': 'User Level'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Costs are estimates from list prices per model; 'Unlinked' calls have no saved chat session.")
 
 if __name__ == "__main__":
-    render_evaluation_dashboard() 
\ No newline at end of file
+    render_evaluation_dashboard() 
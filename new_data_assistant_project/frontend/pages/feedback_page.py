@@ -251,8 +251,8 @@ def render_feedback_page(user: User):
                 recommendation_index=st.session_state.feedback_responses.get('recommendation_index', 0)
             )
             
-            # Save to database
-            feedback.save(db_path)
+            # Save to database (committed by the write-behind buffer)
+            feedback.save(db_path, wait=False)
             
             st.success("✅ Thank you for your valuable feedback! Your responses have been recorded in our research database.")
             st.session_state.feedback_completed = True
@@ -63,102 +63,17 @@ def robust_import_modules():
 # Import modules
 User, AuthManager, ChatManager, get_absolute_path = robust_import_modules()
 
+try:
+    from new_data_assistant_project.src.database.models import ExplanationFeedback
+    from new_data_assistant_project.src.database.prediction_accuracy import PredictionAccuracyTracker
+except ImportError:
+    from src.database.models import ExplanationFeedback
+    from src.database.prediction_accuracy import PredictionAccuracyTracker
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class PredictionAccuracyTracker:
-    """Tracks prediction accuracy for explanation decisions."""
-    
-    def __init__(self, db_path: str):
-        self.db_path = db_path
-    
-    def record_prediction(self, session_id: int, user_id: int, 
-                         predicted_explanation_needed: bool, 
-                         actual_explanation_needed: bool,
-                         confidence_score: float = None):
-        """Record a prediction and its actual outcome."""
-        try:
-            import sqlite3
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO prediction_accuracy (session_id, user_id, predicted_explanation_needed,
-                                               actual_explanation_needed, confidence_score, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                session_id, user_id, predicted_explanation_needed, actual_explanation_needed,
-                confidence_score, datetime.now().isoformat()
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logger.error(f"Error recording prediction: {e}")
-    
-    def get_accuracy_metrics(self, user_id: int = None) -> Dict[str, Any]:
-        """Get accuracy metrics for predictions."""
-        try:
-            import sqlite3
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if user_id:
-                cursor.execute("""
-                    SELECT predicted_explanation_needed, actual_explanation_needed, confidence_score
-                    FROM prediction_accuracy WHERE user_id = ?
-                """, (user_id,))
-            else:
-                cursor.execute("""
-                    SELECT predicted_explanation_needed, actual_explanation_needed, confidence_score
-                    FROM prediction_accuracy
-                """)
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            if not rows:
-                return {
-                    'total_predictions': 0,
-                    'accuracy': 0.0,
-                    'precision': 0.0,
-                    'recall': 0.0,
-                    'f1_score': 0.0
-                }
-            
-            total = len(rows)
-            correct = sum(1 for row in rows if row[0] == row[1])
-            accuracy = correct / total if total > 0 else 0.0
-            
-            # Calculate precision, recall, F1
-            true_positives = sum(1 for row in rows if row[0] and row[1])
-            false_positives = sum(1 for row in rows if row[0] and not row[1])
-            false_negatives = sum(1 for row in rows if not row[0] and row[1])
-            
-            precision = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0.0
-            recall = true_positives / (true_positives + false_negatives) if (true_positives + false_negatives) > 0 else 0.0
-            f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
-            
-            return {
-                'total_predictions': total,
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1_score
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting accuracy metrics: {e}")
-            return {
-                'total_predictions': 0,
-                'accuracy': 0.0,
-                'precision': 0.0,
-                'recall': 0.0,
-                'f1_score': 0.0
-            }
-
 def render_task_page(user: User):
     """Render the main task page with research study prompts and prediction accuracy tracking."""
     
@@ -331,7 +246,7 @@ def render_task_page(user: User):
                         explanation_given=True,
                         was_helpful=(was_helpful == "Yes")
                     )
-                    feedback.save(auth_manager.db_path)
+                    feedback.save(auth_manager.db_path, wait=False)
                     
                     # Record prediction accuracy
                     tracker.record_prediction(
@@ -367,7 +282,7 @@ def render_task_page(user: User):
                         explanation_given=False,
                         would_have_been_needed=(would_have_been_needed == "Yes")
                     )
-                    feedback.save(auth_manager.db_path)
+                    feedback.save(auth_manager.db_path, wait=False)
                     
                     # Record prediction accuracy
                     tracker.record_prediction(
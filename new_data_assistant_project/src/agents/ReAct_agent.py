@@ -4,18 +4,32 @@ import re
 from typing import Dict, List, Tuple, Optional
 import json
 from dataclasses import dataclass
-from anthropic import Anthropic
 import logging
 import os
 from pathlib import Path
 
 # Konsistente Imports - Immer vollständige Pfade
 from new_data_assistant_project.src.utils.my_config import MyConfig
+from new_data_assistant_project.src.utils.tracing import current_trace_id, set_span_attributes, start_span
+from new_data_assistant_project.src.agents.circuit_breaker import CircuitOpenError
+from new_data_assistant_project.src.agents.llm_client import LLMClient, response_text
+from new_data_assistant_project.src.agents.llm_transport import get_llm_transport
+from new_data_assistant_project.src.agents.model_router import Route, get_model_router
+from new_data_assistant_project.src.agents.complexity_scorer import estimate_sql_complexity
+from new_data_assistant_project.src.agents.sql_cache import cache_sql, get_cached_sql
+from new_data_assistant_project.src.agents.sql_planner import SQL_CANDIDATES, choose_candidate, parse_candidates
+from new_data_assistant_project.src.database.sql_candidates import record_sql_candidates
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Reasoning reported when the response did not follow the REASONING/SQL format
+REASONING_NOT_AVAILABLE = "Reasoning not available"
+# Shown when the LLM circuit is open and the question has not been answered before
+LLM_UNAVAILABLE_MESSAGE = ("The language model is temporarily unavailable, and this question has not been "
+                           "answered before. Please try again in a minute.")
+
 @dataclass
 class QueryResult:
     """Structure for query execution results"""
@@ -40,18 +54,17 @@ class ReActAgent:
             database_path: Path to SQLite database
         """
         try:
-            config = MyConfig()
-            api_key = config.get_api_key()
-            if not api_key:
-                raise ValueError("No API key found in configuration")
-            self.client = Anthropic(api_key=api_key)
-            logger.info("Successfully initialized Anthropic client")
+            # Live API, or record/replay of a cassette (DATA_ASSISTANT_LLM_MODE)
+            self.llm = LLMClient(get_llm_transport(), db_path=database_path)
+            logger.info(f"Successfully initialized LLM transport ({self.llm.transport.mode})")
         except Exception as e:
-            logger.error(f"Failed to initialize Anthropic client: {e}")
+            logger.error(f"Failed to initialize LLM transport: {e}")
             raise
 
         self.database_path = database_path
-        self.model = "claude-sonnet-4-20250514"  # Using latest available Sonnet model
+        # Model per stage and complexity (DATA_ASSISTANT_MODEL_ROUTES); self.model is the strong tier
+        self.router = get_model_router()
+        self.model = self.router.strong_model
         
         # Initialize database schema cache
         self.schema_info = self._get_database_schema()
@@ -183,11 +196,48 @@ class ReActAgent:
         
         return sql_query
     
-    def _generate_sql_with_reasoning(self, user_query: str) -> Tuple[str, str]:
+    def _generate_sql(self, user_query: str, route: Route) -> Tuple[str, str, Route]:
+        """
+        Generate SQL with the routed model, escalating once if the answer is unusable.
+        
+        Returns:
+            (sql_query, reasoning, route that produced them)
+        """
+        sql_query, reasoning = self._generate_sql_with_reasoning(user_query, route.model)
+        if not sql_query or reasoning == REASONING_NOT_AVAILABLE:
+            stronger = self.router.escalate(route, "parse_failure")
+            if stronger is not None:
+                route = stronger
+                sql_query, reasoning = self._generate_sql_with_reasoning(user_query, route.model)
+        return sql_query, reasoning, route
+    
+    def _generate_sql_with_reasoning(self, user_query: str, model: Optional[str] = None) -> Tuple[str, str]:
         """
         Generate SQL query using ReAct reasoning pattern.
         Returns both the SQL query and the reasoning process.
+        
+        With DATA_ASSISTANT_SQL_CANDIDATES > 1 the model writes several alternative
+        queries and the one with the cheapest query plan is returned (see sql_planner).
         """
+        if SQL_CANDIDATES > 1:
+            response_format = f"""Write {SQL_CANDIDATES} different SQL queries that each answer the question correctly,
+        for example with joins instead of correlated subqueries, a different join order, or filters
+        that can use indexes. Put the one you consider best first.
+        
+        Format your response as:
+        REASONING:
+        [Your step-by-step reasoning]
+        
+        """ + "\n        \n        ".join(f"SQL {number}:\n        [SQL query {number}]"
+                                             for number in range(1, SQL_CANDIDATES + 1))
+        else:
+            response_format = """Format your response as:
+        REASONING:
+        [Your step-by-step reasoning]
+        
+        SQL:
+        [Your SQL query]"""
+        
         system_prompt = f"""You are an expert SQL analyst following the ReAct (Reasoning and Acting) approach.
         
         {self.schema_info}
@@ -205,17 +255,13 @@ class ReActAgent:
         Be precise and consider performance implications.
         You can generate any SQL operation including SELECT, INSERT, UPDATE, DELETE, CREATE, DROP, etc.
         
-        Format your response as:
-        REASONING:
-        [Your step-by-step reasoning]
-        
-        SQL:
-        [Your SQL query]"""
+        {response_format}"""
         
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1000,
+            response = self.llm.create_hedged(
+                "sql_generation",
+                model=model or self.model,
+                max_tokens=1000 + 400 * (SQL_CANDIDATES - 1),
                 temperature=0.1,
                 system=system_prompt,
                 messages=[{
@@ -225,14 +271,11 @@ class ReActAgent:
             )
             
             # Extract content from the response properly for TextBlock objects
-            content = ""
-            for block in response.content:
-                if hasattr(block, 'text'):
-                    content += block.text
-                else:
-                    content += str(block)
+            content = response_text(response)
             
             # Content successfully extracted from API
+            if SQL_CANDIDATES > 1:
+                return self._choose_sql_candidate(user_query, content, model or self.model)
             
             # Extract reasoning and SQL
             if "REASONING:" in content and "SQL:" in content:
@@ -247,12 +290,50 @@ class ReActAgent:
             else:
                 # Fallback if format is not followed - try to extract SQL anyway
                 cleaned_content = self._clean_sql_query(content)
-                return cleaned_content, "Reasoning not available"
+                return cleaned_content, REASONING_NOT_AVAILABLE
                 
+        except CircuitOpenError:
+            raise  # execute_query answers from the question/SQL cache instead
         except Exception as e:
             logger.error(f"Error generating SQL: {e}")
             return "", "I encountered an error while processing your request"
     
+    def _choose_sql_candidate(self, user_query: str, content: str, model: str) -> Tuple[str, str]:
+        """
+        Pick the valid candidate with the cheapest query plan from a multi-candidate answer.
+        
+        Only read-only candidates are ranked; one that writes to the database is never
+        chosen over the others. All candidates are logged to sql_candidates. If none
+        can be ranked the first one is returned and handled as a single query would be.
+        """
+        candidates = [self._clean_sql_query(text) for text in parse_candidates(content)]
+        candidates = [sql_query for sql_query in candidates if sql_query]
+        if not candidates:
+            return self._clean_sql_query(content), REASONING_NOT_AVAILABLE
+        if "REASONING:" in content:
+            reasoning = re.split(r'^\s*SQL\s*\d*\s*:', content.split("REASONING:", 1)[1],
+                                 maxsplit=1, flags=re.MULTILINE | re.IGNORECASE)[0].strip()
+        else:
+            reasoning = REASONING_NOT_AVAILABLE
+        
+        best, plans = choose_candidate(self.database_path, candidates)
+        record_sql_candidates(self.database_path, user_query, model, plans,
+                              best.index if best else None, request_id=current_trace_id())
+        set_span_attributes(**{
+            "sql.candidates": len(plans),
+            "sql.valid_candidates": sum(1 for plan in plans if plan.valid),
+            "sql.chosen_candidate": best.index if best else -1,
+            "sql.chosen_cost": round(best.cost, 2) if best else -1,
+        })
+        writes = [plan.index + 1 for plan in plans if not plan.read_only]
+        if writes:
+            logger.warning(f"Not ranking SQL candidate(s) {writes} of {len(plans)}: not read-only queries")
+        if best is None:
+            logger.warning(f"None of {len(plans)} SQL candidates can be ranked; using the first")
+            return candidates[0], reasoning
+        logger.info(f"Chose SQL candidate {best.index + 1}/{len(plans)} (estimated cost {best.cost:.0f})")
+        return best.sql_query, reasoning
+    
     def execute_query(self, user_query: str) -> QueryResult:
         """
         Main method to process natural language query using ReAct approach.
@@ -268,14 +349,27 @@ class ReActAgent:
         
         try:
             # Step 1: Generate SQL using ReAct reasoning
-            sql_query, reasoning = self._generate_sql_with_reasoning(user_query)
+            llm_unavailable = False
+            with start_span("react.sql_generation") as span:
+                route = self.router.select("sql_generation", estimate_sql_complexity(user_query))
+                try:
+                    sql_query, reasoning, route = self._generate_sql(user_query, route)
+                except CircuitOpenError:
+                    # The LLM API is down: rerun the SQL that answered this question before
+                    llm_unavailable = True
+                    sql_query = get_cached_sql(user_query, self.database_path) or ""
+                    reasoning = "Answered from the question/SQL cache while the LLM is unavailable"
+                    span.set_attributes(**{"sql.source": "cache"})
+                if not sql_query:
+                    span.set_error("No SQL generated")
             
             if not sql_query:
                 return QueryResult(
                     success=False,
                     data=None,
                     sql_query="",
-                    error_message="I couldn't understand your request. Please try rephrasing your question about the data.",
+                    error_message=LLM_UNAVAILABLE_MESSAGE if llm_unavailable else
+                    "I couldn't understand your request. Please try rephrasing your question about the data.",
                     execution_time=time.time() - start_time,
                     complexity_score=1
                 )
@@ -290,9 +384,27 @@ class ReActAgent:
             with sqlite3.connect(self.database_path) as conn:
                 try:
                     # Execute query and get results
-                    result_df = pd.read_sql_query(sql_query, conn)
+                    try:
+                        with start_span("react.sql_execution", complexity=complexity_score) as span:
+                            result_df = pd.read_sql_query(sql_query, conn)
+                            span.set_attributes(rows=len(result_df), columns=len(result_df.columns))
+                    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+                        # SQL from the fast model failed: regenerate it with the strong one
+                        stronger = None if llm_unavailable else self.router.escalate(route, "sql_error")
+                        if stronger is None:
+                            raise
+                        logger.warning(f"SQL from {route.model} failed ({e}); regenerating with {stronger.model}")
+                        with start_span("react.sql_generation", escalated=True):
+                            sql_query, reasoning, route = self._generate_sql(user_query, stronger)
+                        if not sql_query:
+                            raise
+                        complexity_score = self._assess_query_complexity(sql_query)
+                        with start_span("react.sql_execution", complexity=complexity_score) as span:
+                            result_df = pd.read_sql_query(sql_query, conn)
+                            span.set_attributes(rows=len(result_df), columns=len(result_df.columns))
                     
                     execution_time = time.time() - start_time
+                    cache_sql(user_query, sql_query, self.database_path)
                     
                     logger.info(f"Query executed successfully. Complexity: {complexity_score}")
                     logger.info(f"Reasoning: {reasoning[:100]}...")
@@ -306,7 +418,7 @@ class ReActAgent:
                         complexity_score=complexity_score
                     )
                     
-                except sqlite3.Error as e:
+                except (sqlite3.Error, pd.errors.DatabaseError) as e:
                     # Log the actual error for debugging but return user-friendly message
                     logger.error(f"SQL execution error: {str(e)}")
                     return QueryResult(
@@ -348,8 +460,9 @@ class ReActAgent:
         )
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = self.llm.create(
+                "reasoning_explanation",
+                model=self.router.select("reasoning_explanation").model,
                 max_tokens=1000,
                 temperature=0.2,
                 system=system_prompt,
@@ -359,10 +472,8 @@ class ReActAgent:
                 }]
             )
 
-            # Sammle alle Thinking/Text-Blöcke
-            explanation = ""
-            for block in response.content:
-                explanation += str(block) + "\n\n"
+            # Sammle alle Text-Blöcke
+            explanation = response_text(response)
 
             return explanation.strip() if explanation else "No reasoning blocks found."
 
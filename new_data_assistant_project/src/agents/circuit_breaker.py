@@ -0,0 +1,163 @@
+"""
+Circuit breaker around the LLM API.
+
+When the API is down or very slow, every request would otherwise wait for the
+client timeout (and its retries) before a fallback kicks in. ``LLMClient`` asks
+the breaker before each attempt and reports how the attempt went:
+
+- closed: calls go through. ``DATA_ASSISTANT_BREAKER_FAILURES`` (default 5)
+  failures in a row open the circuit. Connection errors, server errors and API
+  timeouts count as failures, and so does any call slower than
+  ``DATA_ASSISTANT_BREAKER_SLOW_SECONDS`` (default 30). Under a request
+  deadline the API timeout is the time left, usually below that, so a call that
+  uses up its whole timeout counts as slow too, if the timeout was at least
+  ``DATA_ASSISTANT_BREAKER_MIN_TIMEOUT`` seconds (default 5). Rate limits, bad
+  requests, shorter timeouts and our own deadlines/queue timeouts do not count
+  either way.
+- open: calls fail immediately with ``CircuitOpenError`` for
+  ``DATA_ASSISTANT_BREAKER_COOLDOWN`` seconds (default 30). The agents treat it
+  like any LLM failure, so they answer from the question/SQL cache
+  (``sql_cache``), the explanation cache and the local heuristics right away.
+- half-open: after the cooldown a single probe call is let through; success
+  closes the circuit, failure opens it for another cooldown.
+
+``DATA_ASSISTANT_LLM_BREAKER=0`` disables the breaker. Transitions are logged,
+the state is traced as ``llm.circuit`` and ``stats()`` reports it.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+BREAKER_ENABLED = os.getenv("DATA_ASSISTANT_LLM_BREAKER", "1") == "1"
+FAILURE_THRESHOLD = int(os.getenv("DATA_ASSISTANT_BREAKER_FAILURES", "5"))
+SLOW_CALL_SECONDS = float(os.getenv("DATA_ASSISTANT_BREAKER_SLOW_SECONDS", "30"))
+COOLDOWN_SECONDS = float(os.getenv("DATA_ASSISTANT_BREAKER_COOLDOWN", "30"))
+# Shorter timeouts (a call started just before the request deadline) say nothing about the API
+MIN_TIMEOUT_SECONDS = float(os.getenv("DATA_ASSISTANT_BREAKER_MIN_TIMEOUT", "5"))
+# Share of its timeout after which a timed-out call counts as having used it up
+_TIMEOUT_USED_UP = 0.95
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM API while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a cooldown and a single half-open probe."""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, slow_call_seconds: float = SLOW_CALL_SECONDS,
+                 cooldown_seconds: float = COOLDOWN_SECONDS, enabled: bool = BREAKER_ENABLED,
+                 min_timeout_seconds: float = MIN_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.min_timeout_seconds = min_timeout_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.enabled = enabled
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info("LLM circuit half-open; probing the API")
+        return self._state
+
+    def before_call(self, stage: str):
+        """Raise CircuitOpenError unless a call may go to the API now."""
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight):
+                self._probe_in_flight = state == HALF_OPEN
+                set_span_attributes(**{"llm.circuit": state})
+                return
+            self._rejected += 1
+        set_span_attributes(**{"llm.circuit": state})
+        raise CircuitOpenError(f"LLM circuit {state}; not calling the API for {stage}")
+
+    def record_success(self, seconds: float):
+        """Report a completed call; a slow one counts as a failure."""
+        if seconds >= self.slow_call_seconds:
+            self.record_failure(f"slow call ({seconds:.1f}s)")
+            return
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._probe_in_flight = False
+                logger.info("LLM circuit closed; the API is answering again")
+
+    def record_timeout(self, seconds: float, timeout: Optional[float]):
+        """Report an API timeout after seconds; timeout is the limit the call was sent with, if known."""
+        used_up = (timeout is not None and timeout >= self.min_timeout_seconds
+                   and seconds >= timeout * _TIMEOUT_USED_UP)
+        if seconds >= self.slow_call_seconds or used_up:
+            self.record_failure(f"timeout after {seconds:.1f}s")
+        else:
+            self.record_neutral()
+
+    def record_failure(self, reason: str):
+        """Report a call that failed for reasons on the API's side."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self._times_opened += 1
+                logger.warning(f"LLM circuit opened after {self._failures} failure(s), last: {reason}; "
+                               f"serving cached answers for {self.cooldown_seconds:.0f}s")
+
+    def record_neutral(self):
+        """Report a call whose outcome says nothing about the API (frees a half-open probe)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state, failure streak, how often the circuit opened and calls rejected."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+            }
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker configured from the environment."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker()
+        return _breaker
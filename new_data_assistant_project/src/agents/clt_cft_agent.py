@@ -1,22 +1,54 @@
 import json
+import math
 import numpy as np
-from typing import Dict, List, Tuple, Optional, Any, Union
+from typing import Callable, Dict, List, Tuple, Optional, Any, Union
 from dataclasses import dataclass, asdict
-from anthropic import Anthropic
 import logging
 from datetime import datetime
 import re
 import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
 from pathlib import Path
 
 # Konsistente Imports - Immer vollständige Pfade
 from new_data_assistant_project.src.utils.my_config import MyConfig
 from new_data_assistant_project.src.agents.ReAct_agent import QueryResult, ReActAgent
+from new_data_assistant_project.src.agents.llm_client import LLMClient, response_text
+from new_data_assistant_project.src.agents.llm_transport import get_llm_transport
+from new_data_assistant_project.src.agents.complexity_scorer import (
+    CAPABILITY_THRESHOLDS, ComplexityScore, score_task, user_level_for_expertise
+)
+from new_data_assistant_project.src.agents.explanation_classifier import (
+    MIN_CONFIDENCE, build_features, get_explanation_classifier
+)
+from new_data_assistant_project.src.agents.circuit_breaker import CircuitOpenError
+from new_data_assistant_project.src.agents.explanation_cache import (
+    cache_explanation, explanation_key, get_cached_explanation
+)
+from new_data_assistant_project.src.agents.lazy_explanation import LAZY_EXPLANATIONS, ExplanationHandle
+from new_data_assistant_project.src.agents.llm_scheduler import llm_user
+from new_data_assistant_project.src.agents.model_router import get_model_router
+from new_data_assistant_project.src.database.profile_store import ProfileStore
+from new_data_assistant_project.src.utils.deadline import (
+    has_time_for, record_degradation, remaining_time, request_deadline
+)
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import set_span_attributes, start_span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ask the LLM to break ties when the local complexity score is borderline
+COMPLEXITY_LLM_TIEBREAK = os.getenv("DATA_ASSISTANT_COMPLEXITY_LLM_TIEBREAK", "0") == "1"
+
+# Start generating the explanation while the LLM is still deciding whether it is needed,
+# if the prior probability of "needed" is at least the threshold
+SPECULATIVE_EXPLANATIONS = os.getenv("DATA_ASSISTANT_SPECULATIVE_EXPLANATIONS", "0") == "1"
+SPECULATION_THRESHOLD = float(os.getenv("DATA_ASSISTANT_SPECULATION_THRESHOLD", "0.7"))
+
 @dataclass
 class UserProfile:
     """User cognitive profile based on CLT assessments"""
@@ -68,23 +100,23 @@ class CLTCFTAgent:
         Initialize CLT & CFT Agent with Claude Sonnet 4 API and ReAct Agent.
         
         Args:
-            user_profiles_path: Path to store user profiles
-            database_path: Path to SQLite database for ReAct Agent
+            user_profiles_path: Legacy JSON profile file, imported once into the profile store
+            database_path: Path to SQLite database for ReAct Agent and the profile store
         """
         try:
-            config = MyConfig()
-            api_key = config.get_api_key()
-            if not api_key:
-                raise ValueError("No API key found in configuration")
-            self.client = Anthropic(api_key=api_key)
-            logger.info("Successfully initialized Anthropic client")
+            # Live API, or record/replay of a cassette (DATA_ASSISTANT_LLM_MODE)
+            self.llm = LLMClient(get_llm_transport(), db_path=database_path)
+            logger.info(f"Successfully initialized LLM transport ({self.llm.transport.mode})")
         except Exception as e:
-            logger.error(f"Failed to initialize Anthropic client: {e}")
+            logger.error(f"Failed to initialize LLM transport: {e}")
             raise
 
-        self.model = "claude-sonnet-4-20250514"
+        # Model per stage and complexity (DATA_ASSISTANT_MODEL_ROUTES); self.model is the strong tier
+        self.router = get_model_router()
+        self.model = self.router.strong_model
         self.user_profiles_path = user_profiles_path
-        self.user_profiles: Dict[str, UserProfile] = {}
+        self.database_path = database_path
+        self.user_profiles: ProfileStore = None
         
         # Initialize ReAct Agent for SQL query execution
         try:
@@ -225,25 +257,16 @@ Return a JSON object with the following structure:
         }
     
     def _load_user_profiles(self):
-        """Load user profiles from storage."""
-        try:
-            with open(self.user_profiles_path, 'r') as f:
-                data = json.load(f)
-                for user_id, profile_data in data.items():
-                    self.user_profiles[user_id] = UserProfile(**profile_data)
-        except FileNotFoundError:
-            logger.info("No existing user profiles found. Starting fresh.")
-        except Exception as e:
-            logger.error(f"Error loading user profiles: {e}")
+        """Open the profile store; profiles themselves are loaded on first access."""
+        self.user_profiles = ProfileStore(
+            self.database_path,
+            UserProfile,
+            legacy_json_path=self.user_profiles_path
+        )
     
-    def _save_user_profiles(self):
-        """Save user profiles to storage."""
-        try:
-            data = {user_id: asdict(profile) for user_id, profile in self.user_profiles.items()}
-            with open(self.user_profiles_path, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving user profiles: {e}")
+    def _save_user_profiles(self, user_id: str, profile: UserProfile, reason: str = "update") -> bool:
+        """Persist one modified user profile; False if another worker saved it first."""
+        return self.user_profiles.save(user_id, profile, reason=reason)
     
     def _validate_user_profiles(self):
         """Validate that all user profiles have required assessment fields."""
@@ -274,24 +297,24 @@ Return a JSON object with the following structure:
                     profile.education_level = "Bachelor"
                 
                 logger.info(f"Set default values for user {user_id}: age={profile.age}, gender={profile.gender}, profession={profile.profession}, education_level={profile.education_level}")
-        
-        # Save updated profiles
-        if any(hasattr(profile, 'age') and profile.age is not None for profile in self.user_profiles.items()):
-            self._save_user_profiles()
+                
+                # Save updated profile
+                self._save_user_profiles(user_id, profile, reason="validate")
     
     def update_user_assessment_fields(self, user_id: str, age: int, gender: str, profession: str, education_level: str):
         """Update user assessment fields."""
-        if user_id in self.user_profiles:
-            profile = self.user_profiles[user_id]
+        def apply(profile: UserProfile):
             profile.age = age
             profile.gender = gender
             profile.profession = profession
             profile.education_level = education_level
             profile.last_updated = datetime.now().isoformat()
-            
-            # Save updated profile
-            self._save_user_profiles()
+        
+        # Applied to the latest stored version, so updates from other workers are kept
+        if self.user_profiles.update(user_id, apply, reason="assessment") is not None:
             logger.info(f"Updated assessment fields for user {user_id}")
+        elif user_id in self.user_profiles:
+            logger.error(f"Could not save assessment fields for user {user_id}")
         else:
             logger.warning(f"User {user_id} not found in profiles")
     
@@ -332,155 +355,146 @@ Return a JSON object with the following structure:
         # Default to basic select
         return "basic_select"
     
-    def _assess_task_complexity(self, user_query: str, user_profile: UserProfile) -> CognitiveAssessment:
+    def _assess_task_complexity(self, user_query: str, user_profile: UserProfile,
+                                sql_query: Optional[str] = None,
+                                result_shape: Optional[Tuple[int, int]] = None) -> CognitiveAssessment:
         """
         Assess task complexity using CLT-CFT framework.
         
+        The documented formula is computed locally (see complexity_scorer); the LLM is
+        only asked as a tie-breaker for borderline scores, and only if
+        DATA_ASSISTANT_COMPLEXITY_LLM_TIEBREAK=1.
+        
         Args:
             user_query: The user's data analysis request
             user_profile: User's cognitive profile
+            sql_query: Generated SQL, if already known
+            result_shape: (rows, columns) of the query result, if already executed
             
         Returns:
             CognitiveAssessment with detailed complexity analysis
         """
         try:
-            # Prepare user context for assessment
             user_level = self._get_user_level_from_profile(user_profile)
-            user_capability_threshold = self._get_capability_threshold(user_level)
-            
-            # Create direct instructions for the LLM to create CognitiveAssessment
-            assessment_instructions = f"""
-You are a Task Complexity Assessment Agent. Based on the user query and context below, create a CognitiveAssessment object.
-
-## User Query: "{user_query}"
-
-## User Context:
-- User Level: {user_level}
-- User Capability Threshold: {user_capability_threshold}
-- SQL Expertise: {user_profile.sql_expertise_level}/5
-- Cognitive Load Capacity: {user_profile.cognitive_load_capacity}/5
-
-## Instructions:
-Create a CognitiveAssessment with these exact values:
-
-1. **intrinsic_load**: Calculate based on query complexity (1-10 scale)
-   - Simple queries (show, list): 1-3
-   - Medium queries (analyze, compare): 4-6  
-   - Complex queries (forecast, model): 7-10
-
-2. **task_sql_concept**: "data_analysis" for business queries
-
-3. **explanation_needed**: true if intrinsic_load > user_capability_threshold, false otherwise
-
-4. **explanation_type**: "basic" if explanation_needed, "none" otherwise
-
-5. **reasoning**: Brief explanation of your assessment
-
-6. **task_classification**: "Data Analysis"
-
-7. **complexity_breakdown**: Create a dictionary with:
-   - "data_dimensionality": intrinsic_load * 0.3
-   - "analytical_complexity": intrinsic_load * 0.4
-   - "presentation_complexity": intrinsic_load * 0.2
-   - "temporal_pressure": intrinsic_load * 0.1
-   - "intrinsic_load": same as intrinsic_load above
-   - "cft_misfit_penalty": 0.0
-   - "final_complexity_score": same as intrinsic_load
-
-8. **user_capability_threshold**: {user_capability_threshold}
-
-9. **final_complexity_score**: same as intrinsic_load
-
-## Response Format:
-Return ONLY a valid JSON object with these exact field names and values.
-"""
-
-            # Get LLM assessment with clear instructions
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=800,
-                temperature=0.1,
-                messages=[
-                    {"role": "system", "content": "You are a JSON response agent. Return ONLY valid JSON with the exact field names specified. No additional text or formatting."},
-                    {"role": "user", "content": assessment_instructions}
-                ]
-            )
+            score = self._score_complexity(user_query, user_profile, sql_query, result_shape)
+            explanation_needed = score.explanation_needed
+            reasoning = (f"Local CLT-CFT score {score.final_complexity_score:.1f} "
+                         f"(intrinsic load {score.intrinsic_load:.1f} + misfit {score.cft_misfit_penalty:.1f}"
+                         f"{': ' + ', '.join(score.misfit_reasons) if score.misfit_reasons else ''}) "
+                         f"vs. {user_level} threshold {score.user_capability_threshold:.1f}")
             
-            # Extract and parse response
-            raw_response = response.content[0].text.strip()
-            logger.info(f"Raw LLM response: {raw_response}")
+            if COMPLEXITY_LLM_TIEBREAK and score.is_borderline():
+                if has_time_for("task_assessment"):
+                    decision = self._llm_complexity_tiebreak(user_query, user_level, score)
+                else:
+                    record_degradation("task_assessment", "local_score")
+                    decision = None
+                if decision is not None:
+                    explanation_needed = decision["explanation_needed"]
+                    reasoning += f"; borderline, LLM tie-breaker: {decision['reasoning']}"
             
-            # Clean the response and parse JSON
-            try:
-                # Remove any markdown formatting
-                if raw_response.startswith('```json'):
-                    raw_response = raw_response.replace('```json', '').replace('```', '').strip()
-                elif raw_response.startswith('```'):
-                    raw_response = raw_response.replace('```', '').strip()
-                
-                assessment_data = json.loads(raw_response)
-                
-                # Create CognitiveAssessment object directly
-                assessment = CognitiveAssessment(
-                    intrinsic_load=float(assessment_data.get("intrinsic_load", 5.0)),
-                    task_sql_concept=assessment_data.get("task_sql_concept", "data_analysis"),
-                    explanation_needed=bool(assessment_data.get("explanation_needed", True)),
-                    explanation_type=assessment_data.get("explanation_type", "basic"),
-                    reasoning=assessment_data.get("reasoning", "LLM-based assessment"),
-                    task_classification=assessment_data.get("task_classification", "Data Analysis"),
-                    complexity_breakdown=assessment_data.get("complexity_breakdown", {
-                        "data_dimensionality": 5.0,
-                        "analytical_complexity": 5.0,
-                        "presentation_complexity": 5.0,
-                        "temporal_pressure": 5.0,
-                        "intrinsic_load": 5.0,
-                        "cft_misfit_penalty": 0.0,
-                        "final_complexity_score": 5.0
-                    }),
-                    user_capability_threshold=float(assessment_data.get("user_capability_threshold", user_capability_threshold)),
-                    final_complexity_score=float(assessment_data.get("final_complexity_score", 5.0))
-                )
-                
-                return assessment
-                
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
-                logger.error(f"Failed to parse LLM response: {e}")
-                logger.error(f"Raw response: {raw_response}")
-                # Fallback to heuristic assessment
-                return self._fallback_complexity_assessment(user_query, user_profile)
+            return CognitiveAssessment(
+                intrinsic_load=score.intrinsic_load,
+                task_sql_concept=self._classify_sql_task(sql_query) if sql_query else "data_analysis",
+                explanation_needed=explanation_needed,
+                explanation_type=self._explanation_type_for_level(user_level) if explanation_needed else "none",
+                reasoning=reasoning,
+                task_classification="Data Analysis",
+                complexity_breakdown=score.breakdown(),
+                user_capability_threshold=score.user_capability_threshold,
+                final_complexity_score=score.final_complexity_score
+            )
             
         except Exception as e:
             logger.error(f"Error in task complexity assessment: {e}")
             # Fallback assessment
             return self._fallback_complexity_assessment(user_query, user_profile)
     
+    def _score_complexity(self, user_query: str, user_profile: UserProfile,
+                          sql_query: Optional[str] = None,
+                          result_shape: Optional[Tuple[int, int]] = None) -> ComplexityScore:
+        """Run the local CLT-CFT scorer for a user profile."""
+        return score_task(
+            user_query,
+            user_level=self._get_user_level_from_profile(user_profile),
+            sql_query=sql_query,
+            result_shape=result_shape,
+            sql_expertise_level=user_profile.sql_expertise_level,
+            cognitive_load_capacity=user_profile.cognitive_load_capacity,
+            preferences=user_profile.learning_preferences,
+            domain_knowledge=(user_profile.sql_concept_levels or {}).get("domain_knowledge_retail")
+        )
+    
+    def _explanation_type_for_level(self, user_level: str) -> str:
+        """Explanation depth matching a user level (same mapping as _fallback_decision)."""
+        if user_level in ("Beginner", "Novice"):
+            return "basic"
+        if user_level == "Intermediate":
+            return "intermediate"
+        return "advanced"
+    
+    def _llm_complexity_tiebreak(self, user_query: str, user_level: str,
+                                 score: ComplexityScore) -> Optional[Dict[str, Any]]:
+        """
+        Ask the LLM whether a borderline task needs an explanation.
+        
+        Returns:
+            Dict with explanation_needed and reasoning, or None if the answer is unusable
+        """
+        route = self.router.select("task_assessment")
+        while route is not None:
+            try:
+                response = self.llm.create(
+                    "task_assessment",
+                    model=route.model,
+                    max_tokens=200,
+                    temperature=0.1,
+                    system="You are a JSON response agent. Return ONLY valid JSON with the exact field names specified. No additional text or formatting.",
+                    messages=[{
+                        "role": "user",
+                        "content": f"""
+A {user_level} user (capability threshold {score.user_capability_threshold:.1f}/10) asked:
+"{user_query}"
+
+A rule-based CLT-CFT assessment scored the task at {score.final_complexity_score:.1f}/10, which is too close to the threshold to decide.
+Factor scores: {json.dumps(score.breakdown())}
+
+Does this user need an explanation of the analysis?
+Return JSON: {{"explanation_needed": true or false, "reasoning": "one sentence"}}
+"""
+                    }]
+                )
+                raw_response = response_text(response).strip()
+            except Exception as e:
+                logger.warning(f"Complexity tie-breaker failed, keeping the local score: {e}")
+                return None
+            
+            try:
+                if raw_response.startswith('```'):
+                    raw_response = raw_response.replace('```json', '').replace('```', '').strip()
+                decision = json.loads(raw_response)
+                return {
+                    "explanation_needed": bool(decision["explanation_needed"]),
+                    "reasoning": str(decision.get("reasoning", "")),
+                }
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Unusable complexity tie-breaker answer: {e}")
+                route = self.router.escalate(route, "parse_failure")
+        
+        logger.warning("Complexity tie-breaker gave no usable answer, keeping the local score")
+        return None
+    
     def _get_user_level_from_profile(self, user_profile: UserProfile) -> str:
         """Get user level from profile"""
         if hasattr(user_profile, 'user_level_category'):
             return user_profile.user_level_category
         else:
             # Fallback based on SQL expertise
-            if user_profile.sql_expertise_level <= 1:
-                return "Beginner"
-            elif user_profile.sql_expertise_level <= 2:
-                return "Novice"
-            elif user_profile.sql_expertise_level <= 3:
-                return "Intermediate"
-            elif user_profile.sql_expertise_level <= 4:
-                return "Advanced"
-            else:
-                return "Expert"
+            return user_level_for_expertise(user_profile.sql_expertise_level)
     
     def _get_capability_threshold(self, user_level: str) -> float:
         """Get capability threshold based on user level"""
-        thresholds = {
-            "Beginner": 3.0,
-            "Novice": 4.5,
-            "Intermediate": 6.5,
-            "Advanced": 8.5,
-            "Expert": 10.0
-        }
-        return thresholds.get(user_level, 5.0)
+        return CAPABILITY_THRESHOLDS.get(user_level, 5.0)
     
     def _fallback_complexity_assessment(self, user_query: str, user_profile: UserProfile) -> CognitiveAssessment:
         """Fallback complexity assessment when LLM assessment fails"""
@@ -527,13 +541,22 @@ Return ONLY a valid JSON object with these exact field names and values.
             final_complexity_score=base_complexity
         )
     
-    def _llm_based_cognitive_assessment(self, user_id: str, react_result: QueryResult) -> CognitiveAssessment:
+    def _llm_based_cognitive_assessment(self, user_id: str, react_result: QueryResult,
+                                        user_query: str = "",
+                                        before_llm_decision: Optional[Callable[[CognitiveAssessment, float], None]] = None
+                                        ) -> CognitiveAssessment:
         """
         LLM-based cognitive assessment: Let the LLM decide if explanation is needed.
         
+        The complexity breakdown is computed locally from the question, the SQL and
+        the result shape.
+        
         Args:
             user_id: User identifier
             react_result: Result from ReAct Agent
+            user_query: The user's original request
+            before_llm_decision: Called with the assessment an explanation would get and the
+                prior probability that one is needed, just before the LLM decision call
             
         Returns:
             Cognitive assessment based on LLM decision
@@ -550,13 +573,29 @@ Return ONLY a valid JSON object with these exact field names and values.
         # Classify the SQL task
         task_concept = self._classify_sql_task(react_result.sql_query)
         
-        # Use LLM to decide if explanation is needed
-        explanation_decision = self._ask_llm_for_explanation_decision(
-            user_sql_expertise=user_profile.sql_expertise_level,
-            task_complexity=intrinsic_load,
-            task_concept=task_concept,
-            sql_query=react_result.sql_query
-        )
+        result_shape = react_result.data.shape if react_result.data is not None else None
+        score = self._score_complexity(user_query, user_profile, react_result.sql_query, result_shape)
+        
+        # The trained classifier decides when it is confident; otherwise ask the LLM,
+        # or use the rules if the request deadline leaves no time for the LLM call
+        explanation_decision = self._classify_explanation_need(user_query, react_result, user_profile, result_shape)
+        if explanation_decision is None and not has_time_for("explanation_decision"):
+            record_degradation("explanation_decision", "heuristic_decision")
+            explanation_decision = self._fallback_decision(user_profile.sql_expertise_level, intrinsic_load)
+            set_span_attributes(**{"decision.source": "heuristic"})
+        if explanation_decision is None:
+            if before_llm_decision is not None:
+                before_llm_decision(
+                    self._expected_assessment(intrinsic_load, task_concept, score, user_profile),
+                    self._explanation_need_prior(user_query, react_result, user_profile, result_shape, score)
+                )
+            explanation_decision = self._ask_llm_for_explanation_decision(
+                user_sql_expertise=user_profile.sql_expertise_level,
+                task_complexity=intrinsic_load,
+                task_concept=task_concept,
+                sql_query=react_result.sql_query
+            )
+            set_span_attributes(**{"decision.source": "llm"})
         
         explanation_needed = explanation_decision["explanation_needed"]
         explanation_type = explanation_decision["explanation_type"] if explanation_needed else "none"
@@ -571,17 +610,71 @@ Return ONLY a valid JSON object with these exact field names and values.
             explanation_type=explanation_type,
             reasoning=reasoning,
             task_classification="Data Analysis",
-            complexity_breakdown={
-                "data_dimensionality": intrinsic_load * 0.3,
-                "analytical_complexity": intrinsic_load * 0.4,
-                "presentation_complexity": intrinsic_load * 0.2,
-                "temporal_pressure": intrinsic_load * 0.1,
-                "intrinsic_load": intrinsic_load,
-                "cft_misfit_penalty": 0.0,
-                "final_complexity_score": intrinsic_load
-            },
+            complexity_breakdown=score.breakdown(),
             user_capability_threshold=user_profile.sql_expertise_level * 2.0,  # Convert 1-5 scale to 2-10 scale
-            final_complexity_score=intrinsic_load
+            final_complexity_score=score.final_complexity_score
+        )
+    
+    def _classify_explanation_need(self, user_query: str, react_result: QueryResult, user_profile: UserProfile,
+                                   result_shape: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+        """
+        Predict the explanation need with the trained classifier.
+        
+        Returns:
+            Decision dict like _ask_llm_for_explanation_decision, or None if there is no
+            model or its confidence is below DATA_ASSISTANT_CLASSIFIER_MIN_CONFIDENCE
+        """
+        classifier = get_explanation_classifier()
+        if classifier is None:
+            return None
+        try:
+            features = build_features(user_query, react_result.sql_query, result_shape,
+                                      user_profile.sql_expertise_level, user_profile.cognitive_load_capacity)
+            explanation_needed, probability, confidence = classifier.predict(features)
+        except Exception as e:
+            logger.warning(f"Explanation classifier failed: {e}")
+            return None
+        set_span_attributes(**{"decision.probability": round(probability, 4),
+                               "decision.confidence": round(confidence, 4)})
+        if confidence < MIN_CONFIDENCE:
+            return None
+        
+        set_span_attributes(**{"decision.source": "classifier"})
+        user_level = user_level_for_expertise(user_profile.sql_expertise_level)
+        return {
+            "explanation_needed": explanation_needed,
+            "explanation_type": self._explanation_type_for_level(user_level) if explanation_needed else "none",
+            "reasoning": f"Classifier: P(explanation needed) = {probability:.2f} (confidence {confidence:.2f})"
+        }
+    
+    def _explanation_need_prior(self, user_query: str, react_result: QueryResult, user_profile: UserProfile,
+                                result_shape: Optional[Tuple[int, int]], score: ComplexityScore) -> float:
+        """Probability that an explanation is needed, before asking the LLM."""
+        classifier = get_explanation_classifier()
+        if classifier is not None:
+            try:
+                features = build_features(user_query, react_result.sql_query, result_shape,
+                                          user_profile.sql_expertise_level, user_profile.cognitive_load_capacity)
+                return float(classifier.predict_proba(features))
+            except Exception as e:
+                logger.warning(f"Explanation classifier failed: {e}")
+        # Without a model: logistic in the distance of the local score from the user's threshold
+        return 1.0 / (1.0 + math.exp(-score.margin))
+    
+    def _expected_assessment(self, intrinsic_load: float, task_concept: str, score: ComplexityScore,
+                             user_profile: UserProfile) -> CognitiveAssessment:
+        """The assessment an explanation would be generated for if the decision is "yes"."""
+        user_level = user_level_for_expertise(user_profile.sql_expertise_level)
+        return CognitiveAssessment(
+            intrinsic_load=intrinsic_load,
+            task_sql_concept=task_concept,
+            explanation_needed=True,
+            explanation_type=self._explanation_type_for_level(user_level),
+            reasoning="Speculative: decision pending",
+            task_classification="Data Analysis",
+            complexity_breakdown=score.breakdown(),
+            user_capability_threshold=user_profile.sql_expertise_level * 2.0,
+            final_complexity_score=score.final_complexity_score
         )
     
     def _ask_llm_for_explanation_decision(self, user_sql_expertise: int, task_complexity: int, 
@@ -626,15 +719,18 @@ Respond in this JSON format:
   "reasoning": "Brief explanation of your decision"
 }"""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1000,
-                temperature=0.1,  # Low temperature for consistent decisions
-                system=system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": f"""
+        route = self.router.select("explanation_decision", task_complexity)
+        while route is not None:
+            try:
+                response = self.llm.create_hedged(
+                    "explanation_decision",
+                    model=route.model,
+                    max_tokens=1000,
+                    temperature=0.1,  # Low temperature for consistent decisions
+                    system=system_prompt,
+                    messages=[{
+                        "role": "user",
+                        "content": f"""
 User SQL Expertise Level: {user_sql_expertise}/5
 Task Complexity Score: {task_complexity}/5
 SQL Concept Category: {task_concept}
@@ -644,32 +740,28 @@ SQL Query to Assess:
 
 Should this user receive an explanation for this query? What type of explanation would be most appropriate?
 """
-                }]
-            )
-            
-            content = ""
-            for block in response.content:
-                content += str(block)
+                    }]
+                )
+                content = response_text(response)
+            except Exception as e:
+                logger.error(f"Error calling LLM for explanation decision: {e}")
+                return self._fallback_decision(user_sql_expertise, task_complexity)
             
             # Parse the JSON response
-            import json
             try:
                 decision = json.loads(content.strip())
                 
                 # Validate response structure
                 if all(key in decision for key in ["explanation_needed", "explanation_type", "reasoning"]):
                     return decision
-                else:
-                    logger.warning(f"Invalid LLM response structure: {decision}")
-                    return self._fallback_decision(user_sql_expertise, task_complexity)
-                    
+                logger.warning(f"Invalid LLM response structure: {decision}")
             except json.JSONDecodeError as e:
                 logger.warning(f"Failed to parse LLM response as JSON: {content}, Error: {e}")
-                return self._fallback_decision(user_sql_expertise, task_complexity)
-                
-        except Exception as e:
-            logger.error(f"Error calling LLM for explanation decision: {e}")
-            return self._fallback_decision(user_sql_expertise, task_complexity)
+            
+            # Unusable answer: ask the strong model before falling back to the rules
+            route = self.router.escalate(route, "parse_failure")
+        
+        return self._fallback_decision(user_sql_expertise, task_complexity)
     
     def _fallback_decision(self, user_sql_expertise: int, task_complexity: int) -> Dict[str, Any]:
         """
@@ -703,7 +795,10 @@ Should this user receive an explanation for this query? What type of explanation
             "reasoning": reasoning
         }
 
-    def process_react_output(self, user_id: str, react_result: QueryResult, presentation_context: Optional[Dict[str, Any]] = None) -> CognitiveAssessment:
+    def process_react_output(self, user_id: str, react_result: QueryResult, presentation_context: Optional[Dict[str, Any]] = None,
+                             user_query: str = "",
+                             before_llm_decision: Optional[Callable[[CognitiveAssessment, float], None]] = None
+                             ) -> CognitiveAssessment:
         """
         Process ReAct output with LLM-based cognitive assessment.
         """
@@ -728,7 +823,7 @@ Should this user receive an explanation for this query? What type of explanation
                 final_complexity_score=5.0
             )
         
-        return self._llm_based_cognitive_assessment(user_id, react_result)
+        return self._llm_based_cognitive_assessment(user_id, react_result, user_query, before_llm_decision)
     
     def _modify_explanation_need_based_on_expertise(self, cognitive_assessment: CognitiveAssessment, 
                                                   user_profile: UserProfile) -> CognitiveAssessment:
@@ -814,8 +909,9 @@ Should this user receive an explanation for this query? What type of explanation
         # For now, we just log it
 
     def execute_query(self, user_id: str, user_query: str, presentation_context: Optional[Dict[str, Any]] = None, 
-                     include_debug_info: bool = False) -> Union[Tuple[QueryResult, Optional[ExplanationContent]], 
-                                                               Tuple[QueryResult, Optional[ExplanationContent], CognitiveAssessment, UserProfile]]:
+                     include_debug_info: bool = False, lazy_explanation: Optional[bool] = None
+                     ) -> Union[Tuple[QueryResult, Optional[ExplanationContent]], 
+                                Tuple[QueryResult, Optional[ExplanationContent], CognitiveAssessment, UserProfile]]:
         """
         Execute a natural language query using ReAct Agent with simplified cognitive assessment.
         
@@ -824,22 +920,42 @@ Should this user receive an explanation for this query? What type of explanation
             user_query: Natural language data analysis request
             presentation_context: Optional context about information presentation
             include_debug_info: If True, also returns cognitive assessment and user profile for debugging
+            lazy_explanation: Return an ExplanationHandle generating in the background instead of
+                waiting for the explanation (default: DATA_ASSISTANT_LAZY_EXPLANATIONS)
             
         Returns:
             If include_debug_info=False: Tuple of (Modified QueryResult, ExplanationContent or None)
             If include_debug_info=True: Tuple of (Modified QueryResult, ExplanationContent or None, CognitiveAssessment, UserProfile)
+            In lazy mode an ExplanationHandle takes the place of the ExplanationContent; so it
+            does when the request deadline leaves no time to generate the explanation.
         """
+        # The LLM scheduler queues this user's calls fairly against other users';
+        # the stages degrade rather than overrun the request deadline
+        with llm_user(user_id), request_deadline():
+            return self._execute_query(user_id, user_query, presentation_context, include_debug_info, lazy_explanation)
+    
+    def _execute_query(self, user_id: str, user_query: str, presentation_context: Optional[Dict[str, Any]],
+                       include_debug_info: bool, lazy_explanation: Optional[bool]):
         logger.info(f"Processing query for user {user_id}: {user_query}")
         
         try:
             # Step 1: Execute query using ReAct Agent first
-            react_result = self.react_agent.execute_query(user_query)
+            with start_span("react.execute_query"):
+                react_result = self.react_agent.execute_query(user_query)
             
             # Step 2: SQL validation removed - all queries are now allowed
             # The agent only receives instructions and does not share user information
             
             # Step 3: Simplified cognitive assessment
-            cognitive_assessment = self.process_react_output(user_id, react_result, presentation_context)
+            speculation: Dict[str, Any] = {}
+            start_speculation = partial(self._start_speculative_explanation, speculation, user_id, user_query,
+                                        react_result.sql_query) if SPECULATIVE_EXPLANATIONS else None
+            with start_span("clt.explanation_decision") as span:
+                cognitive_assessment = self.process_react_output(user_id, react_result, presentation_context, user_query,
+                                                                 before_llm_decision=start_speculation)
+                span.set_attributes(explanation_needed=cognitive_assessment.explanation_needed,
+                                    explanation_type=cognitive_assessment.explanation_type)
+                speculative_explanation = self._settle_speculation(speculation, cognitive_assessment)
             
             # Step 4: Modify QueryResult based on cognitive load (simplified)
             modified_result = self._modify_query_result_simple(react_result, cognitive_assessment, user_id)
@@ -851,19 +967,38 @@ Should this user receive an explanation for this query? What type of explanation
                     self.user_profiles[user_id] = self._create_user_profile_from_csv(user_id)
                 
                 user_profile = self.user_profiles[user_id]
-                explanation_content = self.generate_explanation(
+                generate = partial(
+                    self.generate_explanation,
                     user_query=user_query,
                     sql_query=react_result.sql_query,
                     assessment=cognitive_assessment,
                     user_profile=user_profile
                 )
-                
-                logger.info(f"Generated {cognitive_assessment.explanation_type} explanation for user {user_id}")
+                lazy = LAZY_EXPLANATIONS if lazy_explanation is None else lazy_explanation
+                if speculative_explanation is not None:
+                    # Already started while the decision was pending
+                    explanation_content = speculative_explanation if lazy else self._await_explanation(
+                        speculative_explanation)
+                    logger.info(f"Using speculative {cognitive_assessment.explanation_type} explanation for user {user_id}")
+                elif not lazy and not has_time_for("explanation_generation"):
+                    explanation_content = self._explanation_past_deadline(
+                        user_id, user_query, react_result.sql_query, cognitive_assessment, generate)
+                elif lazy:
+                    # Return the result now; the explanation is fetched when the user opens it
+                    explanation_content = ExplanationHandle(
+                        generate, owner=user_id, explanation_type=cognitive_assessment.explanation_type
+                    ).start()
+                    logger.info(f"Started {cognitive_assessment.explanation_type} explanation for user {user_id} in the background")
+                else:
+                    with start_span("clt.explanation_generation", explanation_type=cognitive_assessment.explanation_type):
+                        explanation_content = generate()
+                    logger.info(f"Generated {cognitive_assessment.explanation_type} explanation for user {user_id}")
             else:
                 logger.info(f"No explanation needed for user {user_id} - cognitive capacity sufficient")
             
             # Step 6: Log interaction
-            self._log_interaction(user_id, user_query, react_result, cognitive_assessment, explanation_content)
+            self._log_interaction(user_id, user_query, react_result, cognitive_assessment,
+                                  explanation_content if isinstance(explanation_content, ExplanationContent) else None)
             
             if include_debug_info:
                 return modified_result, explanation_content, cognitive_assessment, self.user_profiles[user_id]
@@ -910,6 +1045,65 @@ Should this user receive an explanation for this query? What type of explanation
             else:
                 return error_result, None
     
+    def _await_explanation(self, handle: ExplanationHandle) -> Union[ExplanationContent, ExplanationHandle]:
+        """The handle's explanation, or the handle itself if it is not ready by the request deadline."""
+        try:
+            return handle.result(timeout=remaining_time())
+        except FutureTimeout:
+            record_degradation("explanation_generation", "deferred_explanation")
+            return handle
+    
+    def _explanation_past_deadline(self, user_id: str, user_query: str, sql_query: str,
+                                   assessment: CognitiveAssessment,
+                                   generate: Callable[[], ExplanationContent]
+                                   ) -> Union[ExplanationContent, ExplanationHandle]:
+        """Serve a cached explanation, or defer generation to the background, when time is short."""
+        cached = get_cached_explanation(explanation_key(user_query, sql_query, assessment.explanation_type,
+                                                        assessment.task_sql_concept))
+        if cached is not None:
+            record_degradation("explanation_generation", "cached_explanation")
+            return cached
+        record_degradation("explanation_generation", "deferred_explanation")
+        return ExplanationHandle(generate, owner=user_id, explanation_type=assessment.explanation_type).start()
+    
+    def _start_speculative_explanation(self, speculation: Dict[str, Any], user_id: str, user_query: str,
+                                       sql_query: str, assessment: CognitiveAssessment, prior: float):
+        """Start generating the explanation before the decision if it is likely to be needed."""
+        set_span_attributes(**{"speculation.prior": round(prior, 4)})
+        if prior < SPECULATION_THRESHOLD:
+            return
+        speculation["handle"] = ExplanationHandle(
+            partial(self.generate_explanation, user_query=user_query, sql_query=sql_query,
+                    assessment=assessment, user_profile=self.user_profiles[user_id]),
+            owner=user_id, explanation_type=assessment.explanation_type
+        ).start()
+    
+    def _settle_speculation(self, speculation: Dict[str, Any],
+                            assessment: CognitiveAssessment) -> Optional[ExplanationHandle]:
+        """
+        Keep the speculative explanation if the decision asks for exactly that one, else discard it.
+        
+        Records the generation time that overlapped the decision call as saved, or the
+        generation time of a discarded explanation as wasted.
+        """
+        handle = speculation.get("handle")
+        if handle is None:
+            return None
+        decided_at = time.perf_counter()
+        collector = get_metrics_collector()
+        
+        if assessment.explanation_needed and assessment.explanation_type == handle.explanation_type:
+            set_span_attributes(**{"speculation.outcome": "used"})
+            handle.add_done_callback(lambda h: collector.record_speculation(
+                "used", max(0.0, min(decided_at, h.finished_at or decided_at) - h.started_at) if h.started_at else 0.0
+            ))
+            return handle
+        
+        set_span_attributes(**{"speculation.outcome": "discarded"})
+        handle.cancel()
+        handle.add_done_callback(lambda h: collector.record_speculation("discarded", h.run_seconds))
+        return None
+    
     def _modify_query_result_simple(self, react_result: QueryResult, 
                                    cognitive_assessment: CognitiveAssessment, 
                                    user_id: str) -> QueryResult:
@@ -942,17 +1136,21 @@ Should this user receive an explanation for this query? What type of explanation
         
         return modified_result
     
-    def _create_user_profile_from_csv(self, user_id: str) -> UserProfile:
-        """Create user profile from CSV data using UserManager."""
-        try:
+    def _get_user_manager(self):
+        """Return the agent's UserManager, created on first use."""
+        if getattr(self, '_user_manager', None) is None:
             # Docker-compatible imports
             try:
                 from new_data_assistant_project.src.utils.user_manager import UserManager
             except ImportError:
                 from src.utils.user_manager import UserManager
-            
-            user_manager = UserManager()
-            csv_data = user_manager.get_user_profile(user_id)
+            self._user_manager = UserManager()
+        return self._user_manager
+    
+    def _create_user_profile_from_csv(self, user_id: str) -> UserProfile:
+        """Create user profile from CSV data using UserManager."""
+        try:
+            csv_data = self._get_user_manager().get_user_profile(user_id)
             
             if csv_data:
                 # Map cognitive load capacity based on SQL expertise
@@ -1029,6 +1227,7 @@ Should this user receive an explanation for this query? What type of explanation
         
         # Use concept-specific explanation level
         concept_level = user_profile.sql_concept_levels.get(assessment.task_sql_concept, 1)
+        cache_key = explanation_key(user_query, sql_query, assessment.explanation_type, assessment.task_sql_concept)
         
         system_prompt = f"""You are an intelligent SQL tutor providing clear, easy-to-read explanations.
 
@@ -1063,8 +1262,9 @@ LEARNING_OBJECTIVES:
 [What the user should learn, separated by commas]"""
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
+            response = self.llm.create(
+                "explanation_generation",
+                model=self.router.select("explanation_generation", assessment.intrinsic_load).model,
                 max_tokens=800,
                 temperature=0.3,
                 system=system_prompt,
@@ -1081,9 +1281,7 @@ Please provide a {assessment.explanation_type} explanation for the {assessment.t
                 }]
             )
             
-            content = ""
-            for block in response.content:
-                content += str(block)
+            content = response_text(response)
             
             explanation = self._extract_section(content, "EXPLANATION:")
             sql_concepts = self._extract_list(content, "SQL_CONCEPTS:")
@@ -1092,7 +1290,7 @@ Please provide a {assessment.explanation_type} explanation for the {assessment.t
             # Clean and format the explanation for better readability
             formatted_explanation = self._format_explanation_text(explanation)
             
-            return ExplanationContent(
+            explanation_content = ExplanationContent(
                 explanation_text=formatted_explanation,
                 chain_of_thought="Simplified explanation based on cognitive capacity",
                 sql_concepts=sql_concepts,
@@ -1100,8 +1298,16 @@ Please provide a {assessment.explanation_type} explanation for the {assessment.t
                 complexity_level=assessment.explanation_type,
                 estimated_cognitive_load=assessment.intrinsic_load
             )
+            # Kept for requests that run out of time (see _explanation_past_deadline) or LLM outages
+            cache_explanation(cache_key, explanation_content)
+            return explanation_content
             
         except Exception as e:
+            if isinstance(e, CircuitOpenError):
+                # The LLM API is down: an earlier explanation of the same query is the best answer
+                cached = get_cached_explanation(cache_key)
+                if cached is not None:
+                    return cached
             logger.error(f"Error generating explanation: {e}")
             return ExplanationContent(
                 explanation_text="Sorry, I couldn't generate an explanation at this time.",
@@ -1212,8 +1418,6 @@ Please provide a {assessment.explanation_type} explanation for the {assessment.t
     
     def _update_user_profile(self, user_id: str, user_query: str, sql_query: str, assessment: CognitiveAssessment):
         """Update user profile based on interaction with simplified structure."""
-        profile = self.user_profiles[user_id]
-        
         # Add to query history
         interaction = {
             "timestamp": datetime.now().isoformat(),
@@ -1224,21 +1428,22 @@ Please provide a {assessment.explanation_type} explanation for the {assessment.t
             "explanation_type": assessment.explanation_type
         }
         
-        profile.prior_query_history.append(interaction)
-        
-        # Keep only last 10 interactions
-        profile.prior_query_history = profile.prior_query_history[-10:]
-        
-        # Update concept level if user handled high complexity well
-        if assessment.intrinsic_load >= 4 and not assessment.explanation_needed:
-            current_level = profile.sql_concept_levels.get(assessment.task_sql_concept, 1)
-            profile.sql_concept_levels[assessment.task_sql_concept] = min(5, current_level + 1)
-            logger.info(f"Increased {assessment.task_sql_concept} level to {profile.sql_concept_levels[assessment.task_sql_concept]}")
-        
-        profile.last_updated = datetime.now().isoformat()
+        def apply(profile: UserProfile):
+            profile.prior_query_history.append(interaction)
+            
+            # Keep only last 10 interactions
+            profile.prior_query_history = profile.prior_query_history[-10:]
+            
+            # Update concept level if user handled high complexity well
+            if assessment.intrinsic_load >= 4 and not assessment.explanation_needed:
+                current_level = profile.sql_concept_levels.get(assessment.task_sql_concept, 1)
+                profile.sql_concept_levels[assessment.task_sql_concept] = min(5, current_level + 1)
+                logger.info(f"Increased {assessment.task_sql_concept} level to {profile.sql_concept_levels[assessment.task_sql_concept]}")
+            
+            profile.last_updated = datetime.now().isoformat()
         
-        # Save updated profiles
-        self._save_user_profiles()
+        # Save updated profile, re-applied to the latest version if another worker saved it first
+        self.user_profiles.update(user_id, apply, reason="interaction")
     
     def evaluate_explanation_effectiveness(self, user_id: str, user_feedback: Dict[str, Any]) -> Dict[str, Any]:
         """
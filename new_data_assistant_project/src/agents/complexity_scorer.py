@@ -0,0 +1,351 @@
+"""
+Local CLT-CFT task complexity scoring.
+
+Implements the formula from the CLT-CFT assessment framework
+(``CLTCFTAgent.task_complexity_assessment_prompt``) without an LLM round trip:
+
+    intrinsic_load = data_dimensionality * 0.3 + analytical_complexity * 0.4
+                     + presentation_complexity * 0.2 + temporal_pressure * 0.1
+    final_score    = intrinsic_load + cft_misfit_penalty (capped at 3)
+
+The factors (1-10 each) are derived from the question text and, once the query
+has run, from the parsed SQL and the shape of the result. Misfit penalties come
+from the user profile. Scoring is pure Python with precompiled patterns and takes
+microseconds. Scores within ``TIEBREAK_MARGIN`` of the user's capability threshold
+are flagged as borderline, so the caller can optionally ask the LLM to decide.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+# Weights of the intrinsic load formula
+WEIGHTS = {
+    "data_dimensionality": 0.3,
+    "analytical_complexity": 0.4,
+    "presentation_complexity": 0.2,
+    "temporal_pressure": 0.1,
+}
+MAX_MISFIT_PENALTY = 3.0
+
+# Capability thresholds per user level (Phase 4 of the framework)
+CAPABILITY_THRESHOLDS = {
+    "Beginner": 3.0,
+    "Novice": 4.5,
+    "Intermediate": 6.5,
+    "Advanced": 8.5,
+    "Expert": 10.0,
+}
+
+# Scores this close to the threshold are borderline (LLM tie-breaker, if enabled)
+TIEBREAK_MARGIN = float(os.getenv("DATA_ASSISTANT_COMPLEXITY_TIEBREAK_MARGIN", "0.5"))
+
+# Question vocabulary
+_TIME_SERIES_TERMS = re.compile(r"\b(trend|trends|growth|over time|seasonal\w*|monthly|yearly|annual\w*|"
+                                r"quarter\w*|year[- ]over[- ]year|historical|timeline\w*|20\d\d)\b", re.I)
+_MODELING_TERMS = re.compile(r"\b(forecast\w*|predict\w*|projection\w*|model\w*|regression|correlat\w*|"
+                             r"scenario\w*|roi|return on investment)\b", re.I)
+_RATIO_TERMS = re.compile(r"\b(margin\w*|ratio\w*|rate\w*|percent\w*|share|average|per|profitab\w*|"
+                          r"compare|comparison|versus|vs)\b", re.I)
+_INFERENTIAL_TERMS = re.compile(r"\b(correlat\w*|significan\w*|compare|comparison|versus|vs|segment\w*|"
+                                r"drivers?|factors?|growth)\b", re.I)
+_PATTERN_TERMS = re.compile(r"\b(pattern\w*|identify|why|drivers?|factors?|characteristics|segment\w*)\b", re.I)
+_INSIGHT_TERMS = re.compile(r"\b(strateg\w*|recommend\w*|insight\w*|strengths?|weakness\w*|risks?|"
+                            r"roi|return on investment|what does this mean)\b", re.I)
+_DIMENSION_TERMS = re.compile(r"\b(categor\w*|sub-?categor\w*|regions?|segments?|customers?|products?|"
+                              r"states?|cit(?:y|ies)|ship(?:ping)? modes?|years?|months?|orders?)\b", re.I)
+_REPORT_TERMS = re.compile(r"\b(report|dashboard|scenarios?|strategy|plan|overview)\b", re.I)
+_CHART_TERMS = re.compile(r"\b(chart|plot|graph|visuali[sz]\w*|map|trend\w*|distribution)\b", re.I)
+_CRITICAL_TERMS = re.compile(r"\b(urgent\w*|immediate\w*|critical|real[- ]time|asap|now)\b", re.I)
+_IMPORTANT_TERMS = re.compile(r"\b(decision\w*|strateg\w*|invest\w*|market entry|expansion|prioriti[sz]e|"
+                              r"targets?)\b", re.I)
+_DOMAIN_TERMS = re.compile(r"\b(margin\w*|roi|return on investment|profitab\w*|market (?:entry|potential|position)|"
+                           r"segment\w*|forecast\w*|revenue targets?)\b", re.I)
+_ILL_DEFINED_TERMS = re.compile(r"\b(overview|strateg\w*|what risks|insights?|patterns?|identify|"
+                                r"strengths?|weakness\w*|develop)\b", re.I)
+
+# SQL structure
+_SQL_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w.]*)", re.I)
+_SQL_JOINS = re.compile(r"\bJOIN\b", re.I)
+_SQL_SELECTS = re.compile(r"\bSELECT\b", re.I)
+_SQL_AGGREGATES = re.compile(r"\b(SUM|COUNT|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(", re.I)
+_SQL_GROUP_BY = re.compile(r"\bGROUP\s+BY\s+(.+?)(?=\bHAVING\b|\bORDER\s+BY\b|\bLIMIT\b|\)|;|$)", re.I | re.S)
+_SQL_WINDOW = re.compile(r"\bOVER\s*\(", re.I)
+_SQL_CTE = re.compile(r"^\s*WITH\b", re.I)
+_SQL_CASE = re.compile(r"\bCASE\b", re.I)
+_SQL_SET_OPS = re.compile(r"\b(UNION|INTERSECT|EXCEPT)\b", re.I)
+_SQL_HAVING = re.compile(r"\bHAVING\b", re.I)
+_SQL_DIVISION = re.compile(r"[\w)]\s*/\s*[\w(]")
+_SQL_DATE = re.compile(r"\b(strftime|date|julianday|substr\s*\(\s*\w*date|\w*_date\b|year|month)", re.I)
+_SQL_STRINGS = re.compile(r"'(?:[^']|'')*'")
+
+
+def user_level_for_expertise(sql_expertise_level: int) -> str:
+    """User level implied by a 1-5 SQL expertise rating."""
+    if sql_expertise_level <= 1:
+        return "Beginner"
+    if sql_expertise_level <= 2:
+        return "Novice"
+    if sql_expertise_level <= 3:
+        return "Intermediate"
+    if sql_expertise_level <= 4:
+        return "Advanced"
+    return "Expert"
+
+
+@dataclass
+class SqlFeatures:
+    """Structural features of a SQL query."""
+    tables: int = 0
+    joins: int = 0
+    subqueries: int = 0
+    aggregates: int = 0
+    group_by_columns: int = 0
+    select_columns: int = 0
+    window_functions: int = 0
+    ctes: bool = False
+    case_expressions: int = 0
+    set_operations: int = 0
+    having: bool = False
+    ratios: bool = False
+    temporal: bool = False
+
+
+@dataclass
+class ComplexityScore:
+    """Factor scores, intrinsic load and CFT-adjusted final score of a task."""
+    data_dimensionality: float
+    analytical_complexity: float
+    presentation_complexity: float
+    temporal_pressure: float
+    intrinsic_load: float
+    cft_misfit_penalty: float
+    final_complexity_score: float
+    user_capability_threshold: float
+    misfit_reasons: Tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def explanation_needed(self) -> bool:
+        return self.final_complexity_score > self.user_capability_threshold
+
+    @property
+    def margin(self) -> float:
+        """Distance of the final score from the capability threshold."""
+        return self.final_complexity_score - self.user_capability_threshold
+
+    def is_borderline(self, margin: float = TIEBREAK_MARGIN) -> bool:
+        return abs(self.margin) <= margin
+
+    def breakdown(self) -> Dict[str, float]:
+        """The complexity_breakdown dict of a CognitiveAssessment."""
+        return {
+            "data_dimensionality": self.data_dimensionality,
+            "analytical_complexity": self.analytical_complexity,
+            "presentation_complexity": self.presentation_complexity,
+            "temporal_pressure": self.temporal_pressure,
+            "intrinsic_load": self.intrinsic_load,
+            "cft_misfit_penalty": self.cft_misfit_penalty,
+            "final_complexity_score": self.final_complexity_score,
+        }
+
+
+def _clamp(value: float, low: float = 1.0, high: float = 10.0) -> float:
+    return round(max(low, min(high, value)), 2)
+
+
+def _select_list(sql: str) -> str:
+    """Text between the outermost SELECT and its FROM."""
+    match = re.search(r"\bSELECT\b(.*?)\bFROM\b", sql, re.I | re.S)
+    return match.group(1) if match else ""
+
+
+def _count_top_level_items(text: str) -> int:
+    """Number of comma-separated items, ignoring commas inside parentheses."""
+    if not text.strip():
+        return 0
+    depth, items = 0, 1
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items += 1
+    return items
+
+
+def parse_sql_features(sql: Optional[str]) -> SqlFeatures:
+    """Extract structural features from a SQL query (string literals are ignored)."""
+    if not sql:
+        return SqlFeatures()
+    sql = _SQL_STRINGS.sub("''", sql)
+    group_by = _SQL_GROUP_BY.search(sql)
+    return SqlFeatures(
+        tables=len({table.lower() for table in _SQL_TABLES.findall(sql)}),
+        joins=len(_SQL_JOINS.findall(sql)),
+        subqueries=max(0, len(_SQL_SELECTS.findall(sql)) - 1),
+        aggregates=len(_SQL_AGGREGATES.findall(sql)),
+        group_by_columns=_count_top_level_items(group_by.group(1)) if group_by else 0,
+        select_columns=_count_top_level_items(_select_list(sql)),
+        window_functions=len(_SQL_WINDOW.findall(sql)),
+        ctes=bool(_SQL_CTE.search(sql)),
+        case_expressions=len(_SQL_CASE.findall(sql)),
+        set_operations=len(_SQL_SET_OPS.findall(sql)),
+        having=bool(_SQL_HAVING.search(sql)),
+        ratios=bool(_SQL_DIVISION.search(sql)),
+        temporal=bool(_SQL_DATE.search(sql)),
+    )
+
+
+def _data_dimensionality(question: str, sql: SqlFeatures) -> float:
+    # Variables/dimensions: 1-2 low, 3-5 medium, 6+ high
+    dimensions = max(sql.group_by_columns + max(0, sql.select_columns - sql.group_by_columns) // 2,
+                     len(set(match.lower() for match in _DIMENSION_TERMS.findall(question))))
+    if dimensions <= 2:
+        score = 1.0 + dimensions
+    elif dimensions <= 5:
+        score = 4.0 + (dimensions - 3)
+    else:
+        score = 7.0 + min(dimensions - 6, 3)
+    # Data relationships
+    score += min(sql.joins, 2) + (1 if sql.tables > 1 and not sql.joins else 0)
+    # Temporal elements: time series +2, multi-period +3
+    periods = len(re.findall(r"20\d\d", question))
+    if periods >= 2:
+        score += 3
+    elif sql.temporal or _TIME_SERIES_TERMS.search(question):
+        score += 2
+    return _clamp(score)
+
+
+def _analytical_complexity(question: str, sql: SqlFeatures) -> float:
+    """Mean of the three sub-scores of the framework (each 1-10)."""
+    modeling = bool(_MODELING_TERMS.search(question))
+    # Statistical concepts: descriptive 1-3, inferential 4-6, advanced 7-10
+    if modeling:
+        statistical = 8.0
+    elif _INFERENTIAL_TERMS.search(question):
+        statistical = 5.0
+    else:
+        statistical = 2.0
+    # Calculation complexity: aggregation 1-3, ratios 4-6, modeling 7-10
+    if modeling or sql.window_functions or sql.ctes:
+        calculation = 7.0 + min(sql.window_functions + sql.subqueries + int(sql.ctes), 3)
+    elif sql.ratios or _RATIO_TERMS.search(question) or sql.case_expressions or sql.subqueries:
+        calculation = 4.0 + min(sql.case_expressions + sql.subqueries + int(sql.having), 2)
+    else:
+        calculation = 1.0 + min(sql.aggregates, 2) + min(sql.set_operations, 1)
+    # Interpretation depth: trends 1-3, patterns 4-6, insights 7-10
+    if _INSIGHT_TERMS.search(question):
+        interpretation = 8.0
+    elif _PATTERN_TERMS.search(question):
+        interpretation = 5.0
+    else:
+        interpretation = 2.0
+    return _clamp((statistical + calculation + interpretation) / 3)
+
+
+def _presentation_complexity(question: str, result_shape: Optional[Tuple[int, int]]) -> float:
+    # Output format: single metric 1-3, table/dashboard 4-6, report 7-10
+    if result_shape is not None:
+        rows, columns = result_shape
+        if rows <= 1 and columns <= 2:
+            score = 2.0
+        elif rows <= 20 and columns <= 4:
+            score = 3.0
+        elif rows <= 100 and columns <= 6:
+            score = 5.0
+        else:
+            score = 7.0
+    else:
+        score = 3.0
+    if _CHART_TERMS.search(question):
+        score = max(score, 5.0)
+    if _REPORT_TERMS.search(question):
+        score += 2.0
+    return _clamp(score)
+
+
+def _temporal_pressure(question: str) -> float:
+    # Decision urgency: routine 1-3, important 4-6, critical 7-10
+    if _CRITICAL_TERMS.search(question):
+        return 8.0
+    if _IMPORTANT_TERMS.search(question):
+        return 5.0
+    return 2.0
+
+
+def _misfit_penalty(question: str, user_level: str, sql_expertise_level: int,
+                    cognitive_load_capacity: int, preferences: Dict[str, Any],
+                    domain_knowledge: Optional[int]) -> Tuple[float, Tuple[str, ...]]:
+    """CFT misfit penalties of the framework, capped at MAX_MISFIT_PENALTY."""
+    penalty, reasons = 0.0, []
+    representation = str(preferences.get("representation", "")).lower()
+    if _CHART_TERMS.search(question) and representation in ("symbolic", "table", "tabular"):
+        penalty += 2
+        reasons.append("spatial task, symbolic preference")
+    lacks_domain = domain_knowledge <= 1 if domain_knowledge is not None else sql_expertise_level <= 2
+    if _DOMAIN_TERMS.search(question) and lacks_domain:
+        penalty += 3
+        reasons.append("domain knowledge required")
+    needs_structure = (user_level in ("Beginner", "Novice")
+                       or preferences.get("explanation_style") == "step_by_step")
+    if _ILL_DEFINED_TERMS.search(question) and needs_structure:
+        penalty += 2
+        reasons.append("ill-defined goal, user needs structure")
+    if _CRITICAL_TERMS.search(question) and cognitive_load_capacity <= 2:
+        penalty += 1
+        reasons.append("real-time decision, user prefers deliberation")
+    return min(penalty, MAX_MISFIT_PENALTY), tuple(reasons)
+
+
+def score_task(question: str, user_level: str, sql_query: Optional[str] = None,
+               result_shape: Optional[Tuple[int, int]] = None, sql_expertise_level: int = 3,
+               cognitive_load_capacity: int = 3, preferences: Optional[Dict[str, Any]] = None,
+               domain_knowledge: Optional[int] = None) -> ComplexityScore:
+    """
+    Score a task with the CLT-CFT formula.
+
+    Args:
+        question: The user's natural-language request
+        user_level: Beginner, Novice, Intermediate, Advanced or Expert
+        sql_query: Generated SQL, if already known
+        result_shape: (rows, columns) of the result, if already executed
+        sql_expertise_level: Profile SQL expertise (1-5)
+        cognitive_load_capacity: Profile working-memory capacity (1-5)
+        preferences: Profile learning preferences (explanation_style, representation)
+        domain_knowledge: Retail domain assessment score (0-4), if known
+
+    Returns:
+        ComplexityScore with all factors, the final score and the capability threshold
+    """
+    question = question or ""
+    sql = parse_sql_features(sql_query)
+    factors = {
+        "data_dimensionality": _data_dimensionality(question, sql),
+        "analytical_complexity": _analytical_complexity(question, sql),
+        "presentation_complexity": _presentation_complexity(question, result_shape),
+        "temporal_pressure": _temporal_pressure(question),
+    }
+    intrinsic_load = round(sum(factors[name] * weight for name, weight in WEIGHTS.items()), 2)
+    penalty, reasons = _misfit_penalty(question, user_level, sql_expertise_level, cognitive_load_capacity,
+                                       preferences or {}, domain_knowledge)
+    return ComplexityScore(
+        intrinsic_load=intrinsic_load,
+        cft_misfit_penalty=penalty,
+        final_complexity_score=_clamp(intrinsic_load + penalty),
+        user_capability_threshold=CAPABILITY_THRESHOLDS.get(user_level, 5.0),
+        misfit_reasons=reasons,
+        **factors,
+    )
+
+
+def estimate_sql_complexity(question: str) -> int:
+    """
+    Expected complexity of the SQL for a question, before any SQL exists.
+
+    On the ReAct agent's 1-5 scale; used to pick the model for SQL generation.
+    """
+    intrinsic_load = score_task(question, "Intermediate").intrinsic_load
+    return max(1, min(5, round(intrinsic_load)))
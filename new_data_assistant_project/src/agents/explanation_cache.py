@@ -0,0 +1,53 @@
+"""
+In-memory cache of generated explanations.
+
+Explanations are kept per question, SQL, explanation type and SQL concept (the
+inputs of the explanation prompt; case and whitespace are normalized). The agent
+normally generates a fresh explanation for every answer and only serves one from
+here when the request is running out of time (see ``src/utils/deadline.py``) or
+the LLM circuit is open (see ``circuit_breaker``).
+The cache is a per-process LRU of ``DATA_ASSISTANT_EXPLANATION_CACHE_SIZE``
+entries; hits and misses are recorded in the metrics collector as
+``explanations``.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+
+CACHE_SIZE = int(os.getenv("DATA_ASSISTANT_EXPLANATION_CACHE_SIZE", "256"))
+
+_cache: "OrderedDict[Tuple[str, str, str, str], Any]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip().rstrip(";")).lower()
+
+
+def explanation_key(user_query: str, sql_query: str, explanation_type: str,
+                    task_sql_concept: str) -> Tuple[str, str, str, str]:
+    return _normalize(user_query), _normalize(sql_query), explanation_type, task_sql_concept
+
+
+def get_cached_explanation(key: Tuple[str, str, str, str]) -> Optional[Any]:
+    """The cached ExplanationContent for key, or None."""
+    with _cache_lock:
+        explanation = _cache.get(key)
+        if explanation is not None:
+            _cache.move_to_end(key)
+    get_metrics_collector().record_cache_access("explanations", hit=explanation is not None)
+    return explanation
+
+
+def cache_explanation(key: Tuple[str, str, str, str], explanation: Any):
+    with _cache_lock:
+        _cache[key] = explanation
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
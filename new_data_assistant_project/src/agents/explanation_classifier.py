@@ -0,0 +1,285 @@
+"""
+Learned explanation-need classifier.
+
+A logistic regression (NumPy, L2-regularised, fitted by Newton/IRLS) over profile,
+complexity and SQL features predicts whether a user needs an explanation for a
+query. It is trained offline from the labels the study collects:
+
+- ``prediction_accuracy.actual_explanation_needed`` (latest row per session)
+- otherwise ``explanation_feedback``: ``was_needed`` when an explanation was
+  given, ``would_have_been_needed`` when it was not
+
+Retrain with::
+
+    python -m new_data_assistant_project.src.agents.explanation_classifier --db <app db>
+
+The model is saved as JSON (``DATA_ASSISTANT_EXPLANATION_MODEL``). The agent
+loads it in-process and uses its prediction when the confidence (probability of
+the predicted class) reaches ``DATA_ASSISTANT_CLASSIFIER_MIN_CONFIDENCE``. Only
+below that does it ask the LLM.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.agents.complexity_scorer import parse_sql_features, score_task, user_level_for_expertise
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parents[2] / "data" / "models" / "explanation_need.json"
+MODEL_PATH = Path(os.getenv("DATA_ASSISTANT_EXPLANATION_MODEL", str(DEFAULT_MODEL_PATH)))
+MIN_CONFIDENCE = float(os.getenv("DATA_ASSISTANT_CLASSIFIER_MIN_CONFIDENCE", "0.7"))
+# Below this many labelled sessions no model is written
+MIN_TRAINING_SAMPLES = 30
+MODEL_VERSION = 1
+
+FEATURE_NAMES = (
+    "sql_expertise_level",
+    "cognitive_load_capacity",
+    "data_dimensionality",
+    "analytical_complexity",
+    "presentation_complexity",
+    "temporal_pressure",
+    "cft_misfit_penalty",
+    "capability_margin",
+    "sql_joins",
+    "sql_subqueries",
+    "sql_aggregates",
+    "sql_group_by_columns",
+    "sql_window_functions",
+    "sql_ctes",
+    "sql_case_expressions",
+    "sql_ratios",
+    "sql_temporal",
+    "log_result_rows",
+    "result_columns",
+)
+
+# Labelled sessions: prediction_accuracy wins over explanation_feedback
+_TRAINING_QUERY = """
+    SELECT cs.user_message, cs.sql_query, u.sql_expertise_level, u.cognitive_load_capacity,
+           qr.row_count, qr.column_count,
+           COALESCE(pa.actual_explanation_needed,
+                    CASE WHEN ef.explanation_given THEN ef.was_needed ELSE ef.would_have_been_needed END) AS label
+    FROM chat_sessions cs
+    JOIN users u ON u.id = cs.user_id
+    LEFT JOIN query_results qr ON qr.id = cs.result_id
+    LEFT JOIN prediction_accuracy pa ON pa.id = (
+        SELECT MAX(id) FROM prediction_accuracy WHERE session_id = cs.id)
+    LEFT JOIN explanation_feedback ef ON ef.id = (
+        SELECT MAX(id) FROM explanation_feedback WHERE session_id = cs.id)
+    WHERE label IS NOT NULL
+    ORDER BY cs.id
+"""
+
+
+def build_features(question: str, sql_query: Optional[str], result_shape: Optional[Tuple[int, int]],
+                   sql_expertise_level: int, cognitive_load_capacity: int) -> np.ndarray:
+    """Feature vector in FEATURE_NAMES order (used for training and serving alike)."""
+    score = score_task(question or "", user_level_for_expertise(sql_expertise_level), sql_query=sql_query,
+                       result_shape=result_shape, sql_expertise_level=sql_expertise_level,
+                       cognitive_load_capacity=cognitive_load_capacity)
+    sql = parse_sql_features(sql_query)
+    rows, columns = result_shape if result_shape is not None else (0, 0)
+    return np.array([
+        sql_expertise_level, cognitive_load_capacity,
+        score.data_dimensionality, score.analytical_complexity, score.presentation_complexity,
+        score.temporal_pressure, score.cft_misfit_penalty, score.margin,
+        sql.joins, sql.subqueries, sql.aggregates, sql.group_by_columns, sql.window_functions,
+        float(sql.ctes), sql.case_expressions, float(sql.ratios), float(sql.temporal),
+        math.log1p(rows), columns,
+    ], dtype=float)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class ExplanationNeedClassifier:
+    """Standardised logistic regression with an intercept."""
+
+    def __init__(self, weights: np.ndarray, bias: float, mean: np.ndarray, scale: np.ndarray,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: np.ndarray, l2: float = 1.0, iterations: int = 50) -> 'ExplanationNeedClassifier':
+        """Fit by Newton/IRLS; l2 penalises the weights but not the intercept."""
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = np.hstack([np.ones((len(X), 1)), (X - mean) / scale])
+        penalty = np.eye(Z.shape[1]) * l2
+        penalty[0, 0] = 0.0
+        theta = np.zeros(Z.shape[1])
+        for _ in range(iterations):
+            p = _sigmoid(Z @ theta)
+            gradient = Z.T @ (p - y) + penalty @ theta
+            hessian = (Z * (p * (1 - p))[:, None]).T @ Z + penalty + np.eye(Z.shape[1]) * 1e-9
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.max(np.abs(step)) < 1e-8:
+                break
+        return cls(theta[1:], theta[0], mean, scale)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probability that an explanation is needed, for one vector or a matrix of them."""
+        return _sigmoid(((np.asarray(X, dtype=float) - self.mean) / self.scale) @ self.weights + self.bias)
+
+    def predict(self, features: np.ndarray) -> Tuple[bool, float, float]:
+        """(explanation_needed, probability, confidence) for one feature vector."""
+        probability = float(self.predict_proba(features))
+        return probability >= 0.5, probability, max(probability, 1.0 - probability)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": MODEL_VERSION,
+            "features": list(FEATURE_NAMES),
+            "weights": self.weights.tolist(),
+            "bias": self.bias,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "metadata": self.metadata,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExplanationNeedClassifier':
+        if data.get("version") != MODEL_VERSION or tuple(data.get("features", ())) != FEATURE_NAMES:
+            raise ValueError("Model was trained with a different feature set; retrain it")
+        return cls(np.array(data["weights"]), data["bias"], np.array(data["mean"]),
+                   np.array(data["scale"]), data.get("metadata"))
+
+    def save(self, path: Path = MODEL_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+_cached: Optional[Tuple[Tuple[str, float], Optional[ExplanationNeedClassifier]]] = None
+_cache_lock = threading.Lock()
+
+
+def get_explanation_classifier(path: Path = MODEL_PATH) -> Optional[ExplanationNeedClassifier]:
+    """The trained model, or None if there is none; reloaded when the file changes."""
+    global _cached
+    path = Path(path)
+    try:
+        key = (str(path), path.stat().st_mtime)
+    except OSError:
+        return None
+    with _cache_lock:
+        if _cached is not None and _cached[0] == key:
+            return _cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                model = ExplanationNeedClassifier.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load explanation classifier from {path}: {e}")
+            model = None
+        _cached = (key, model)
+        return model
+
+
+# Offline training
+
+def load_training_data(db_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Feature matrix and labels of every labelled chat session."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(_TRAINING_QUERY).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Could not load training data: {e}")
+        rows = []
+    finally:
+        conn.close()
+    X = [build_features(message, sql, (row_count, column_count) if row_count is not None else None,
+                        expertise or 2, capacity or 3)
+         for message, sql, expertise, capacity, row_count, column_count, _ in rows]
+    y = [float(bool(label)) for *_, label in rows]
+    return np.array(X).reshape(len(X), len(FEATURE_NAMES)), np.array(y)
+
+
+def cross_validate(X: np.ndarray, y: np.ndarray, folds: int = 5, l2: float = 1.0,
+                   seed: int = 0) -> Dict[str, float]:
+    """Accuracy, log loss and the coverage/accuracy of confident predictions."""
+    order = np.random.default_rng(seed).permutation(len(y))
+    probabilities = np.empty(len(y))
+    for fold in np.array_split(order, folds):
+        train = np.setdiff1d(order, fold)
+        probabilities[fold] = ExplanationNeedClassifier.fit(X[train], y[train], l2).predict_proba(X[fold])
+    clipped = np.clip(probabilities, 1e-6, 1 - 1e-6)
+    predictions = probabilities >= 0.5
+    confident = np.maximum(probabilities, 1 - probabilities) >= MIN_CONFIDENCE
+    return {
+        "accuracy": float(np.mean(predictions == y)),
+        "log_loss": float(-np.mean(y * np.log(clipped) + (1 - y) * np.log(1 - clipped))),
+        "confident_share": float(np.mean(confident)),
+        "confident_accuracy": float(np.mean(predictions[confident] == y[confident])) if confident.any() else None,
+    }
+
+
+def train(db_path: str, output: Path = MODEL_PATH, l2: float = 1.0, folds: int = 5,
+          min_samples: int = MIN_TRAINING_SAMPLES) -> Optional[ExplanationNeedClassifier]:
+    """Train on all labelled sessions and save the model (None if there is too little data)."""
+    X, y = load_training_data(db_path)
+    if len(y) < min_samples or len(set(y.tolist())) < 2:
+        logger.warning(f"Only {len(y)} labelled sessions ({int(y.sum())} positive); need {min_samples} "
+                       f"with both classes, no model written")
+        return None
+    metrics = cross_validate(X, y, min(folds, len(y)), l2)
+    model = ExplanationNeedClassifier.fit(X, y, l2)
+    model.metadata = {
+        "trained_at": datetime.now().isoformat(),
+        "samples": int(len(y)),
+        "positive_rate": float(y.mean()),
+        "l2": l2,
+        "cross_validation": metrics,
+    }
+    model.save(output)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the explanation-need classifier from collected feedback")
+    parser.add_argument("--db", required=True, help="App database with chat sessions and feedback")
+    parser.add_argument("--output", default=str(MODEL_PATH), help="Where to write the model JSON")
+    parser.add_argument("--l2", type=float, default=1.0, help="L2 regularisation strength")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--min-samples", type=int, default=MIN_TRAINING_SAMPLES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model = train(args.db, Path(args.output), args.l2, args.folds, args.min_samples)
+    if model is None:
+        print("❌ Not enough labelled data, no model written")
+        return
+    metadata = model.metadata
+    cv = metadata["cross_validation"]
+    print(f"✅ Trained on {metadata['samples']} sessions ({metadata['positive_rate']:.0%} needed an explanation)")
+    print(f"  CV accuracy {cv['accuracy']:.1%}, log loss {cv['log_loss']:.3f}")
+    if cv["confident_accuracy"] is not None:
+        print(f"  {cv['confident_share']:.0%} of predictions reach confidence {MIN_CONFIDENCE:.2f} "
+              f"(accuracy {cv['confident_accuracy']:.1%}); the rest go to the LLM")
+    print(f"💾 Model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Hedged LLM requests against tail latency.
+
+With ``DATA_ASSISTANT_LLM_HEDGING=1``, ``LLMClient.create_hedged`` sends the
+request and, if no answer has arrived after the stage's recent p90 latency
+(``DATA_ASSISTANT_HEDGE_PERCENTILE``, from the ``llm.<stage>`` spans of the last
+15 minutes), sends a duplicate. The first successful response wins; the other
+one finishes in the background and is discarded (it is still accounted in
+``llm_calls``).
+
+Extra spend is capped: hedges may be at most ``DATA_ASSISTANT_HEDGE_BUDGET``
+(default 0.1) of all hedgeable calls, and no hedging happens until a stage has
+``DATA_ASSISTANT_HEDGE_MIN_SAMPLES`` latency samples. Each hedgeable call is
+traced as a ``hedge.<stage>`` span with the outcome in ``hedge.outcome``
+(not_needed, over_budget, won, lost, failed); the metrics collector counts the
+outcomes per stage (``hedge_stats``).
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+HEDGING = os.getenv("DATA_ASSISTANT_LLM_HEDGING", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("DATA_ASSISTANT_HEDGE_PERCENTILE", "90"))
+HEDGE_BUDGET = float(os.getenv("DATA_ASSISTANT_HEDGE_BUDGET", "0.1"))
+HEDGE_MIN_SAMPLES = int(os.getenv("DATA_ASSISTANT_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW_SECONDS = 15 * 60
+HEDGE_WORKERS = 32
+
+
+class HedgeBudget:
+    """Allows at most ratio hedges per hedgeable call."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET):
+        self.ratio = ratio
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def note_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+_budget = HedgeBudget()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _submit(call: Callable[[], Any]) -> Future:
+    """Run call on the hedging pool in a copy of the caller's context (trace, LLM user)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+    return _executor.submit(contextvars.copy_context().run, call)
+
+
+def hedge_delay(stage: str) -> Optional[float]:
+    """Seconds after which to hedge a call of this stage, or None without enough history."""
+    samples = get_metrics_collector().latency_samples(f"llm.{stage}", HEDGE_WINDOW_SECONDS)
+    latencies = [sample.seconds for sample in samples if sample.success]
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return None
+    return float(np.percentile(latencies, HEDGE_PERCENTILE))
+
+
+def run_hedged(stage: str, call: Callable[[], Any], budget: HedgeBudget = _budget) -> Any:
+    """
+    Run call, and a duplicate of it if the first is slower than the stage's p90.
+
+    Returns:
+        The first successful result; the primary's error is raised if both fail
+    """
+    delay = hedge_delay(stage)
+    if delay is None:
+        return call()
+    budget.note_call()
+
+    collector = get_metrics_collector()
+    with start_span(f"hedge.{stage}", **{"hedge.delay_ms": round(delay * 1000, 2)}) as span:
+        primary = _submit(call)
+        try:
+            if wait([primary], timeout=delay).done:
+                result, outcome = primary.result(), "not_needed"
+            elif budget.try_spend():
+                result, outcome = _race(primary, _submit(call))
+            else:
+                result, outcome = primary.result(), "over_budget"
+        except Exception:
+            span.set_attribute("hedge.outcome", "failed")
+            collector.record_hedge(stage, "failed")
+            raise
+        span.set_attribute("hedge.outcome", outcome)
+        collector.record_hedge(stage, outcome)
+        return result
+
+
+def _race(primary: Future, hedge: Future):
+    """First successful result of two calls and whether the hedge won."""
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), "won" if future is hedge else "lost"
+    # Both failed
+    raise primary.exception()
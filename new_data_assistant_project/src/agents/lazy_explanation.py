@@ -0,0 +1,155 @@
+"""
+Lazy, background explanation generation.
+
+With ``DATA_ASSISTANT_LAZY_EXPLANATIONS=1`` the agent returns query results
+right away together with an ``ExplanationHandle`` instead of waiting for the
+explanation LLM call. The handle starts generation on a small background pool;
+the chat shows "Explanation loading…" and waits for it only when the user opens
+the explanation.
+
+Explanations nobody looks at are cancelled: a queued generation is dropped
+before it reaches the API, a running one finishes but its result is discarded.
+Handles are cancelled when the user clears the chat and once they have gone
+unviewed for ``DATA_ASSISTANT_EXPLANATION_TTL`` seconds (default 600). Opening
+a cancelled explanation simply generates it again.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.deadline import no_deadline
+from new_data_assistant_project.src.utils.tracing import current_trace_id, start_span
+
+logger = logging.getLogger(__name__)
+
+LAZY_EXPLANATIONS = os.getenv("DATA_ASSISTANT_LAZY_EXPLANATIONS", "0") == "1"
+EXPLANATION_WORKERS = int(os.getenv("DATA_ASSISTANT_EXPLANATION_WORKERS", "4"))
+UNVIEWED_TTL = float(os.getenv("DATA_ASSISTANT_EXPLANATION_TTL", "600"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_handles: List["ExplanationHandle"] = []
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPLANATION_WORKERS,
+                                           thread_name_prefix="explanation")
+        return _executor
+
+
+class ExplanationHandle:
+    """An explanation that is being generated in the background."""
+
+    def __init__(self, generate: Callable[[], Any], owner: str, explanation_type: str = ""):
+        """
+        Args:
+            generate: Produces the ExplanationContent (called on a worker thread)
+            owner: User the explanation belongs to
+            explanation_type: Type chosen by the explanation decision
+        """
+        self._generate = generate
+        self.owner = owner
+        self.explanation_type = explanation_type
+        self.request_id = current_trace_id()
+        self.created_at = time.monotonic()
+        self.viewed = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._future: Optional[Future] = None
+        self._cancelled = False
+
+    def start(self) -> "ExplanationHandle":
+        """Submit generation; the worker joins the trace of the request that created the handle."""
+        context = contextvars.copy_context()
+        self._cancelled = False
+        self._future = _get_executor().submit(context.run, self._run)
+        _register(self)
+        return self
+
+    def _run(self) -> Any:
+        self.started_at = time.perf_counter()
+        try:
+            # Runs past the request that created it, so the request's deadline does not apply
+            with no_deadline(), start_span("clt.explanation_generation",
+                                           explanation_type=self.explanation_type, background=True):
+                return self._generate()
+        finally:
+            self.finished_at = time.perf_counter()
+
+    @property
+    def run_seconds(self) -> float:
+        """How long generation ran (0 if it never started)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def add_done_callback(self, fn: Callable[["ExplanationHandle"], None]):
+        """Call fn(handle) once generation has finished or was cancelled."""
+        self._future.add_done_callback(lambda _: fn(self))
+
+    @property
+    def status(self) -> str:
+        """"loading", "ready", "failed" or "cancelled"."""
+        if self._cancelled or self._future is None or self._future.cancelled():
+            return "cancelled"
+        if not self._future.done():
+            return "loading"
+        return "failed" if self._future.exception() is not None else "ready"
+
+    def done(self) -> bool:
+        return self.status != "loading"
+
+    def mark_viewed(self):
+        self.viewed = True
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Wait for the explanation, regenerating it first if it had been cancelled."""
+        self.viewed = True
+        if self._cancelled and self._future is not None and not self._future.cancelled():
+            self._cancelled = False  # still ran to completion (or is running); keep its result
+        if self.status == "cancelled":
+            logger.info(f"Regenerating cancelled explanation for {self.owner}")
+            self.start()
+        try:
+            return self._future.result(timeout)
+        except CancelledError:
+            return None
+
+    def cancel(self) -> bool:
+        """Cancel generation unless the explanation has been viewed or is finished."""
+        if self.viewed or self._future is None or self._future.done():
+            return False
+        self._cancelled = True
+        if not self._future.cancel():
+            logger.debug(f"Explanation for {self.owner} already running; its result will be discarded")
+        return True
+
+
+def _register(handle: ExplanationHandle):
+    with _lock:
+        if handle not in _handles:
+            _handles.append(handle)
+    cancel_stale_explanations()
+
+
+def cancel_stale_explanations(max_age: float = UNVIEWED_TTL) -> int:
+    """Cancel explanations that have gone unviewed for longer than max_age seconds."""
+    now = time.monotonic()
+    with _lock:
+        stale = [handle for handle in _handles if now - handle.created_at > max_age]
+        # Finished and viewed handles need no further tracking
+        _handles[:] = [handle for handle in _handles
+                       if handle not in stale and not handle.viewed and not handle.done()]
+    cancelled = sum(1 for handle in stale if handle.cancel())
+    if cancelled:
+        logger.info(f"Cancelled {cancelled} unviewed explanation(s)")
+    return cancelled
@@ -0,0 +1,195 @@
+"""
+Instrumented wrapper around the Anthropic Messages API.
+
+All agent calls go through ``LLMClient.create(stage, **kwargs)``. Each call runs in
+an ``llm.<stage>`` tracing span, waits for admission by the ``llm_scheduler``
+(rate budgets, priorities, per-user fairness) and is retried on transient errors with
+exponential backoff. Under a request deadline (``src/utils/deadline.py``) a call is
+not started or retried once the deadline has passed, and the API timeout is the
+time left. A circuit breaker (``circuit_breaker``) rejects calls immediately while the
+API is failing or very slow. The wrapper does the retrying itself, so the retry count is
+known. Model, token usage (including prompt-cache reads and writes), latency and
+retries are then logged to the ``llm_calls`` table, and the latency per model
+tier (see ``model_router``) goes to the metrics collector. Requests are sent
+through a transport from ``llm_transport`` (live API, or record/replay of a
+cassette).
+"""
+
+import logging
+import random
+import time
+from functools import partial
+from typing import Any, Optional
+
+import anthropic
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.database.llm_calls import record_llm_call
+from new_data_assistant_project.src.agents.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from new_data_assistant_project.src.agents.hedging import HEDGING, run_hedged
+from new_data_assistant_project.src.agents.llm_transport import LiveTransport
+from new_data_assistant_project.src.agents.llm_scheduler import get_llm_scheduler
+from new_data_assistant_project.src.agents.model_router import get_model_router
+from new_data_assistant_project.src.utils.deadline import DeadlineExceeded, current_deadline, remaining_time
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import current_trace_id, record_llm_usage, start_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_SECONDS = 0.5
+
+# HTTP statuses worth retrying: timeout, conflict, rate limit, overloaded and server errors
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for connection problems, rate limits and server-side errors."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in _RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the retry-after header of a rate-limit error, if present."""
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def response_text(response: Any) -> str:
+    """Concatenate the text blocks of a Messages API response."""
+    return "".join(block.text for block in getattr(response, "content", None) or [] if hasattr(block, "text"))
+
+
+class LLMClient:
+    """LLM transport wrapper that traces, retries and accounts every call."""
+
+    def __init__(self, transport: Any, db_path: Optional[str] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_seconds: float = DEFAULT_BACKOFF_SECONDS):
+        """
+        Args:
+            transport: Object with create(**kwargs) from llm_transport; a plain
+                anthropic.Anthropic client is wrapped in a LiveTransport
+            db_path: App database for llm_calls rows (no accounting if None)
+            max_retries: Retries after the first attempt for transient errors
+            backoff_seconds: Base delay, doubled per retry with jitter
+        """
+        self.transport = transport if hasattr(transport, "create") else LiveTransport(transport)
+        self.db_path = db_path
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.scheduler = get_llm_scheduler()
+        self.breaker = get_circuit_breaker()
+
+    def create(self, stage: str, **kwargs) -> Any:
+        """
+        Call messages.create for a pipeline stage.
+
+        Args:
+            stage: Name of the calling stage (e.g. "sql_generation")
+            **kwargs: Passed to messages.create unchanged
+
+        Returns:
+            The Messages API response; the last error is raised if all attempts fail
+        """
+        model = kwargs.get("model", "unknown")
+        retries = 0
+        started = time.perf_counter()
+        with start_span(f"llm.{stage}", **{"llm.model": model}) as span:
+            while True:
+                attempt_started = attempt_timeout = None
+                try:
+                    # Fails fast while the API is known to be down
+                    self.breaker.before_call(stage)
+                    # Every attempt queues again, so retries cannot jump ahead of other users
+                    with self.scheduler.slot(stage, kwargs) as ticket:
+                        request = self._bounded(stage, kwargs)
+                        attempt_timeout = request.get("timeout")
+                        attempt_started = time.perf_counter()
+                        response = self.transport.create(**request)
+                    self.breaker.record_success(time.perf_counter() - attempt_started)
+                    break
+                except Exception as e:
+                    if isinstance(e, anthropic.RateLimitError):
+                        self.scheduler.report_rate_limited(_retry_after(e))
+                    self._report_to_breaker(e, attempt_started, attempt_timeout)
+                    delay = self.backoff_seconds * (2 ** retries) * (0.5 + random.random())
+                    remaining = remaining_time()
+                    if (retries >= self.max_retries or not is_retryable(e)
+                            or (remaining is not None and remaining <= delay)):
+                        latency_ms = (time.perf_counter() - started) * 1000
+                        span.set_attribute("llm.retries", retries)
+                        self._account(stage, model, latency_ms, None, retries, error=e)
+                        raise
+                    logger.warning(f"LLM call for {stage} failed ({e}); retrying in {delay:.1f}s")
+                    retries += 1
+                    time.sleep(delay)
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.scheduler.settle(ticket, sum(getattr(usage, name, None) or 0 for name in (
+                    "input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")))
+            record_llm_usage(response, model)
+            span.set_attribute("llm.retries", retries)
+            self._account(stage, model, latency_ms, response, retries)
+            return response
+
+    def _report_to_breaker(self, error: BaseException, attempt_started: Optional[float],
+                           attempt_timeout: Any = None):
+        """Count an error against the API only if it says the API is down or slow."""
+        if isinstance(error, CircuitOpenError):
+            return
+        if attempt_started is None:
+            # Never reached the API (request deadline, scheduler queue)
+            self.breaker.record_neutral()
+        elif isinstance(error, anthropic.APITimeoutError):
+            # The timeout is usually the time left to the request deadline (see _bounded)
+            timeout = attempt_timeout if isinstance(attempt_timeout, (int, float)) else None
+            self.breaker.record_timeout(time.perf_counter() - attempt_started, timeout)
+        elif is_retryable(error) and not isinstance(error, anthropic.RateLimitError):
+            self.breaker.record_failure(f"{type(error).__name__}: {error}")
+        else:
+            self.breaker.record_neutral()
+
+    @staticmethod
+    def _bounded(stage: str, kwargs: dict) -> dict:
+        """The request limited to the time left until the request deadline."""
+        deadline = current_deadline()
+        if deadline is None:
+            return kwargs
+        if deadline.expired:
+            raise DeadlineExceeded(f"Request deadline passed before the {stage} call")
+        return dict(kwargs, timeout=deadline.remaining())
+
+    def create_hedged(self, stage: str, **kwargs) -> Any:
+        """
+        Like create, but sends a duplicate request if the first is slower than the
+        stage's recent p90 (only with DATA_ASSISTANT_LLM_HEDGING=1; see hedging).
+        """
+        if not HEDGING:
+            return self.create(stage, **kwargs)
+        return run_hedged(stage, partial(self.create, stage, **kwargs))
+
+    def _account(self, stage: str, model: str, latency_ms: float, response: Any,
+                 retries: int, error: Optional[BaseException] = None):
+        tier = get_model_router().tier_for_model(model)
+        get_metrics_collector().record_latency(f"llm_tier.{tier}", latency_ms / 1000, success=error is None)
+        if self.db_path is None:
+            return
+        usage = getattr(response, "usage", None)
+        record_llm_call(
+            self.db_path, stage=stage, model=getattr(response, "model", None) or model,
+            latency_ms=latency_ms,
+            input_tokens=getattr(usage, "input_tokens", None) or 0,
+            output_tokens=getattr(usage, "output_tokens", None) or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+            retries=retries, success=error is None,
+            error=f"{type(error).__name__}: {error}"[:500] if error is not None else None,
+            request_id=current_trace_id()
+        )
@@ -0,0 +1,282 @@
+"""
+Central admission control for LLM calls.
+
+Every attempt made by ``LLMClient`` (retries included) waits here for a slot:
+
+- Token buckets for requests and input tokens per minute
+  (``DATA_ASSISTANT_LLM_RPM``, ``DATA_ASSISTANT_LLM_TPM``; 0 = unlimited) and a
+  cap on calls in flight (``DATA_ASSISTANT_LLM_MAX_CONCURRENCY``). Token costs are
+  estimated from the prompt and corrected with the reported usage afterwards.
+- Priority classes: interactive stages (SQL generation, decisions) are served
+  before background ones (explanations; ``DATA_ASSISTANT_LLM_BACKGROUND_STAGES``).
+- Per-user fair queuing: within a class, waiting users are served round-robin,
+  so one user's burst or retries cannot starve the others. The user comes from
+  ``llm_user()``, which the agent sets around each request.
+- A 429 from the API pauses all admissions for its retry-after time.
+
+Waits longer than ``DATA_ASSISTANT_LLM_QUEUE_TIMEOUT`` seconds, or past the
+request deadline, raise ``SchedulerTimeout``. Queue waits are recorded in the metrics collector as
+``llm_queue.<class>``; ``stats()`` reports queue depths and grants.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.deadline import current_deadline
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITY_CLASSES = (INTERACTIVE, BACKGROUND)  # Served in this order
+
+REQUESTS_PER_MINUTE = float(os.getenv("DATA_ASSISTANT_LLM_RPM", "0"))
+TOKENS_PER_MINUTE = float(os.getenv("DATA_ASSISTANT_LLM_TPM", "0"))
+MAX_CONCURRENCY = int(os.getenv("DATA_ASSISTANT_LLM_MAX_CONCURRENCY", "0"))
+QUEUE_TIMEOUT = float(os.getenv("DATA_ASSISTANT_LLM_QUEUE_TIMEOUT", "120"))
+BACKGROUND_STAGES = frozenset(
+    stage.strip() for stage in
+    os.getenv("DATA_ASSISTANT_LLM_BACKGROUND_STAGES", "explanation_generation,reasoning_explanation").split(",")
+    if stage.strip()
+)
+
+_current_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+
+class SchedulerTimeout(TimeoutError):
+    """Raised when an LLM call waited longer than the queue timeout for a slot."""
+
+
+@contextmanager
+def llm_user(user_id: Any) -> Iterator[None]:
+    """Attribute the LLM calls made inside the block to a user (for fair queuing)."""
+    token = _current_user.set(str(user_id) if user_id is not None else None)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Rough input-token count of a messages.create request (about 4 characters per token)."""
+    text = json.dumps([request.get("system"), request.get("messages")], ensure_ascii=False, default=str)
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Continuously refilled bucket; capacity is one minute's budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # A request larger than the whole bucket only has to wait for a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float):
+        if not self.unlimited:
+            self._refill(now)
+            self.level -= amount  # may go negative when correcting with actual usage
+
+    def give_back(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class Ticket:
+    """One waiting or admitted LLM call."""
+
+    def __init__(self, stage: str, user: str, priority: str, tokens: int):
+        self.stage = stage
+        self.user = user
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Rate budgets, priority classes and per-user round-robin for LLM calls."""
+
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE, max_concurrency: int = MAX_CONCURRENCY,
+                 queue_timeout: float = QUEUE_TIMEOUT, background_stages=BACKGROUND_STAGES):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.background_stages = frozenset(background_stages)
+        self._cond = threading.Condition()
+        # Per class: user -> that user's waiting tickets, in round-robin order
+        self._queues: Dict[str, "OrderedDict[str, Deque[Ticket]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_CLASSES
+        }
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._granted: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._timeouts = 0
+        self._max_depth: Dict[str, int] = {priority: 0 for priority in PRIORITY_CLASSES}
+
+    def priority_for(self, stage: str) -> str:
+        return BACKGROUND if stage in self.background_stages else INTERACTIVE
+
+    @contextmanager
+    def slot(self, stage: str, request: Dict[str, Any]) -> Iterator[Ticket]:
+        """Wait for admission of one call, hold its concurrency slot while inside the block."""
+        ticket = Ticket(stage, _current_user.get() or "anonymous", self.priority_for(stage),
+                        estimate_tokens(request))
+        self._acquire(ticket)
+        try:
+            yield ticket
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def settle(self, ticket: Ticket, actual_tokens: int):
+        """Correct the token bucket with the usage the API reported."""
+        with self._cond:
+            difference = actual_tokens - ticket.tokens
+            if difference > 0:
+                self.tokens.take(difference, time.monotonic())
+            elif difference < 0:
+                self.tokens.give_back(-difference)
+                self._cond.notify_all()
+
+    def report_rate_limited(self, retry_after: Optional[float] = None):
+        """Pause all admissions after a 429 from the API."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or 1.0))
+        logger.warning(f"LLM rate limit hit; pausing admissions for {retry_after or 1.0:.1f}s")
+
+    def _acquire(self, ticket: Ticket):
+        with self._cond:
+            queue = self._queues[ticket.priority]
+            queue.setdefault(ticket.user, deque()).append(ticket)
+            depth = self._depth(ticket.priority)
+            self._max_depth[ticket.priority] = max(self._max_depth[ticket.priority], depth)
+            # Never wait past the request's deadline
+            timeout = self.queue_timeout
+            request_deadline = current_deadline()
+            if request_deadline is not None:
+                timeout = min(timeout, request_deadline.remaining())
+            deadline = ticket.enqueued_at + timeout
+
+            while True:
+                now = time.monotonic()
+                wait = self._admission_wait(now) if self._next_ticket() is ticket else None
+                if wait == 0.0:
+                    self._admit(ticket, now)
+                    break
+                if now >= deadline:
+                    self._remove(ticket)
+                    self._timeouts += 1
+                    self._cond.notify_all()
+                    raise SchedulerTimeout(f"LLM call for {ticket.stage} waited {timeout:.1f}s for a slot")
+                # Woken by releases and settlements; otherwise re-check when the buckets have refilled
+                self._cond.wait(min(deadline - now, wait if wait is not None else 1.0))
+
+        waited = time.monotonic() - ticket.enqueued_at
+        get_metrics_collector().record_latency(f"llm_queue.{ticket.priority}", waited)
+        set_span_attributes(**{"llm.queue_priority": ticket.priority, "llm.queue_depth": depth,
+                               "llm.queue_wait_ms": round(waited * 1000, 2)})
+
+    def _next_ticket(self) -> Optional[Ticket]:
+        """Head of the first user's queue in the highest non-empty priority class."""
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            if queue:
+                return queue[next(iter(queue))][0]
+        return None
+
+    def _admission_wait(self, now: float) -> Optional[float]:
+        """Seconds until the head ticket can be admitted (None: wait for a release)."""
+        if self.max_concurrency and self._in_flight >= self.max_concurrency:
+            return None
+        head = self._next_ticket()
+        return max(self._paused_until - now, self.requests.wait_time(1, now),
+                   self.tokens.wait_time(head.tokens, now), 0.0)
+
+    def _admit(self, ticket: Ticket, now: float):
+        self.requests.take(1, now)
+        self.tokens.take(ticket.tokens, now)
+        self._in_flight += 1
+        self._granted[ticket.priority] += 1
+        queue = self._queues[ticket.priority]
+        waiting = queue[ticket.user]
+        waiting.popleft()
+        # Round-robin: the user goes to the back of the line (or leaves it)
+        del queue[ticket.user]
+        if waiting:
+            queue[ticket.user] = waiting
+        self._cond.notify_all()
+
+    def _remove(self, ticket: Ticket):
+        queue = self._queues[ticket.priority]
+        waiting = queue.get(ticket.user)
+        if waiting is not None and ticket in waiting:
+            waiting.remove(ticket)
+            if not waiting:
+                del queue[ticket.user]
+
+    def _depth(self, priority: str) -> int:
+        return sum(len(waiting) for waiting in self._queues[priority].values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depths (total and per user), calls in flight, grants and timeouts."""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "paused_for": max(0.0, self._paused_until - time.monotonic()),
+                "timeouts": self._timeouts,
+                "classes": {
+                    priority: {
+                        "depth": self._depth(priority),
+                        "max_depth": self._max_depth[priority],
+                        "granted": self._granted[priority],
+                        "waiting_users": {user: len(waiting) for user, waiting in self._queues[priority].items()},
+                    }
+                    for priority in PRIORITY_CLASSES
+                },
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler configured from the environment."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+            logger.info(f"LLM scheduler: {REQUESTS_PER_MINUTE or 'unlimited'} RPM, "
+                        f"{TOKENS_PER_MINUTE or 'unlimited'} TPM, "
+                        f"max concurrency {MAX_CONCURRENCY or 'unlimited'}")
+        return _scheduler
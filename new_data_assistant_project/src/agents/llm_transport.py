@@ -0,0 +1,246 @@
+"""
+Pluggable transports for LLM calls: live, record and replay.
+
+``LLMClient`` sends every request through a transport chosen by the
+``DATA_ASSISTANT_LLM_MODE`` environment variable:
+
+- ``live`` (default): calls the Anthropic API (requires an API key).
+- ``record``: calls the API and appends every request/response pair to a JSONL
+  cassette (``DATA_ASSISTANT_LLM_CASSETTE``).
+- ``replay``: serves responses from the cassette without network access or an
+  API key. Requests are matched by a hash of their canonical JSON. Identical
+  requests get their recorded responses in recording order. Synthetic latency
+  is the recorded latency times ``DATA_ASSISTANT_LLM_REPLAY_LATENCY_SCALE``
+  (default 1.0); set ``DATA_ASSISTANT_LLM_REPLAY_LATENCY`` to ``none`` or to a
+  fixed number of milliseconds instead.
+
+This lets the whole pipeline run offline and deterministically for benchmarks.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.my_config import MyConfig
+
+logger = logging.getLogger(__name__)
+
+LLM_MODE = os.getenv("DATA_ASSISTANT_LLM_MODE", "live").lower()
+DEFAULT_CASSETTE = Path(__file__).resolve().parents[2] / "logs" / "llm_cassette.jsonl"
+CASSETTE_PATH = Path(os.getenv("DATA_ASSISTANT_LLM_CASSETTE", str(DEFAULT_CASSETTE)))
+REPLAY_LATENCY = os.getenv("DATA_ASSISTANT_LLM_REPLAY_LATENCY", "recorded").lower()
+REPLAY_LATENCY_SCALE = float(os.getenv("DATA_ASSISTANT_LLM_REPLAY_LATENCY_SCALE", "1.0"))
+
+# Request fields that determine the response; anything else (timeouts, headers) is ignored
+_KEY_FIELDS = ("model", "system", "messages", "max_tokens", "temperature", "top_p", "top_k",
+               "stop_sequences", "tools", "tool_choice")
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when the cassette holds no response for a request."""
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable hash of the response-determining fields of a messages.create request."""
+    canonical = {name: request[name] for name in _KEY_FIELDS if request.get(name) is not None}
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Minimal stand-ins for the SDK response objects (only what the agents read)
+
+@dataclass
+class ReplayTextBlock:
+    text: str
+    type: str = "text"
+
+
+@dataclass
+class ReplayUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+
+
+@dataclass
+class ReplayMessage:
+    id: str
+    model: str
+    content: List[ReplayTextBlock] = field(default_factory=list)
+    usage: ReplayUsage = field(default_factory=ReplayUsage)
+    stop_reason: Optional[str] = None
+    role: str = "assistant"
+    type: str = "message"
+
+
+def serialize_response(response: Any) -> Dict[str, Any]:
+    """Reduce a Messages API response to the JSON stored in a cassette."""
+    usage = getattr(response, "usage", None)
+    return {
+        "id": getattr(response, "id", ""),
+        "model": getattr(response, "model", ""),
+        "stop_reason": getattr(response, "stop_reason", None),
+        "content": [{"type": "text", "text": block.text}
+                    for block in getattr(response, "content", None) or [] if hasattr(block, "text")],
+        "usage": {name: getattr(usage, name, None) or 0 for name in (
+            "input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")},
+    }
+
+
+def deserialize_response(data: Dict[str, Any]) -> ReplayMessage:
+    return ReplayMessage(
+        id=data.get("id", ""),
+        model=data.get("model", ""),
+        content=[ReplayTextBlock(text=block.get("text", "")) for block in data.get("content", [])],
+        usage=ReplayUsage(**data.get("usage", {})),
+        stop_reason=data.get("stop_reason"),
+    )
+
+
+class LiveTransport:
+    """Sends requests to the Anthropic API."""
+
+    mode = "live"
+
+    def __init__(self, client: Any = None):
+        if client is None:
+            from anthropic import Anthropic
+            api_key = MyConfig().get_api_key()
+            if not api_key:
+                raise ValueError("No API key found in configuration")
+            client = Anthropic(api_key=api_key)
+        # LLMClient retries itself, so the SDK must not retry as well
+        self.client = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+
+    def create(self, **request) -> Any:
+        return self.client.messages.create(**request)
+
+
+class RecordingTransport:
+    """Forwards to another transport and appends each exchange to a cassette."""
+
+    mode = "record"
+
+    def __init__(self, inner: Any, cassette_path: Path = CASSETTE_PATH):
+        self.inner = inner
+        self.cassette_path = Path(cassette_path)
+        self._lock = threading.Lock()
+
+    def create(self, **request) -> Any:
+        started = time.perf_counter()
+        response = self.inner.create(**request)
+        entry = {
+            "key": request_key(request),
+            "request": {name: request[name] for name in _KEY_FIELDS if request.get(name) is not None},
+            "response": serialize_response(response),
+            "latency_ms": (time.perf_counter() - started) * 1000,
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return response
+
+
+class ReplayTransport:
+    """Serves recorded responses with synthetic latency; never touches the network."""
+
+    mode = "replay"
+
+    def __init__(self, cassette_path: Path = CASSETTE_PATH, latency: str = REPLAY_LATENCY,
+                 latency_scale: float = REPLAY_LATENCY_SCALE):
+        """
+        Args:
+            cassette_path: JSONL file written by RecordingTransport
+            latency: "recorded", "none", or a fixed delay in milliseconds
+            latency_scale: Factor applied to recorded latencies
+        """
+        self.cassette_path = Path(cassette_path)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.cassette_path.exists():
+            logger.warning(f"LLM cassette {self.cassette_path} does not exist; every replay will miss")
+            return
+        with open(self.cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        logger.info(f"Loaded {sum(len(v) for v in self._entries.values())} recorded LLM responses "
+                    f"from {self.cassette_path}")
+
+    def reset(self):
+        """Start serving every request's recordings from the first one again."""
+        with self._lock:
+            self._positions.clear()
+
+    def create(self, **request) -> ReplayMessage:
+        key = request_key(request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise ReplayMissError(f"No recorded response for request {key[:12]} (model {request.get('model')})")
+            # Repeated identical requests get the recordings in order, then the last one again
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            entry = entries[min(position, len(entries) - 1)]
+
+        delay_ms = self._delay_ms(entry)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+        return deserialize_response(entry["response"])
+
+    def _delay_ms(self, entry: Dict[str, Any]) -> float:
+        if self.latency == "none":
+            return 0.0
+        if self.latency == "recorded":
+            return float(entry.get("latency_ms", 0.0)) * self.latency_scale
+        return float(self.latency)
+
+
+_transport: Optional[Any] = None
+_transport_lock = threading.Lock()
+
+
+def create_transport(mode: str = LLM_MODE, cassette_path: Path = CASSETTE_PATH) -> Any:
+    """Build a transport for the given mode ("live", "record" or "replay")."""
+    if mode == "replay":
+        return ReplayTransport(cassette_path)
+    if mode == "record":
+        return RecordingTransport(LiveTransport(), cassette_path)
+    if mode != "live":
+        raise ValueError(f"Unknown DATA_ASSISTANT_LLM_MODE: {mode!r}")
+    return LiveTransport()
+
+
+def set_llm_transport(transport: Any):
+    """Replace the process-wide transport (benchmarks install stubs or replays here)."""
+    global _transport
+    with _transport_lock:
+        _transport = transport
+
+
+def get_llm_transport() -> Any:
+    """Return the process-wide transport configured by DATA_ASSISTANT_LLM_MODE."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = create_transport()
+            logger.info(f"LLM transport: {_transport.mode}")
+        return _transport
@@ -0,0 +1,136 @@
+"""
+Per-stage model selection with escalation to the larger model.
+
+Every LLM stage asks the router which model to use. Stages listed in the route
+table go to the fast tier up to a maximum task complexity (1-5); everything else,
+and anything above the limit, goes to the strong tier. Callers escalate to the
+strong tier when the fast model's answer cannot be parsed or its SQL fails.
+
+Configuration (environment):
+
+- ``DATA_ASSISTANT_MODEL_ROUTING``: ``0`` sends every stage to the strong model.
+- ``DATA_ASSISTANT_FAST_MODEL`` / ``DATA_ASSISTANT_STRONG_MODEL``: model ids.
+- ``DATA_ASSISTANT_MODEL_ROUTES``: JSON object merged into the route table, e.g.
+  ``{"sql_generation": 3, "explanation_generation": 1}``; ``null`` removes a
+  stage from the fast tier.
+
+Latency per tier is recorded in the metrics collector as ``llm_tier.<tier>``
+(by ``LLMClient``), escalations are counted here.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+from new_data_assistant_project.src.utils.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+
+MODEL_ROUTING = os.getenv("DATA_ASSISTANT_MODEL_ROUTING", "1") == "1"
+FAST_MODEL = os.getenv("DATA_ASSISTANT_FAST_MODEL", "claude-3-5-haiku-20241022")
+STRONG_MODEL = os.getenv("DATA_ASSISTANT_STRONG_MODEL", "claude-sonnet-4-20250514")
+
+# Highest task complexity (1-5) a stage still sends to the fast model
+DEFAULT_ROUTES: Dict[str, int] = {
+    "explanation_decision": 5,   # short JSON decision
+    "task_assessment": 5,        # JSON tie-breaker
+    "sql_generation": 2,         # single-table filters and simple aggregates
+}
+
+
+def _load_routes() -> Dict[str, int]:
+    routes = dict(DEFAULT_ROUTES)
+    override = os.getenv("DATA_ASSISTANT_MODEL_ROUTES")
+    if override:
+        try:
+            for stage, limit in json.loads(override).items():
+                if limit is None:
+                    routes.pop(stage, None)
+                else:
+                    routes[stage] = int(limit)
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Ignoring invalid DATA_ASSISTANT_MODEL_ROUTES: {e}")
+    return routes
+
+
+@dataclass(frozen=True)
+class Route:
+    stage: str
+    tier: str
+    model: str
+
+
+class ModelRouter:
+    """Chooses the model per stage and complexity and counts escalations."""
+
+    def __init__(self, fast_model: str = FAST_MODEL, strong_model: str = STRONG_MODEL,
+                 routes: Optional[Dict[str, int]] = None, enabled: bool = MODEL_ROUTING):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.routes = _load_routes() if routes is None else dict(routes)
+        self.enabled = enabled
+        self._escalations: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def select(self, stage: str, complexity: Optional[int] = None) -> Route:
+        """
+        Model for a stage.
+
+        Args:
+            stage: Pipeline stage name as passed to LLMClient.create
+            complexity: Task complexity (1-5), if known; unknown only qualifies for
+                stages that use the fast model at every complexity
+        """
+        limit = self.routes.get(stage)
+        fast = self.enabled and limit is not None and (limit >= 5 if complexity is None else complexity <= limit)
+        route = Route(stage, FAST_TIER, self.fast_model) if fast else Route(stage, STRONG_TIER, self.strong_model)
+        set_span_attributes(**{"llm.tier": route.tier})
+        return route
+
+    def escalate(self, route: Route, reason: str) -> Optional[Route]:
+        """The strong-tier route to retry with, or None if the route already was strong."""
+        if route.tier == STRONG_TIER or self.fast_model == self.strong_model:
+            return None
+        with self._lock:
+            reasons = self._escalations.setdefault(route.stage, {})
+            reasons[reason] = reasons.get(reason, 0) + 1
+        logger.info(f"Escalating {route.stage} to {self.strong_model} after {reason}")
+        set_span_attributes(**{"llm.tier": STRONG_TIER, "llm.escalation": reason})
+        return Route(route.stage, STRONG_TIER, self.strong_model)
+
+    def tier_for_model(self, model: str) -> str:
+        return FAST_TIER if model == self.fast_model and model != self.strong_model else STRONG_TIER
+
+    def stats(self, window_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Latency summary per tier and escalation counts per stage and reason."""
+        collector = get_metrics_collector()
+        with self._lock:
+            escalations = {stage: dict(reasons) for stage, reasons in self._escalations.items()}
+        return {
+            "tiers": {tier: collector.latency_summary(f"llm_tier.{tier}", window_seconds)
+                      for tier in (FAST_TIER, STRONG_TIER)},
+            "escalations": escalations,
+        }
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Process-wide router configured from the environment."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+            logger.info(f"Model routing {'on' if _router.enabled else 'off'}: fast={_router.fast_model}, "
+                        f"strong={_router.strong_model}, routes={_router.routes}")
+        return _router
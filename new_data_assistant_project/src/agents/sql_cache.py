@@ -0,0 +1,68 @@
+"""
+Question-to-SQL cache for LLM outages.
+
+Every question whose generated SQL ran successfully is remembered with that SQL
+(question case and whitespace normalized). While the LLM circuit is open (see
+``circuit_breaker``) the ReAct agent answers a question it has seen before by
+running the remembered SQL against the current data instead of failing. Replay
+happens without the LLM or the user looking at the SQL, so only read-only
+statements are remembered or replayed (checked like SQL candidates, see
+``sql_planner``). Recent
+questions come from a per-process LRU of ``DATA_ASSISTANT_SQL_CACHE_SIZE``
+entries, older ones from the stored chat sessions. Hits and misses are recorded
+in the metrics collector as ``question_sql``.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Konsistente Imports - Immer vollständige Pfade
+from new_data_assistant_project.src.agents.sql_planner import is_read_only_query
+from new_data_assistant_project.src.database.models import ChatSession
+from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = int(os.getenv("DATA_ASSISTANT_SQL_CACHE_SIZE", "512"))
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _normalize(question: str) -> str:
+    return re.sub(r"\s+", " ", (question or "").strip()).lower()
+
+
+def cache_sql(user_query: str, sql_query: str, db_path: str):
+    """Remember the SQL that answered a question, if it only reads from db_path."""
+    if not is_read_only_query(db_path, sql_query):
+        return
+    key = _normalize(user_query)
+    with _cache_lock:
+        _cache[key] = sql_query
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def get_cached_sql(user_query: str, db_path: str) -> Optional[str]:
+    """Read-only SQL that answered this question before, from memory or the chat history."""
+    key = _normalize(user_query)
+    with _cache_lock:
+        sql_query = _cache.get(key)
+        if sql_query is not None:
+            _cache.move_to_end(key)
+    if sql_query is None:
+        try:
+            sql_query = ChatSession.find_sql_for_message(
+                db_path, user_query, accept=lambda candidate: is_read_only_query(db_path, candidate))
+        except Exception as e:
+            logger.warning(f"Could not look up cached SQL in the chat history: {e}")
+        if sql_query is not None:
+            cache_sql(user_query, sql_query, db_path)
+    get_metrics_collector().record_cache_access("question_sql", hit=sql_query is not None)
+    return sql_query
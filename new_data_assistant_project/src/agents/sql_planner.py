@@ -0,0 +1,269 @@
+"""
+Choosing among several SQL candidates by query-plan cost.
+
+With ``DATA_ASSISTANT_SQL_CANDIDATES`` set to N > 1, the ReAct agent asks for N
+alternative queries in one LLM call. Each candidate is checked locally with
+``EXPLAIN QUERY PLAN`` (which fails on syntax errors and unknown tables or
+columns without running anything), and only the valid candidate with the
+lowest estimated cost is executed. Only read-only queries are ranked: while a
+plan is prepared, an authorizer denies everything but reading, so a statement
+that writes or changes the database (or a PRAGMA) is never chosen by its cost.
+
+The cost is a nested-loop estimate over the plan tree using the row counts of
+the tables: a full ``SCAN`` reads every row (a covering index half of them), an
+index ``SEARCH`` costs log2(rows), each loop runs once per row of the loops
+outside it, correlated subqueries once per outer row, and temp B-trees (sorting,
+grouping, DISTINCT) n·log2(n). An outer ``LIMIT`` cuts the loops of the outer
+query short unless their rows have to be sorted or grouped first. Row counts are
+recounted every ``DATA_ASSISTANT_SQL_ROW_COUNT_TTL`` seconds (default 300). Ties
+go to fewer full scans, then to the order the model listed the candidates in.
+All candidates, chosen or not, are logged to ``sql_candidates`` (see
+``src/database/sql_candidates.py``).
+"""
+
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQL_CANDIDATES = max(1, int(os.getenv("DATA_ASSISTANT_SQL_CANDIDATES", "1")))
+
+# Rows assumed for subquery/CTE results the plan gives no estimate for
+DERIVED_ROWS = 100
+COVERING_INDEX_FACTOR = 0.5
+# Seconds before table row counts are counted again
+ROW_COUNT_TTL = float(os.getenv("DATA_ASSISTANT_SQL_ROW_COUNT_TTL", "300"))
+
+_NOT_ALIASES = {"where", "on", "join", "inner", "left", "right", "cross", "full", "natural", "outer",
+                "group", "order", "limit", "having", "union", "except", "intersect", "using", "window"}
+_FROM_CLAUSE = re.compile(r'\b(?:FROM|JOIN)\s+["`\[]?(\w+)["`\]]?(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_OUTER_LIMIT = re.compile(r'\bLIMIT\s+(\d+)(?:\s+OFFSET\s+(\d+)|\s*,\s*(\d+))?\s*;?\s*$', re.IGNORECASE)
+_AGGREGATE = re.compile(r'\b(?:COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(', re.IGNORECASE)
+_CANDIDATE_HEADER = re.compile(r'^\s*SQL\s*(\d+)\s*:', re.IGNORECASE | re.MULTILINE)
+
+# Authorizer actions a read-only query needs; anything else is denied while planning
+_READ_ONLY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+# db_path -> (row count per table, monotonic time counted)
+_table_rows: Dict[str, Tuple[Dict[str, int], float]] = {}
+_table_rows_lock = threading.Lock()
+
+
+@dataclass
+class CandidatePlan:
+    """One SQL candidate with its EXPLAIN QUERY PLAN result."""
+    index: int
+    sql_query: str
+    valid: bool
+    read_only: bool = True
+    cost: float = math.inf
+    full_scans: int = 0
+    plan: str = ""
+    error: Optional[str] = None
+
+    def sort_key(self) -> Tuple[float, int, int]:
+        return self.cost, self.full_scans, self.index
+
+
+def parse_candidates(content: str) -> List[str]:
+    """
+    SQL texts from an answer with "SQL 1:", "SQL 2:", ... sections.
+
+    An answer in the single-query format ("SQL:") yields one candidate; duplicates
+    are dropped. The texts still need _clean_sql_query.
+    """
+    parts = _CANDIDATE_HEADER.split(content)
+    if len(parts) > 1:
+        texts = parts[2::2]  # split() alternates text and header numbers
+    elif "SQL:" in content:
+        texts = [content.split("SQL:", 1)[1]]
+    else:
+        return []
+    candidates, seen = [], set()
+    for text in texts:
+        text = text.strip()
+        key = re.sub(r"\s+", " ", text).lower()
+        if text and key not in seen:
+            seen.add(key)
+            candidates.append(text)
+    return candidates
+
+
+def table_row_counts(db_path: str, conn: sqlite3.Connection) -> Dict[str, int]:
+    """Row count per table (lower-case names), counted at most once per ROW_COUNT_TTL per database."""
+    with _table_rows_lock:
+        entry = _table_rows.get(db_path)
+    if entry is not None and time.monotonic() - entry[1] < ROW_COUNT_TTL:
+        return entry[0]
+    counts = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        try:
+            counts[name.lower()] = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        except sqlite3.Error:
+            continue
+    with _table_rows_lock:
+        _table_rows[db_path] = (counts, time.monotonic())
+    return counts
+
+
+def table_aliases(sql_query: str) -> Dict[str, str]:
+    """Alias (or table name) -> table name for the FROM and JOIN clauses of a query."""
+    aliases = {}
+    for table, alias in _FROM_CLAUSE.findall(sql_query):
+        aliases[table.lower()] = table.lower()
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def query_limit(sql_query: str) -> Optional[int]:
+    """
+    Rows the outer query reads up to because of a trailing LIMIT (OFFSET included).
+
+    None without a LIMIT, and for queries with aggregates, which read all their input.
+    """
+    match = _OUTER_LIMIT.search(sql_query)
+    if match is None or _AGGREGATE.search(sql_query):
+        return None
+    limit, offset, comma_count = match.groups()
+    if comma_count is not None:  # LIMIT offset, count
+        return int(limit) + int(comma_count)
+    return int(limit) + int(offset or 0)
+
+
+def plan_cost(plan_rows: List[Tuple[int, int, str]], table_rows: Dict[str, int],
+              aliases: Dict[str, str], limit: Optional[int] = None) -> Tuple[float, int]:
+    """
+    Estimated cost and number of full table scans of an EXPLAIN QUERY PLAN result.
+
+    Args:
+        plan_rows: (id, parent, detail) rows in plan order
+        table_rows: Row count per table name
+        aliases: Names used in the plan -> table names
+        limit: Rows the outer query stops after (see query_limit)
+    """
+    children: Dict[int, List[Tuple[int, str]]] = {}
+    for node_id, parent, detail in plan_rows:
+        children.setdefault(parent, []).append((node_id, detail))
+    derived: Dict[str, float] = {}
+    full_scans = 0
+
+    def rows_of(name: str) -> float:
+        name = name.strip('"`[]').lower()
+        if name in derived:
+            return derived[name]
+        return float(table_rows.get(aliases.get(name, name), DERIVED_ROWS))
+
+    def block(parent: int, limit: Optional[int] = None) -> Tuple[float, float]:
+        """Cost of the loops below parent and the rows they produce."""
+        nonlocal full_scans
+        # once: subqueries, automatic indexes and sorts; looping: work a LIMIT can cut short
+        once, looping, driving = 0.0, 0.0, 1.0
+        sorted_first = False
+        for node_id, detail in children.get(parent, []):
+            words = detail.split()
+            if node_id in children:
+                sub_cost, sub_rows = block(node_id)
+                # A correlated subquery runs once per row of the loops around it
+                if detail.startswith("CORRELATED"):
+                    looping += driving * sub_cost
+                else:
+                    once += sub_cost
+                if words[0] in ("MATERIALIZE", "CO-ROUTINE") and len(words) > 1:
+                    derived[words[1].lower()] = max(1.0, sub_rows)
+            if words[0] in ("SCAN", "SEARCH") and detail != "SCAN CONSTANT ROW" and len(words) > 1:
+                rows = rows_of(words[1])
+                if words[0] == "SCAN":
+                    per_row = rows * (COVERING_INDEX_FACTOR if "COVERING INDEX" in detail else 1.0)
+                    produced = rows
+                    if "USING" not in detail:
+                        full_scans += 1
+                else:
+                    if "AUTOMATIC" in detail or "USING" not in detail:
+                        once += rows  # index built on the fly, once
+                    per_row = math.log2(rows + 2)
+                    produced = math.log2(rows + 2)
+                looping += driving * per_row
+                driving *= max(1.0, produced)
+            elif "TEMP B-TREE" in detail:
+                sorted_first = True
+                once += driving * math.log2(driving + 2)
+        if limit is not None and not sorted_first and driving > limit:
+            # Unsorted rows stream out of the loops, which stop after the first limit rows
+            looping *= limit / driving
+            driving = float(limit)
+        return once + looping, driving
+
+    total, _ = block(0, limit)
+    return total, full_scans
+
+
+@contextmanager
+def read_only_authorizer(conn: sqlite3.Connection) -> Iterator[List[int]]:
+    """Deny everything but reading to statements prepared on conn; yields the denied actions."""
+    denied: List[int] = []
+
+    def authorize(action, *_):
+        if action in _READ_ONLY_ACTIONS:
+            return sqlite3.SQLITE_OK
+        denied.append(action)
+        return sqlite3.SQLITE_DENY
+
+    conn.set_authorizer(authorize)
+    try:
+        yield denied
+    finally:
+        conn.set_authorizer(None)
+
+
+def is_read_only_query(db_path: str, sql_query: str) -> bool:
+    """True if sql_query is a single valid statement that only reads (it is prepared, not run)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        with read_only_authorizer(conn):
+            return bool(conn.execute(f"EXPLAIN QUERY PLAN {sql_query}").fetchall())
+    except (sqlite3.Error, sqlite3.Warning):
+        return False
+    finally:
+        conn.close()
+
+
+def explain_candidate(conn: sqlite3.Connection, index: int, sql_query: str,
+                      table_rows: Dict[str, int]) -> CandidatePlan:
+    """Validate one candidate with EXPLAIN QUERY PLAN and estimate its cost."""
+    with read_only_authorizer(conn) as denied:
+        try:
+            plan_rows = [(row[0], row[1], row[3]) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql_query}")]
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            if denied:
+                return CandidatePlan(index, sql_query, valid=False, read_only=False,
+                                     error="Not ranked: not a read-only query")
+            return CandidatePlan(index, sql_query, valid=False, error=f"{type(e).__name__}: {e}"[:500])
+    if not plan_rows:
+        return CandidatePlan(index, sql_query, valid=False, error="Not ranked: empty query plan")
+    cost, full_scans = plan_cost(plan_rows, table_rows, table_aliases(sql_query), query_limit(sql_query))
+    plan = "\n".join(detail for _, _, detail in plan_rows)
+    return CandidatePlan(index, sql_query, valid=True, cost=cost, full_scans=full_scans, plan=plan)
+
+
+def choose_candidate(db_path: str, candidates: List[str]) -> Tuple[Optional[CandidatePlan], List[CandidatePlan]]:
+    """
+    The cheapest valid read-only candidate (None if there is none) and the plans of all of them.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        table_rows = table_row_counts(db_path, conn)
+        plans = [explain_candidate(conn, index, sql_query, table_rows)
+                 for index, sql_query in enumerate(candidates)]
+    finally:
+        conn.close()
+    valid = [plan for plan in plans if plan.valid]
+    return (min(valid, key=CandidatePlan.sort_key) if valid else None), plans
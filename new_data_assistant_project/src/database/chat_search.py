@@ -0,0 +1,257 @@
+"""
+Full-text search over chat history.
+
+``chat_sessions_fts`` is an FTS5 external-content index over the user message,
+system response and generated SQL of every chat session. Triggers keep it in
+sync, so the text is not stored twice and writers need no extra code. The owner
+of each session is indexed as a ``u<id>`` token, so per-user searches are index
+intersections rather than row filters. Hits are
+ranked with bm25 over a bounded window of the newest matches. Highlighted
+fragments are only built for the rows on the requested page.
+"""
+
+import logging
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import flush_pending_writes
+except ImportError:
+    from src.database.write_behind import flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+# Column weights for bm25: user_message, system_response, sql_query, user_key
+_BM25_WEIGHTS = "3.0, 1.0, 2.0, 0.0"
+
+# Relevance ranking scores at most this many of the newest matches. bm25 costs a few
+# microseconds per matching row, so ranking every hit of a term that occurs in
+# millions of sessions would take seconds; rarer terms are ranked exhaustively.
+# Prefix terms ("revenu*") are not bounded this way: FTS5 merges the doclists of
+# all matching tokens first, which is slow for stems found in most sessions.
+RANK_WINDOW = 5000
+
+# Lowest rowid among the newest RANK_WINDOW matches; ranking is limited to rowids above it
+_WINDOW_FLOOR_SQL = """
+    SELECT COALESCE(MIN(rowid), 0) FROM (
+        SELECT rowid FROM chat_sessions_fts
+        WHERE chat_sessions_fts MATCH :query
+        ORDER BY rowid DESC
+        LIMIT :window
+    )
+"""
+
+# Stage 1: pick the page of session ids (no text is materialized here). The floor is
+# passed as a bound value so FTS5 applies it while reading doclists.
+_RANK_SQL = """
+    SELECT rowid, bm25(chat_sessions_fts, {weights}) AS score
+    FROM chat_sessions_fts
+    WHERE chat_sessions_fts MATCH :query AND rowid >= :floor
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+""".format(weights=_BM25_WEIGHTS)
+
+# Newest first needs no scoring, so FTS5 can stop after the page
+_RECENT_SQL = """
+    SELECT rowid, 0.0 AS score
+    FROM chat_sessions_fts
+    WHERE chat_sessions_fts MATCH :query
+    ORDER BY rowid DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+# Stage 2: highlight only the rows on the page. FTS5 cannot use a rowid IN (...)
+# list, so the BETWEEN bounds limit the doclist scan and IN picks the page rows
+_DETAIL_SQL = """
+    SELECT c.id, c.user_id, u.username, c.created_at,
+           highlight(chat_sessions_fts, 0, :open, :close),
+           snippet(chat_sessions_fts, 1, :open, :close, ' … ', 24),
+           snippet(chat_sessions_fts, 2, :open, :close, ' … ', 24)
+    FROM chat_sessions_fts
+    JOIN chat_sessions c ON c.id = chat_sessions_fts.rowid
+    LEFT JOIN users u ON u.id = c.user_id
+    WHERE chat_sessions_fts MATCH :query
+      AND chat_sessions_fts.rowid BETWEEN :low AND :high
+      AND chat_sessions_fts.rowid IN ({ids})
+"""
+
+
+@dataclass
+class ChatSearchHit:
+    """One matching chat session with highlighted fragments."""
+    session_id: int
+    user_id: int
+    username: Optional[str]
+    created_at: Optional[datetime]
+    user_message: str
+    response_snippet: str
+    sql_snippet: str
+    score: float
+
+
+@dataclass
+class ChatSearchPage:
+    """A page of search hits."""
+    query: str
+    hits: List[ChatSearchHit] = field(default_factory=list)
+    offset: int = 0
+    limit: int = 20
+    has_more: bool = False
+    elapsed_ms: float = 0.0
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """Return True if the SQLite library was compiled with FTS5."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_chat_search_index(cursor: sqlite3.Cursor):
+    """Create the FTS5 index and its sync triggers; backfills existing sessions once."""
+    if not fts5_available(cursor.connection):
+        logger.warning("SQLite was built without FTS5; chat history search is disabled")
+        return
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_sessions_fts'"
+    ).fetchone()
+
+    # The index reads its content through a view that adds the owner token
+    cursor.execute('''
+    CREATE VIEW IF NOT EXISTS chat_sessions_search_content AS
+    SELECT id, user_message, system_response, sql_query, 'u' || user_id AS user_key
+    FROM chat_sessions
+    ''')
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS chat_sessions_fts USING fts5(
+        user_message,
+        system_response,
+        sql_query,
+        user_key,
+        content='chat_sessions_search_content',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    ''')
+
+    # External-content tables must be told about every change to the content table
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_ai AFTER INSERT ON chat_sessions BEGIN
+        INSERT INTO chat_sessions_fts(rowid, user_message, system_response, sql_query, user_key)
+        VALUES (new.id, new.user_message, new.system_response, new.sql_query, 'u' || new.user_id);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_ad AFTER DELETE ON chat_sessions BEGIN
+        INSERT INTO chat_sessions_fts(chat_sessions_fts, rowid, user_message, system_response, sql_query, user_key)
+        VALUES ('delete', old.id, old.user_message, old.system_response, old.sql_query, 'u' || old.user_id);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS chat_sessions_fts_au
+    AFTER UPDATE OF user_message, system_response, sql_query, user_id ON chat_sessions BEGIN
+        INSERT INTO chat_sessions_fts(chat_sessions_fts, rowid, user_message, system_response, sql_query, user_key)
+        VALUES ('delete', old.id, old.user_message, old.system_response, old.sql_query, 'u' || old.user_id);
+        INSERT INTO chat_sessions_fts(rowid, user_message, system_response, sql_query, user_key)
+        VALUES (new.id, new.user_message, new.system_response, new.sql_query, 'u' || new.user_id);
+    END
+    ''')
+
+    if not exists:
+        cursor.execute("INSERT INTO chat_sessions_fts(chat_sessions_fts) VALUES ('rebuild')")
+        logger.info("Built chat history search index")
+
+
+def build_match_query(text: str, user_id: Optional[int] = None) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted, so user input can never be a syntax error. Words are
+    ANDed together and matched in the text columns only; a trailing * on a word
+    keeps prefix matching ("revenu*").
+    """
+    terms = []
+    for token in re.findall(r'[^\s"]+\*?', text):
+        prefix = token.endswith('*')
+        word = token.rstrip('*')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    if not terms:
+        return ''
+    match = '{user_message system_response sql_query} : (' + ' '.join(terms) + ')'
+    if user_id is not None:
+        match = f'user_key : "u{int(user_id)}" AND {match}'
+    return match
+
+
+def search_chat_history(db_path: str, text: str, user_id: Optional[int] = None,
+                        limit: int = 20, offset: int = 0, order: str = 'relevance',
+                        markers: Tuple[str, str] = ('**', '**')) -> ChatSearchPage:
+    """
+    Search chat messages, responses and generated SQL.
+
+    Args:
+        db_path: Path to the app database
+        text: Free-text query
+        user_id: Restrict the search to one user's sessions
+        limit: Page size
+        offset: Number of hits to skip
+        order: 'relevance' (bm25 over the newest RANK_WINDOW matches) or 'recent' (newest first)
+        markers: Strings placed around matched terms in the returned fragments
+
+    Returns:
+        ChatSearchPage; has_more is computed with one extra row instead of a COUNT(*)
+    """
+    page = ChatSearchPage(query=text, offset=offset, limit=limit)
+    match = build_match_query(text, user_id)
+    if not match:
+        return page
+
+    rank_sql = _RECENT_SQL if order == 'recent' else _RANK_SQL
+    params = {
+        'query': match, 'window': max(RANK_WINDOW, offset + limit + 1),
+        'limit': limit + 1, 'offset': offset, 'open': markers[0], 'close': markers[1],
+    }
+
+    flush_pending_writes(db_path)
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        if order != 'recent':
+            params['floor'] = conn.execute(_WINDOW_FLOOR_SQL, params).fetchone()[0]
+        ranked = conn.execute(rank_sql, params).fetchall()
+        page.has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+        details = {}
+        if ranked:
+            ids = [int(row[0]) for row in ranked]
+            detail_sql = _DETAIL_SQL.format(ids=', '.join(str(i) for i in ids))
+            detail_params = dict(params, low=min(ids), high=max(ids))
+            details = {row[0]: row for row in conn.execute(detail_sql, detail_params)}
+    except sqlite3.OperationalError as e:
+        logger.error(f"Chat search failed for {text!r}: {e}")
+        return page
+    finally:
+        conn.close()
+    page.elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for session_id, score in ranked:
+        row = details.get(session_id)
+        if row is None:
+            continue
+        page.hits.append(ChatSearchHit(
+            session_id=row[0], user_id=row[1], username=row[2],
+            created_at=datetime.fromisoformat(row[3]) if row[3] else None,
+            user_message=row[4] or '', response_snippet=row[5] or '', sql_snippet=row[6] or '',
+            score=score
+        ))
+    return page
@@ -0,0 +1,254 @@
+"""
+Aggregated, cached data for the evaluation dashboard.
+
+The dashboard used to load every user and feedback row (password hashes
+included) and count them in Python. Every figure is now a GROUP BY or aggregate
+query that returns only the numbers it displays. Results are cached per database
+and keyed by a data version: the size and modification time of the database
+file and its WAL. A cached value is reused while nothing was written and its TTL
+has not expired. Switching tabs or rerunning the page therefore costs two stat
+calls instead of a query.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import flush_pending_writes
+except ImportError:
+    from src.database.write_behind import flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a cached figure is served even if no write was detected
+DASHBOARD_CACHE_TTL = float(os.getenv("DATA_ASSISTANT_DASHBOARD_CACHE_TTL", "60"))
+
+# User columns the dashboard may group by (column names cannot be bound parameters)
+USER_BREAKDOWN_COLUMNS = (
+    'role', 'has_completed_assessment', 'age', 'gender', 'education_level', 'user_level_category'
+)
+
+# Comprehensive feedback columns shown as distributions
+FEEDBACK_DISTRIBUTION_COLUMNS = (
+    'frequency_rating', 'explanation_quality_rating', 'system_helpfulness_rating',
+    'learning_improvement_rating', 'auto_explanation', 'system_accuracy', 'recommendation'
+)
+
+_cache: Dict[Tuple, Tuple[Any, float, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+def data_version(db_path: str) -> Tuple:
+    """Cheap fingerprint of the database contents (changes on every commit)."""
+    version = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+def cached_query(func: Callable) -> Callable:
+    """Cache a query function per (db_path, arguments), invalidated by data_version and TTL."""
+    @wraps(func)
+    def wrapper(db_path: str, *args, **kwargs):
+        flush_pending_writes(db_path)
+        key = (func.__name__, os.path.abspath(db_path), args, tuple(sorted(kwargs.items())))
+        version = data_version(db_path)
+        now = time.monotonic()
+        with _cache_lock:
+            entry = _cache.get(key)
+        if entry is not None and entry[0] == version and now - entry[1] < DASHBOARD_CACHE_TTL:
+            return entry[2]
+
+        value = func(db_path, *args, **kwargs)
+        with _cache_lock:
+            _cache[key] = (version, now, value)
+        return value
+    return wrapper
+
+
+def clear_dashboard_cache():
+    """Drop all cached dashboard figures."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _query(db_path: str, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+@cached_query
+def get_user_summary(db_path: str) -> Dict[str, Any]:
+    """Number of users, users created in the last 7 days and age statistics."""
+    row = _query(db_path, """
+        SELECT COUNT(*) AS total_users,
+               SUM(created_at >= ?) AS new_this_week,
+               AVG(age) AS avg_age,
+               MIN(age) AS min_age,
+               MAX(age) AS max_age
+        FROM users
+    """, ((date.today() - timedelta(days=6)).isoformat(),))[0]
+    return {
+        'total_users': row['total_users'],
+        'new_this_week': row['new_this_week'] or 0,
+        'avg_age': round(row['avg_age'], 1) if row['avg_age'] is not None else 0,
+        'min_age': row['min_age'] or 0,
+        'max_age': row['max_age'] or 0,
+    }
+
+
+@cached_query
+def get_session_summary(db_path: str) -> Dict[str, Any]:
+    """Number of chat sessions, sessions today and users active in the last 7 days."""
+    today = date.today()
+    row = _query(db_path, """
+        SELECT COUNT(*) AS total_sessions,
+               SUM(created_at >= ?) AS sessions_today,
+               COUNT(DISTINCT CASE WHEN created_at >= ? THEN user_id END) AS active_users_week
+        FROM chat_sessions
+    """, (today.isoformat(), (today - timedelta(days=6)).isoformat()))[0]
+    return {
+        'total_sessions': row['total_sessions'],
+        'sessions_today': row['sessions_today'] or 0,
+        'active_users_week': row['active_users_week'] or 0,
+    }
+
+
+@cached_query
+def get_daily_session_counts(db_path: str, days: int = 30) -> List[Dict[str, Any]]:
+    """Chat sessions per day for the last N days, including days without sessions."""
+    start = date.today() - timedelta(days=max(1, days) - 1)
+    counts = {row['day']: row['sessions'] for row in _query(db_path, """
+        SELECT date(created_at) AS day, COUNT(*) AS sessions
+        FROM chat_sessions
+        WHERE created_at >= ?
+        GROUP BY day
+    """, (start.isoformat(),))}
+    return [{'date': (start + timedelta(days=i)).isoformat(),
+             'sessions': counts.get((start + timedelta(days=i)).isoformat(), 0)}
+            for i in range(max(1, days))]
+
+
+@cached_query
+def get_user_breakdown(db_path: str, column: str) -> List[Tuple[Any, int]]:
+    """(value, count) pairs of one user attribute, ignoring unset values."""
+    if column not in USER_BREAKDOWN_COLUMNS:
+        raise ValueError(f"Unsupported user breakdown column: {column}")
+    rows = _query(db_path, f"""
+        SELECT {column} AS value, COUNT(*) AS count
+        FROM users
+        WHERE {column} IS NOT NULL AND {column} != ''
+        GROUP BY {column}
+        ORDER BY {column}
+    """)
+    return [(row['value'], row['count']) for row in rows]
+
+
+@cached_query
+def get_recent_users(db_path: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Newest users with the fields shown in the dashboard (no credentials)."""
+    rows = _query(db_path, """
+        SELECT username, role, age, user_level_category, gender, profession, education_level, created_at
+        FROM users
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, (limit,))
+    return [dict(row) for row in rows]
+
+
+@cached_query
+def get_explanation_feedback_summary(db_path: str) -> Dict[str, int]:
+    """Counts of explanation feedback, explanations given and helpful explanations."""
+    row = _query(db_path, """
+        SELECT COUNT(*) AS total_feedback,
+               SUM(explanation_given) AS explanations_given,
+               SUM(was_helpful) AS helpful_explanations
+        FROM explanation_feedback
+    """)[0]
+    return {key: row[key] or 0 for key in row.keys()}
+
+
+@cached_query
+def get_recent_explanation_feedback(db_path: str, limit: int = 200) -> List[Dict[str, Any]]:
+    """Newest explanation feedback rows for the dashboard table."""
+    rows = _query(db_path, """
+        SELECT COALESCE(u.username, 'Unknown') AS username, ef.explanation_given, ef.was_needed, ef.was_helpful,
+               ef.would_have_been_needed, ef.created_at
+        FROM explanation_feedback ef
+        LEFT JOIN users u ON ef.user_id = u.id
+        ORDER BY ef.created_at DESC
+        LIMIT ?
+    """, (limit,))
+    return [dict(row) for row in rows]
+
+
+@cached_query
+def get_comprehensive_feedback_summary(db_path: str) -> Dict[str, Any]:
+    """Averages and recommendation count of the research feedback."""
+    row = _query(db_path, """
+        SELECT COUNT(*) AS total_feedback,
+               AVG(explanation_quality_rating) AS avg_explanation_quality,
+               AVG(system_helpfulness_rating) AS avg_system_helpfulness,
+               SUM(recommendation = 'Yes') AS positive_recommendations
+        FROM comprehensive_feedback
+    """)[0]
+    return {
+        'total_feedback': row['total_feedback'],
+        'avg_explanation_quality': row['avg_explanation_quality'] or 0.0,
+        'avg_system_helpfulness': row['avg_system_helpfulness'] or 0.0,
+        'positive_recommendations': row['positive_recommendations'] or 0,
+    }
+
+
+@cached_query
+def get_feedback_distribution(db_path: str, column: str) -> List[Tuple[Any, int]]:
+    """(value, count) pairs of one comprehensive feedback answer."""
+    if column not in FEEDBACK_DISTRIBUTION_COLUMNS:
+        raise ValueError(f"Unsupported feedback distribution column: {column}")
+    rows = _query(db_path, f"""
+        SELECT {column} AS value, COUNT(*) AS count
+        FROM comprehensive_feedback
+        GROUP BY {column}
+        ORDER BY {column}
+    """)
+    return [(row['value'], row['count']) for row in rows]
+
+
+@cached_query
+def get_recent_comprehensive_feedback(db_path: str, limit: int = 200) -> List[Dict[str, Any]]:
+    """Newest research feedback rows for the dashboard table."""
+    rows = _query(db_path, """
+        SELECT COALESCE(u.username, 'Unknown') AS username, cf.frequency_rating, cf.explanation_quality_rating,
+               cf.system_helpfulness_rating, cf.learning_improvement_rating,
+               cf.auto_explanation, cf.system_accuracy, cf.recommendation, cf.created_at
+        FROM comprehensive_feedback cf
+        LEFT JOIN users u ON cf.user_id = u.id
+        ORDER BY cf.created_at DESC
+        LIMIT ?
+    """, (limit,))
+    return [dict(row) for row in rows]
+
+
+def format_timestamp(value: Optional[str], fmt: str = '%Y-%m-%d %H:%M') -> str:
+    """Format a stored timestamp string for display."""
+    if not value:
+        return 'Unknown'
+    try:
+        return datetime.fromisoformat(str(value)).strftime(fmt)
+    except ValueError:
+        return str(value)
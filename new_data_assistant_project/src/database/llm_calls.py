@@ -0,0 +1,145 @@
+"""
+Accounting of LLM calls.
+
+Every Anthropic call made by the agents is logged to ``llm_calls`` with its stage,
+model, token usage, latency, retries and estimated cost. Rows are written through
+the write-behind buffer. A call is tagged with the request (trace) id it ran
+under; once the chat session of that request is saved, the calls are linked to
+it, so usage can be broken down per user and user level.
+"""
+
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import buffered_write, flush_pending_writes
+except ImportError:
+    from src.database.write_behind import buffered_write, flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: input, output, cache write, cache read
+MODEL_PRICING = {
+    "claude-sonnet-4-20250514": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 1.00, 0.08),
+    "claude-opus-4-20250514": (15.00, 75.00, 18.75, 1.50),
+}
+DEFAULT_PRICING = MODEL_PRICING["claude-sonnet-4-20250514"]
+
+_INSERT_CALL = """
+    INSERT INTO llm_calls (request_id, stage, model, input_tokens, output_tokens,
+                           cache_creation_input_tokens, cache_read_input_tokens,
+                           latency_ms, retries, success, error, cost_usd, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def create_llm_call_tables(cursor: sqlite3.Cursor):
+    """Create the llm_calls table and its indexes."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS llm_calls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id TEXT,
+        session_id INTEGER,
+        stage TEXT NOT NULL,
+        model TEXT NOT NULL,
+        input_tokens INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        cache_creation_input_tokens INTEGER NOT NULL DEFAULT 0,
+        cache_read_input_tokens INTEGER NOT NULL DEFAULT 0,
+        latency_ms REAL NOT NULL,
+        retries INTEGER NOT NULL DEFAULT 0,
+        success BOOLEAN NOT NULL,
+        error TEXT,
+        cost_usd REAL NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE SET NULL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_calls_request_id ON llm_calls(request_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_calls_session_id ON llm_calls(session_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_calls_created_at ON llm_calls(created_at)')
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int,
+                  cache_creation_input_tokens: int = 0, cache_read_input_tokens: int = 0) -> float:
+    """Estimated USD cost of one call from the MODEL_PRICING table."""
+    input_price, output_price, cache_write_price, cache_read_price = MODEL_PRICING.get(model, DEFAULT_PRICING)
+    return (input_tokens * input_price + output_tokens * output_price
+            + cache_creation_input_tokens * cache_write_price
+            + cache_read_input_tokens * cache_read_price) / 1_000_000
+
+
+def record_llm_call(db_path: str, stage: str, model: str, latency_ms: float,
+                    input_tokens: int = 0, output_tokens: int = 0,
+                    cache_creation_input_tokens: int = 0, cache_read_input_tokens: int = 0,
+                    retries: int = 0, success: bool = True, error: Optional[str] = None,
+                    request_id: Optional[str] = None):
+    """Queue one llm_calls row (never blocks the request)."""
+    try:
+        cost = estimate_cost(model, input_tokens, output_tokens,
+                             cache_creation_input_tokens, cache_read_input_tokens)
+        buffered_write(db_path, _INSERT_CALL, (
+            request_id, stage, model, input_tokens, output_tokens,
+            cache_creation_input_tokens, cache_read_input_tokens,
+            latency_ms, retries, bool(success), error, cost, datetime.now().isoformat()
+        ), wait=False)
+    except Exception as e:
+        logger.error(f"Error recording LLM call: {e}")
+
+
+def link_llm_calls_to_session(db_path: str, request_id: Optional[str], session_uuid: str):
+    """
+    Attach the calls of a request to its chat session.
+
+    Queued after the session insert; the writer applies statements in order, so
+    the session row exists when this runs.
+    """
+    if not request_id:
+        return
+    try:
+        buffered_write(db_path, """
+            UPDATE llm_calls
+            SET session_id = (SELECT id FROM chat_sessions WHERE session_uuid = ?)
+            WHERE request_id = ?
+        """, (session_uuid, request_id), wait=False)
+    except Exception as e:
+        logger.error(f"Error linking LLM calls to session: {e}")
+
+
+def _window_start(days: Optional[int]) -> str:
+    if days is None:
+        return ''
+    return (date.today() - timedelta(days=max(1, days) - 1)).isoformat()
+
+
+def get_llm_calls(db_path: str, days: Optional[int] = 30) -> List[Dict[str, Any]]:
+    """
+    Calls of the last N days (all if None) with the user level of their session.
+
+    Calls not linked to a session (e.g. failed requests) have user_level None.
+    """
+    flush_pending_writes(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("""
+            SELECT lc.stage, lc.model, lc.input_tokens, lc.output_tokens,
+                   lc.cache_creation_input_tokens, lc.cache_read_input_tokens,
+                   lc.latency_ms, lc.retries, lc.success, lc.cost_usd, lc.created_at,
+                   u.user_level_category AS user_level
+            FROM llm_calls lc
+            LEFT JOIN chat_sessions cs ON cs.id = lc.session_id
+            LEFT JOIN users u ON u.id = cs.user_id
+            WHERE lc.created_at >= ?
+            ORDER BY lc.id
+        """, (_window_start(days),)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.OperationalError as e:
+        logger.error(f"Error loading LLM calls: {e}")
+        return []
+    finally:
+        conn.close()
@@ -1,11 +1,21 @@
 from dataclasses import dataclass
 from datetime import datetime
 import sqlite3
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable
 import json
 import hashlib
 import uuid
 
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import WRITE_TIMEOUT, buffered_write, flush_pending_writes
+    from new_data_assistant_project.src.database.repository import get_user_repository
+    from new_data_assistant_project.src.database.result_store import prune_unreferenced_results
+except ImportError:
+    from src.database.write_behind import WRITE_TIMEOUT, buffered_write, flush_pending_writes
+    from src.database.repository import get_user_repository
+    from src.database.result_store import prune_unreferenced_results
+
 @dataclass
 class User:
     id: Optional[int]
@@ -70,137 +80,25 @@ class User:
     @classmethod
     def authenticate(cls, db_path: str, username: str, password: str) -> Optional['User']:
         """Authenticate user with username and password."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, password_hash, role,
-                   created_at, last_login, sql_expertise_level, 
-                   cognitive_load_capacity, has_completed_assessment,
-                   data_analysis_fundamentals, business_analytics, forecasting_statistics,
-                   data_visualization, domain_knowledge_retail, total_assessment_score,
-                   user_level_category, age, gender, profession, education_level, study_training
-            FROM users WHERE username = ?
-        """, (username,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row and row[2] == cls._hash_password(password):
-            return cls(
-                id=row[0], username=row[1], password_hash=row[2],
-                role=row[3],
-                created_at=datetime.fromisoformat(row[4]),
-                last_login=datetime.fromisoformat(row[5]) if row[5] else None,
-                sql_expertise_level=row[6], 
-                cognitive_load_capacity=row[7], has_completed_assessment=bool(row[8]),
-                data_analysis_fundamentals=row[9] if len(row) > 9 else 0,
-                business_analytics=row[10] if len(row) > 10 else 0,
-                forecasting_statistics=row[11] if len(row) > 11 else 0,
-                data_visualization=row[12] if len(row) > 12 else 0,
-                domain_knowledge_retail=row[13] if len(row) > 13 else 0,
-                total_assessment_score=row[14] if len(row) > 14 else 0,
-                user_level_category=row[15] if len(row) > 15 else "Beginner",
-                sql_concept_levels={},
-                prior_query_history=[],
-                learning_preferences={},
-                age=row[16] if len(row) > 16 else None,
-                gender=row[17] if len(row) > 17 else None,
-                profession=row[18] if len(row) > 18 else None,
-                education_level=row[19] if len(row) > 19 else None,
-                study_training=row[20] if len(row) > 20 else None
-            )
+        user = get_user_repository(db_path).get_by_username(username)
+        if user and user.password_hash == cls._hash_password(password):
+            return user
         return None
 
     @classmethod
     def get_by_id(cls, db_path: str, user_id: int) -> Optional['User']:
         """Retrieve a user by their ID."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, password_hash, role,
-                   created_at, last_login, sql_expertise_level, 
-                   cognitive_load_capacity, has_completed_assessment,
-                   data_analysis_fundamentals, business_analytics, forecasting_statistics,
-                   data_visualization, domain_knowledge_retail, total_assessment_score,
-                   user_level_category, age, gender, profession, education_level, study_training
-            FROM users WHERE id = ?
-        """, (user_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return cls(
-                id=row[0], username=row[1], password_hash=row[2],
-                role=row[3],
-                created_at=datetime.fromisoformat(row[4]),
-                last_login=datetime.fromisoformat(row[5]) if row[5] else None,
-                sql_expertise_level=row[6], 
-                cognitive_load_capacity=row[7], has_completed_assessment=bool(row[8]),
-                data_analysis_fundamentals=row[9] if len(row) > 9 else 0,
-                business_analytics=row[10] if len(row) > 10 else 0,
-                forecasting_statistics=row[11] if len(row) > 11 else 0,
-                data_visualization=row[12] if len(row) > 12 else 0,
-                domain_knowledge_retail=row[13] if len(row) > 13 else 0,
-                total_assessment_score=row[14] if len(row) > 14 else 0,
-                user_level_category=row[15] if len(row) > 15 else "Beginner",
-                sql_concept_levels={},
-                prior_query_history=[],
-                learning_preferences={},
-                age=row[16] if len(row) > 16 else None,
-                gender=row[17] if len(row) > 17 else None,
-                profession=row[18] if len(row) > 18 else None,
-                education_level=row[19] if len(row) > 19 else None,
-                study_training=row[20] if len(row) > 20 else None
-            )
-        return None
+        return get_user_repository(db_path).get_by_id(user_id)
     
     @classmethod
     def get_by_username(cls, db_path: str, username: str) -> Optional['User']:
         """Retrieve a user by their username."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, password_hash, role,
-                   created_at, last_login, sql_expertise_level, 
-                   cognitive_load_capacity, has_completed_assessment,
-                   data_analysis_fundamentals, business_analytics, forecasting_statistics,
-                   data_visualization, domain_knowledge_retail, total_assessment_score,
-                   user_level_category, gender, profession, education_level, study_training
-            FROM users WHERE username = ?
-        """, (username,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return cls(
-                id=row[0], username=row[1], password_hash=row[2],
-                role=row[3],
-                created_at=datetime.fromisoformat(row[4]),
-                last_login=datetime.fromisoformat(row[5]) if row[5] else None,
-                sql_expertise_level=row[6], 
-                cognitive_load_capacity=row[7], has_completed_assessment=bool(row[8]),
-                data_analysis_fundamentals=row[9] if len(row) > 9 else 0,
-                business_analytics=row[10] if len(row) > 10 else 0,
-                forecasting_statistics=row[11] if len(row) > 11 else 0,
-                data_visualization=row[12] if len(row) > 12 else 0,
-                domain_knowledge_retail=row[13] if len(row) > 13 else 0,
-                total_assessment_score=row[14] if len(row) > 14 else 0,
-                user_level_category=row[15] if len(row) > 15 else "Beginner",
-                sql_concept_levels={},
-                prior_query_history=[],
-                learning_preferences={},
-                age=row[16] if len(row) > 16 else None,
-                gender=row[17] if len(row) > 17 else None,
-                profession=row[18] if len(row) > 18 else None,
-                education_level=row[19] if len(row) > 19 else None,
-                study_training=row[20] if len(row) > 20 else None
-            )
-        return None
+        return get_user_repository(db_path).get_by_username(username)
+
+    @classmethod
+    def get_many_by_ids(cls, db_path: str, user_ids: List[int]) -> Dict[int, 'User']:
+        """Retrieve several users at once, keyed by id."""
+        return get_user_repository(db_path).get_many_by_ids(user_ids)
 
     def save(self, db_path: str):
         """Save or update user in database."""
@@ -323,50 +221,7 @@ class User:
     @classmethod
     def get_all_users(cls, db_path: str) -> List['User']:
         """Get all users for admin dashboard."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, username, password_hash, role,
-                   created_at, last_login, sql_expertise_level, 
-                   cognitive_load_capacity, has_completed_assessment,
-                   data_analysis_fundamentals, business_analytics, forecasting_statistics,
-                   data_visualization, domain_knowledge_retail, total_assessment_score,
-                   user_level_category, age, gender, profession, education_level, study_training
-            FROM users
-            ORDER BY created_at DESC
-        """)
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        users = []
-        for row in rows:
-            users.append(cls(
-                id=row[0], username=row[1], password_hash=row[2],
-                role=row[3],
-                created_at=datetime.fromisoformat(row[4]),
-                last_login=datetime.fromisoformat(row[5]) if row[5] else None,
-                sql_expertise_level=row[6], 
-                cognitive_load_capacity=row[7], has_completed_assessment=bool(row[8]),
-                data_analysis_fundamentals=row[9] if len(row) > 9 else 0,
-                business_analytics=row[10] if len(row) > 10 else 0,
-                forecasting_statistics=row[11] if len(row) > 11 else 0,
-                data_visualization=row[12] if len(row) > 12 else 0,
-                domain_knowledge_retail=row[13] if len(row) > 13 else 0,
-                total_assessment_score=row[14] if len(row) > 14 else 0,
-                user_level_category=row[15] if len(row) > 15 else "Beginner",
-                sql_concept_levels={},
-                prior_query_history=[],
-                learning_preferences={},
-                age=row[16] if len(row) > 16 else None,
-                gender=row[17] if len(row) > 17 else None,
-                profession=row[18] if len(row) > 18 else None,
-                education_level=row[19] if len(row) > 19 else None,
-                study_training=row[20] if len(row) > 20 else None
-            ))
-        
-        return users
+        return get_user_repository(db_path).get_all()
 
 
 @dataclass
@@ -379,10 +234,12 @@ class ChatSession:
     sql_query: Optional[str]
     explanation_given: bool
     created_at: datetime
+    result_id: Optional[str] = None  # Content hash of the result set in query_results
     
     @classmethod
     def create_session(cls, user_id: int, user_message: str, system_response: str, 
-                      sql_query: str = None, explanation_given: bool = False) -> 'ChatSession':
+                      sql_query: str = None, explanation_given: bool = False,
+                      result_id: str = None) -> 'ChatSession':
         """Create a new chat session."""
         return cls(
             id=None,
@@ -392,36 +249,46 @@ class ChatSession:
             system_response=system_response,
             sql_query=sql_query,
             explanation_given=explanation_given,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            result_id=result_id
         )
     
-    def save(self, db_path: str):
-        """Save chat session to database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def save(self, db_path: str, wait: bool = True):
+        """
+        Save chat session to database through the write-behind buffer.
+        
+        Args:
+            db_path: Path to the app database
+            wait: If False, return immediately; the id is filled in by resolve_id()
+        """
+        self._pending_write = buffered_write(db_path, """
             INSERT INTO chat_sessions (user_id, session_uuid, user_message, system_response, 
-                                     sql_query, explanation_given, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+                                     sql_query, explanation_given, created_at, result_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             self.user_id, self.session_uuid, self.user_message, self.system_response,
-            self.sql_query, self.explanation_given, self.created_at.isoformat()
-        ))
-        self.id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
+            self.sql_query, self.explanation_given, self.created_at.isoformat(), self.result_id
+        ), wait=wait)
+        if wait:
+            self.id = self._pending_write.result(WRITE_TIMEOUT)
+    
+    def resolve_id(self, timeout: Optional[float] = 30.0) -> Optional[int]:
+        """Return the row id, waiting for a buffered insert to be committed if necessary."""
+        pending = getattr(self, '_pending_write', None)
+        if self.id is None and pending is not None:
+            self.id = pending.result(timeout)
+        return self.id
     
     @classmethod
     def get_user_sessions(cls, db_path: str, user_id: int, limit: int = 50) -> List['ChatSession']:
         """Get recent chat sessions for a user."""
+        flush_pending_writes(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
         cursor.execute("""
             SELECT id, user_id, session_uuid, user_message, system_response, 
-                   sql_query, explanation_given, created_at
+                   sql_query, explanation_given, created_at, result_id
             FROM chat_sessions 
             WHERE user_id = ? 
             ORDER BY created_at DESC 
@@ -436,18 +303,103 @@ class ChatSession:
             sessions.append(cls(
                 id=row[0], user_id=row[1], session_uuid=row[2], user_message=row[3],
                 system_response=row[4], sql_query=row[5], explanation_given=bool(row[6]),
-                created_at=datetime.fromisoformat(row[7])
+                created_at=datetime.fromisoformat(row[7]), result_id=row[8]
             ))
         
         return sessions
     
+    @classmethod
+    def get_user_session_headers(cls, db_path: str, user_id: int, before_id: Optional[int] = None,
+                                 limit: int = 20) -> List['ChatSessionHeader']:
+        """
+        Get one page of chat session headers for a user, newest first.
+        
+        Uses keyset pagination on (user_id, id): pass the smallest id of the previous
+        page as before_id to get the next older page. Response bodies are not loaded.
+        """
+        flush_pending_writes(db_path)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, user_id, user_message, explanation_given, created_at,
+                   length(system_response), result_id
+            FROM chat_sessions 
+            WHERE user_id = ? AND id < ?
+            ORDER BY id DESC 
+            LIMIT ?
+        """, (user_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [
+            ChatSessionHeader(
+                id=row[0], user_id=row[1], user_message=row[2], explanation_given=bool(row[3]),
+                created_at=datetime.fromisoformat(row[4]), response_length=row[5] or 0,
+                result_id=row[6]
+            )
+            for row in rows
+        ]
+    
+    @classmethod
+    def get_response(cls, db_path: str, session_id: int) -> Optional[str]:
+        """Load the stored system response of a single chat session."""
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT system_response FROM chat_sessions WHERE id = ?", (session_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    
+    @classmethod
+    def find_sql_for_message(cls, db_path: str, user_message: str,
+                             accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        SQL of the most recent successful session with the same question (case-insensitive).
+        
+        Args:
+            db_path: Path to the app database
+            user_message: Question to look up
+            accept: Only return SQL this returns True for (e.g. read-only statements)
+        """
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT sql_query FROM chat_sessions
+            WHERE lower(trim(user_message)) = ? AND sql_query IS NOT NULL AND sql_query != ''
+            ORDER BY id DESC LIMIT 20
+        ''', (user_message.strip().lower(),))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        for (sql_query,) in rows:
+            if accept is None or accept(sql_query):
+                return sql_query
+        return None
+    
+    @classmethod
+    def append_response(cls, db_path: str, session_uuid: str, text: str):
+        """Append text (e.g. a lazily generated explanation) to a stored system response."""
+        buffered_write(db_path, """
+            UPDATE chat_sessions SET system_response = system_response || ? WHERE session_uuid = ?
+        """, (text, session_uuid), wait=False)
+
     @classmethod
     def delete_user_sessions(cls, db_path: str, user_id: int):
         """Delete all chat sessions for a specific user."""
+        # Buffered inserts must land before the delete, not after it
+        flush_pending_writes(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
         try:
+            cursor.execute("SELECT DISTINCT result_id FROM chat_sessions WHERE user_id = ? AND result_id IS NOT NULL",
+                           (user_id,))
+            result_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute("DELETE FROM chat_sessions WHERE user_id = ?", (user_id,))
             conn.commit()
         except Exception as e:
@@ -455,6 +407,21 @@ class ChatSession:
             raise e
         finally:
             conn.close()
+        
+        # Result sets are shared between sessions, so only drop this user's ones that are now unused
+        prune_unreferenced_results(db_path, result_ids)
+
+
+@dataclass
+class ChatSessionHeader:
+    """Lightweight chat history entry without the (potentially large) response body."""
+    id: int
+    user_id: int
+    user_message: str
+    explanation_given: bool
+    created_at: datetime
+    response_length: int
+    result_id: Optional[str] = None
 
 
 @dataclass
@@ -484,12 +451,9 @@ class ExplanationFeedback:
             created_at=datetime.now()
         )
     
-    def save(self, db_path: str):
-        """Save feedback to database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def save(self, db_path: str, wait: bool = True):
+        """Save feedback to database through the write-behind buffer."""
+        pending = buffered_write(db_path, """
             INSERT INTO explanation_feedback (user_id, session_id, explanation_given, 
                                             was_needed, was_helpful, would_have_been_needed, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -497,15 +461,14 @@ class ExplanationFeedback:
             self.user_id, self.session_id, self.explanation_given,
             self.was_needed, self.was_helpful, self.would_have_been_needed,
             self.created_at.isoformat()
-        ))
-        self.id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
+        ), wait=wait)
+        if wait:
+            self.id = pending.result(WRITE_TIMEOUT)
     
     @classmethod
     def get_all_feedback(cls, db_path: str) -> List['ExplanationFeedback']:
         """Get all feedback for admin dashboard."""
+        flush_pending_writes(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
@@ -587,12 +550,9 @@ class ComprehensiveFeedback:
             created_at=datetime.now()
         )
     
-    def save(self, db_path: str):
-        """Save comprehensive feedback to database."""
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def save(self, db_path: str, wait: bool = True):
+        """Save comprehensive feedback to database through the write-behind buffer."""
+        pending = buffered_write(db_path, """
             INSERT INTO comprehensive_feedback (
                 user_id, frequency_rating, frequency_reason, explanation_quality_rating,
                 explanation_quality_reason, system_helpfulness_rating, system_helpfulness_reason,
@@ -609,15 +569,14 @@ class ComprehensiveFeedback:
             self.auto_explanation, self.auto_reason, self.system_accuracy,
             self.system_accuracy_index, self.recommendation, self.recommendation_index,
             self.created_at.isoformat()
-        ))
-        self.id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
+        ), wait=wait)
+        if wait:
+            self.id = pending.result(WRITE_TIMEOUT)
     
     @classmethod
     def get_all_feedback(cls, db_path: str) -> List['ComprehensiveFeedback']:
         """Get all comprehensive feedback for admin dashboard."""
+        flush_pending_writes(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
@@ -657,6 +616,7 @@ class ComprehensiveFeedback:
     @classmethod
     def get_user_feedback(cls, db_path: str, user_id: int) -> Optional['ComprehensiveFeedback']:
         """Get comprehensive feedback for a specific user."""
+        flush_pending_writes(db_path)
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
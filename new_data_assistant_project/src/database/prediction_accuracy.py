@@ -0,0 +1,252 @@
+"""
+Explanation-prediction accuracy tracking.
+
+Every recorded prediction is a row in ``prediction_accuracy``. Confusion-matrix
+counters (TP/FP/FN/TN) are maintained by triggers on that table: one running
+total per user plus a global total (user_id 0), and one row per user and day.
+Overall metrics are therefore a single-row read, and windowed metrics sum at
+most one row per day in the window.
+"""
+
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import buffered_write, flush_pending_writes
+except ImportError:
+    from src.database.write_behind import buffered_write, flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+# Counter rows with this user_id hold the totals over all users
+GLOBAL_USER_ID = 0
+
+# Per-row contribution of a prediction to each confusion-matrix cell (tp, fp, fn, tn)
+_CELLS = (
+    "({row}.predicted_explanation_needed AND {row}.actual_explanation_needed)",
+    "({row}.predicted_explanation_needed AND NOT {row}.actual_explanation_needed)",
+    "(NOT {row}.predicted_explanation_needed AND {row}.actual_explanation_needed)",
+    "(NOT {row}.predicted_explanation_needed AND NOT {row}.actual_explanation_needed)",
+)
+
+
+def _insert_trigger_body() -> str:
+    """Statements adding NEW to the running totals and daily counters (own user and global)."""
+    tp, fp, fn, tn = [cell.format(row='NEW') for cell in _CELLS]
+    statements = []
+    for user_expr in ('NEW.user_id', str(GLOBAL_USER_ID)):
+        statements.append(f"""
+        INSERT INTO prediction_accuracy_totals (user_id, tp, fp, fn, tn)
+        VALUES ({user_expr}, {tp}, {fp}, {fn}, {tn})
+        ON CONFLICT(user_id) DO UPDATE SET
+            tp = tp + excluded.tp, fp = fp + excluded.fp,
+            fn = fn + excluded.fn, tn = tn + excluded.tn;
+        INSERT INTO prediction_accuracy_daily (user_id, day, tp, fp, fn, tn)
+        VALUES ({user_expr}, date(NEW.created_at), {tp}, {fp}, {fn}, {tn})
+        ON CONFLICT(user_id, day) DO UPDATE SET
+            tp = tp + excluded.tp, fp = fp + excluded.fp,
+            fn = fn + excluded.fn, tn = tn + excluded.tn;""")
+    return ''.join(statements)
+
+
+def _delete_trigger_body() -> str:
+    """Statements removing OLD from the counters it was added to."""
+    tp, fp, fn, tn = [cell.format(row='OLD') for cell in _CELLS]
+    statements = []
+    for user_expr in ('OLD.user_id', str(GLOBAL_USER_ID)):
+        statements.append(f"""
+        UPDATE prediction_accuracy_totals
+        SET tp = tp - {tp}, fp = fp - {fp}, fn = fn - {fn}, tn = tn - {tn}
+        WHERE user_id = {user_expr};
+        UPDATE prediction_accuracy_daily
+        SET tp = tp - {tp}, fp = fp - {fp}, fn = fn - {fn}, tn = tn - {tn}
+        WHERE user_id = {user_expr} AND day = date(OLD.created_at);""")
+    return ''.join(statements)
+
+
+def create_prediction_accuracy_tables(cursor: sqlite3.Cursor):
+    """Create prediction_accuracy, its counter tables and the triggers maintaining them."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS prediction_accuracy (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        user_id INTEGER NOT NULL,
+        predicted_explanation_needed BOOLEAN NOT NULL,
+        actual_explanation_needed BOOLEAN NOT NULL,
+        confidence_score REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_prediction_accuracy_user_id ON prediction_accuracy(user_id)')
+
+    counters_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prediction_accuracy_totals'"
+    ).fetchone()
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS prediction_accuracy_totals (
+        user_id INTEGER PRIMARY KEY,
+        tp INTEGER NOT NULL DEFAULT 0,
+        fp INTEGER NOT NULL DEFAULT 0,
+        fn INTEGER NOT NULL DEFAULT 0,
+        tn INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS prediction_accuracy_daily (
+        user_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        tp INTEGER NOT NULL DEFAULT 0,
+        fp INTEGER NOT NULL DEFAULT 0,
+        fn INTEGER NOT NULL DEFAULT 0,
+        tn INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, day)
+    )
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS prediction_accuracy_counters_ai
+    AFTER INSERT ON prediction_accuracy BEGIN{_insert_trigger_body()}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS prediction_accuracy_counters_ad
+    AFTER DELETE ON prediction_accuracy BEGIN{_delete_trigger_body()}
+    END
+    ''')
+
+    if not counters_exist:
+        rebuild_counters(cursor)
+
+
+def rebuild_counters(cursor: sqlite3.Cursor):
+    """Recompute all counters from prediction_accuracy (used once when they are introduced)."""
+    cursor.execute("DELETE FROM prediction_accuracy_totals")
+    cursor.execute("DELETE FROM prediction_accuracy_daily")
+    sums = """
+        SUM(predicted_explanation_needed AND actual_explanation_needed),
+        SUM(predicted_explanation_needed AND NOT actual_explanation_needed),
+        SUM(NOT predicted_explanation_needed AND actual_explanation_needed),
+        SUM(NOT predicted_explanation_needed AND NOT actual_explanation_needed)
+    """
+    cursor.execute(f"INSERT INTO prediction_accuracy_totals SELECT user_id, {sums} FROM prediction_accuracy GROUP BY user_id")
+    cursor.execute(f"INSERT INTO prediction_accuracy_totals SELECT {GLOBAL_USER_ID}, {sums} FROM prediction_accuracy HAVING COUNT(*) > 0")
+    cursor.execute(f"INSERT INTO prediction_accuracy_daily SELECT user_id, date(created_at), {sums} "
+                   f"FROM prediction_accuracy GROUP BY user_id, date(created_at)")
+    cursor.execute(f"INSERT INTO prediction_accuracy_daily SELECT {GLOBAL_USER_ID}, date(created_at), {sums} "
+                   f"FROM prediction_accuracy GROUP BY date(created_at)")
+
+
+def compute_metrics(tp: int, fp: int, fn: int, tn: int) -> Dict[str, Any]:
+    """Accuracy, precision, recall and F1 from confusion-matrix counts."""
+    total = tp + fp + fn + tn
+    accuracy = (tp + tn) / total if total > 0 else 0.0
+    precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
+    recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+    f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
+    return {
+        'total_predictions': total,
+        'accuracy': accuracy,
+        'precision': precision,
+        'recall': recall,
+        'f1_score': f1_score,
+        'true_positives': tp,
+        'false_positives': fp,
+        'false_negatives': fn,
+        'true_negatives': tn
+    }
+
+
+class PredictionAccuracyTracker:
+    """Tracks prediction accuracy for explanation decisions."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        try:
+            create_prediction_accuracy_tables(conn.cursor())
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error creating prediction accuracy tables: {e}")
+        finally:
+            conn.close()
+
+    def record_prediction(self, session_id: int, user_id: int,
+                         predicted_explanation_needed: bool,
+                         actual_explanation_needed: bool,
+                         confidence_score: float = None):
+        """Record a prediction and its actual outcome (buffered, not on the request path)."""
+        try:
+            buffered_write(self.db_path, """
+                INSERT INTO prediction_accuracy (session_id, user_id, predicted_explanation_needed,
+                                               actual_explanation_needed, confidence_score, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                session_id, user_id, bool(predicted_explanation_needed), bool(actual_explanation_needed),
+                confidence_score, datetime.now().isoformat()
+            ), wait=False)
+
+        except Exception as e:
+            logger.error(f"Error recording prediction: {e}")
+
+    def get_accuracy_metrics(self, user_id: int = None, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get accuracy metrics for predictions.
+
+        Args:
+            user_id: Restrict to one user (all users if None)
+            days: Only count predictions from the last N days, including today (all time if None)
+        """
+        try:
+            flush_pending_writes(self.db_path)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                key = user_id if user_id else GLOBAL_USER_ID
+                if days is None:
+                    row = conn.execute("""
+                        SELECT tp, fp, fn, tn FROM prediction_accuracy_totals WHERE user_id = ?
+                    """, (key,)).fetchone()
+                else:
+                    row = conn.execute("""
+                        SELECT SUM(tp), SUM(fp), SUM(fn), SUM(tn)
+                        FROM prediction_accuracy_daily
+                        WHERE user_id = ? AND day >= ?
+                    """, (key, self._window_start(days))).fetchone()
+            finally:
+                conn.close()
+
+            return compute_metrics(*[value or 0 for value in (row or (0, 0, 0, 0))])
+
+        except Exception as e:
+            logger.error(f"Error getting accuracy metrics: {e}")
+            return compute_metrics(0, 0, 0, 0)
+
+    def get_daily_metrics(self, user_id: int = None, days: int = 30) -> List[Dict[str, Any]]:
+        """Per-day metrics for the last N days (days without predictions are omitted)."""
+        try:
+            flush_pending_writes(self.db_path)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute("""
+                    SELECT day, tp, fp, fn, tn
+                    FROM prediction_accuracy_daily
+                    WHERE user_id = ? AND day >= ?
+                    ORDER BY day
+                """, (user_id if user_id else GLOBAL_USER_ID, self._window_start(days))).fetchall()
+            finally:
+                conn.close()
+
+            return [dict(compute_metrics(*row[1:]), day=row[0]) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Error getting daily accuracy metrics: {e}")
+            return []
+
+    @staticmethod
+    def _window_start(days: int) -> str:
+        return (date.today() - timedelta(days=max(1, days) - 1)).isoformat()
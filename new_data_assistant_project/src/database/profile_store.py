@@ -0,0 +1,355 @@
+"""
+SQLite-backed store for CLT-CFT user profiles.
+
+Profiles used to live in one JSON file that was rewritten in full on every update.
+Each profile is now a row in ``clt_user_profiles`` that is upserted on its own, and
+every saved version is appended to ``clt_user_profile_history``. Profiles are loaded
+on first access into a bounded in-memory LRU instead of parsing everything at
+startup. The store behaves like the dict the agent used before (``in``, ``[]``,
+``[]=``, ``get``, ``items``), so call sites did not have to change.
+
+Several workers may share the database, each with its own LRU. Every row carries
+a version: a save only succeeds against the version the profile was loaded at,
+and a conflicting save reloads the newer profile instead of overwriting it
+(``update`` re-applies its change to that copy). Cached profiles are checked
+against the stored version once they are older than
+``DATA_ASSISTANT_PROFILE_REVALIDATE_SECONDS``.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import buffered_write, flush_pending_writes
+    from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+except ImportError:
+    from src.database.write_behind import buffered_write, flush_pending_writes
+    from src.utils.metrics_collector import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 512
+# Cached profiles checked longer ago than this are compared with the stored version
+REVALIDATE_SECONDS = float(os.getenv("DATA_ASSISTANT_PROFILE_REVALIDATE_SECONDS", "1"))
+# Attempts of update() while other workers keep saving the same profile
+UPDATE_ATTEMPTS = 3
+# Stored version a profile object was loaded at (or last saved as)
+_VERSION_ATTR = "_profile_version"
+
+_UPSERT_PROFILE = """
+    INSERT INTO clt_user_profiles (user_id, profile_json, updated_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        profile_json = excluded.profile_json,
+        updated_at = excluded.updated_at
+"""
+
+_INSERT_PROFILE = """
+    INSERT INTO clt_user_profiles (user_id, profile_json, updated_at, version)
+    VALUES (?, ?, ?, 1)
+    ON CONFLICT(user_id) DO NOTHING
+"""
+
+_UPDATE_PROFILE = """
+    UPDATE clt_user_profiles SET profile_json = ?, updated_at = ?, version = ?
+    WHERE user_id = ? AND version = ?
+"""
+
+_APPEND_HISTORY = """
+    INSERT INTO clt_user_profile_history (user_id, profile_json, reason, created_at)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def create_profile_tables(cursor: sqlite3.Cursor):
+    """Create the profile and profile history tables if they do not exist."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS clt_user_profiles (
+        user_id TEXT PRIMARY KEY,
+        profile_json TEXT NOT NULL,
+        updated_at TIMESTAMP NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1
+    )
+    ''')
+    # Tables created before versioning get the column added in place
+    profile_columns = [row[1] for row in cursor.execute("PRAGMA table_info(clt_user_profiles)").fetchall()]
+    if 'version' not in profile_columns:
+        cursor.execute("ALTER TABLE clt_user_profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS clt_user_profile_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        profile_json TEXT NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMP NOT NULL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_clt_user_profile_history_user_id '
+                   'ON clt_user_profile_history(user_id, id)')
+
+
+class ProfileStore:
+    """Dict-like profile store with per-user upserts and an LRU of loaded profiles."""
+
+    def __init__(self, db_path: str, profile_factory: Callable[..., Any],
+                 cache_size: int = DEFAULT_CACHE_SIZE, legacy_json_path: Optional[str] = None):
+        """
+        Args:
+            db_path: Path to the app database
+            profile_factory: Class used to rebuild profiles from their stored fields
+            cache_size: Maximum number of profiles kept in memory
+            legacy_json_path: Old user_profiles.json, imported once if the table is empty
+        """
+        self.db_path = str(db_path)
+        self.profile_factory = profile_factory
+        self.cache_size = cache_size
+        # user_id -> (profile, monotonic time its version was last confirmed)
+        self._cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            create_profile_tables(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
+        if legacy_json_path:
+            self.import_legacy_json(legacy_json_path)
+
+    # Mapping interface
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id: str):
+        profile = self.get(user_id)
+        if profile is None:
+            raise KeyError(user_id)
+        return profile
+
+    def __setitem__(self, user_id: str, profile: Any):
+        self._write(user_id, profile, reason="create")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        flush_pending_writes(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM clt_user_profiles").fetchone()[0]
+        finally:
+            conn.close()
+
+    def get(self, user_id: str, default: Any = None):
+        """Return a profile, loading it from the database on a cache miss or when stale."""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                self._cache.move_to_end(user_id)
+        profile = None
+        if entry is not None:
+            cached, checked_at = entry
+            if time.monotonic() - checked_at < REVALIDATE_SECONDS or self._is_current(user_id, cached):
+                profile = cached
+        get_metrics_collector().record_cache_access("profile_store", hit=profile is not None)
+        if profile is None:
+            profile = self._load(user_id)
+        return default if profile is None else profile
+
+    def keys(self) -> List[str]:
+        flush_pending_writes(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT user_id FROM clt_user_profiles ORDER BY user_id")]
+        finally:
+            conn.close()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over all stored profiles (loads them one by one)."""
+        for user_id in self.keys():
+            profile = self.get(user_id)
+            if profile is not None:
+                yield user_id, profile
+
+    def values(self) -> Iterator[Any]:
+        for _, profile in self.items():
+            yield profile
+
+    # Persistence
+
+    def save(self, user_id: str, profile: Any, reason: str = "update") -> bool:
+        """
+        Persist a profile after it was modified in place, cached or not.
+
+        Returns:
+            False if another worker saved the profile since it was loaded; the newer
+            version is then loaded instead and this change is not written
+        """
+        return self._write(user_id, profile, reason=reason)
+
+    def update(self, user_id: str, mutate: Callable[[Any], None], reason: str = "update") -> Optional[Any]:
+        """
+        Apply mutate to the current profile and save it, retrying on the newer version
+        if another worker saved in between.
+
+        Returns:
+            The saved profile, or None if it does not exist or could not be saved
+        """
+        for _ in range(UPDATE_ATTEMPTS):
+            profile = self.get(user_id)
+            if profile is None:
+                return None
+            mutate(profile)
+            if self._write(user_id, profile, reason=reason):
+                return profile
+        logger.warning(f"Gave up saving profile {user_id} after {UPDATE_ATTEMPTS} conflicting saves")
+        return None
+
+    def history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent saved versions of a profile, newest first."""
+        flush_pending_writes(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("""
+                SELECT profile_json, reason, created_at
+                FROM clt_user_profile_history
+                WHERE user_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (user_id, limit)).fetchall()
+        finally:
+            conn.close()
+        return [{"profile": json.loads(row[0]), "reason": row[1], "created_at": row[2]} for row in rows]
+
+    def import_legacy_json(self, json_path: str) -> int:
+        """
+        Import profiles from the old JSON file, once.
+
+        Only runs while the profile table is empty, so a JSON file that is still
+        lying around never overwrites newer database state.
+
+        Returns:
+            Number of imported profiles
+        """
+        if not os.path.exists(json_path):
+            return 0
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            if conn.execute("SELECT 1 FROM clt_user_profiles LIMIT 1").fetchone():
+                return 0
+
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+
+            now = datetime.now().isoformat()
+            rows = []
+            for user_id, profile_data in data.items():
+                profile = self._decode(user_id, json.dumps(profile_data))
+                if profile is not None:
+                    rows.append((user_id, self._encode(profile), now))
+
+            with conn:
+                conn.executemany(_UPSERT_PROFILE, rows)
+                conn.executemany(_APPEND_HISTORY, [(user_id, profile_json, "import", created_at)
+                                                   for user_id, profile_json, created_at in rows])
+            logger.info(f"Imported {len(rows)} user profiles from {json_path}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error importing user profiles from {json_path}: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def _write(self, user_id: str, profile: Any, reason: str) -> bool:
+        """Save a profile against the version it was loaded at (a new one only if none exists)."""
+        try:
+            profile_json = self._encode(profile)
+            now = datetime.now().isoformat()
+            version = getattr(profile, _VERSION_ATTR, None)
+            if version is None:
+                pending = buffered_write(self.db_path, _INSERT_PROFILE, (user_id, profile_json, now))
+                new_version = 1
+            else:
+                new_version = version + 1
+                pending = buffered_write(self.db_path, _UPDATE_PROFILE,
+                                         (profile_json, now, new_version, user_id, version))
+            if not pending.rowcount:
+                logger.warning(f"Profile {user_id} was saved elsewhere since it was loaded; reloading it")
+                self._load(user_id)
+                return False
+            setattr(profile, _VERSION_ATTR, new_version)
+            with self._lock:
+                self._remember(user_id, profile)
+            buffered_write(self.db_path, _APPEND_HISTORY, (user_id, profile_json, reason, now), wait=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving user profile {user_id}: {e}")
+            return False
+
+    def _load(self, user_id: str):
+        """Load the stored profile into the cache; None if there is none."""
+        flush_pending_writes(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT profile_json, version FROM clt_user_profiles WHERE user_id = ?",
+                               (user_id,)).fetchone()
+        finally:
+            conn.close()
+        profile = self._decode(user_id, row[0]) if row else None
+        with self._lock:
+            if profile is None:
+                self._cache.pop(user_id, None)
+                return None
+            setattr(profile, _VERSION_ATTR, row[1])
+            # Another thread may have loaded (and modified) the same version meanwhile; keep that one
+            entry = self._cache.get(user_id)
+            if entry is not None and getattr(entry[0], _VERSION_ATTR, None) == row[1]:
+                self._remember(user_id, entry[0])
+                return entry[0]
+            self._remember(user_id, profile)
+        return profile
+
+    def _is_current(self, user_id: str, profile: Any) -> bool:
+        """True if the stored row still has the version of profile (refreshes its check time)."""
+        flush_pending_writes(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT version FROM clt_user_profiles WHERE user_id = ?", (user_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[0] != getattr(profile, _VERSION_ATTR, None):
+            return False
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[0] is profile:
+                self._cache[user_id] = (profile, time.monotonic())
+        return True
+
+    def _remember(self, user_id: str, profile: Any):
+        self._cache[user_id] = (profile, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _encode(profile: Any) -> str:
+        return json.dumps(asdict(profile))
+
+    def _decode(self, user_id: str, profile_json: str):
+        try:
+            return self.profile_factory(**json.loads(profile_json))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable profile for {user_id}: {e}")
+            return None
@@ -0,0 +1,204 @@
+"""
+Repository layer for the users table.
+
+All user lookups go through one column list and one row mapper instead of repeating
+the SELECT and positional unpacking per method. Rows are fetched as sqlite3.Row,
+the column-to-field plan is compiled once per result layout, and each thread keeps
+a connection open so sqlite3's prepared-statement cache is actually reused.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Column order of the users table as read by the application
+USER_COLUMNS: Tuple[str, ...] = (
+    "id", "username", "password_hash", "role",
+    "created_at", "last_login", "sql_expertise_level",
+    "cognitive_load_capacity", "has_completed_assessment",
+    "data_analysis_fundamentals", "business_analytics", "forecasting_statistics",
+    "data_visualization", "domain_knowledge_retail", "total_assessment_score",
+    "user_level_category", "age", "gender", "profession", "education_level", "study_training",
+)
+
+_USER_SELECT = f"SELECT {', '.join(USER_COLUMNS)} FROM users"
+
+# Placeholder counts used for IN (...) batches; padding to these sizes keeps the
+# number of distinct statements (and thus cache entries) small
+_BATCH_SIZES = (1, 8, 32, 128, 512)
+
+# Statements are built once so every call hands sqlite3 the identical string
+_SELECT_BY_ID = f"{_USER_SELECT} WHERE id = ?"
+_SELECT_BY_USERNAME = f"{_USER_SELECT} WHERE username = ?"
+_SELECT_ALL = f"{_USER_SELECT} ORDER BY created_at DESC"
+_SELECT_BY_IDS = {size: f"{_USER_SELECT} WHERE id IN ({', '.join('?' * size)})" for size in _BATCH_SIZES}
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _parse_bool(value: Any) -> bool:
+    return bool(value)
+
+
+class RowMapper:
+    """Maps sqlite3.Row objects to constructor kwargs using a precompiled column plan."""
+
+    def __init__(self, converters: Dict[str, Callable[[Any], Any]], defaults: Dict[str, Any]):
+        self.converters = converters
+        self.defaults = defaults
+        self._plans: Dict[Tuple[str, ...], Tuple[Tuple[int, str, Optional[Callable[[Any], Any]]], ...]] = {}
+
+    def compile(self, keys: Sequence[str]):
+        """Return the (index, field, converter) plan for a result layout, building it once."""
+        keys = tuple(keys)
+        plan = self._plans.get(keys)
+        if plan is None:
+            plan = tuple((index, key, self.converters.get(key)) for index, key in enumerate(keys))
+            self._plans[keys] = plan
+        return plan
+
+    def to_kwargs(self, row: sqlite3.Row, plan=None) -> Dict[str, Any]:
+        """Convert one row; columns missing from the result fall back to the defaults."""
+        if plan is None:
+            plan = self.compile(row.keys())
+        kwargs = dict(self.defaults)
+        for index, key, convert in plan:
+            value = row[index]
+            if convert is not None:
+                value = convert(value)
+            elif value is None and key in self.defaults:
+                value = self.defaults[key]
+            kwargs[key] = value
+        return kwargs
+
+
+class UserRepository:
+    """Read access to users with a shared row mapper and per-thread connections."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._user_cls = None
+        self.mapper = RowMapper(
+            converters={
+                "created_at": _parse_datetime,
+                "last_login": _parse_datetime,
+                "has_completed_assessment": _parse_bool,
+            },
+            defaults={
+                "data_analysis_fundamentals": 0,
+                "business_analytics": 0,
+                "forecasting_statistics": 0,
+                "data_visualization": 0,
+                "domain_knowledge_retail": 0,
+                "total_assessment_score": 0,
+                "user_level_category": "Beginner",
+                "age": None,
+                "gender": None,
+                "profession": None,
+                "education_level": None,
+                "study_training": None,
+            },
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the connection held by the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _fetch(self, sql: str, params: Sequence[Any] = ()) -> List[Any]:
+        """Run a SELECT over users and map every row to a User."""
+        try:
+            cursor = self._connection().execute(sql, params)
+        except sqlite3.ProgrammingError:
+            # Connection was closed underneath us; reconnect once
+            self._local.conn = None
+            cursor = self._connection().execute(sql, params)
+        plan = self.mapper.compile([column[0] for column in cursor.description])
+        return [self._to_user(row, plan) for row in cursor.fetchall()]
+
+    def _to_user(self, row: sqlite3.Row, plan):
+        if self._user_cls is None:
+            # Imported lazily to avoid a circular import with models.py
+            try:
+                from new_data_assistant_project.src.database.models import User
+            except ImportError:
+                from src.database.models import User
+            self._user_cls = User
+
+        kwargs = self.mapper.to_kwargs(row, plan)
+        kwargs["sql_concept_levels"] = {}
+        kwargs["prior_query_history"] = []
+        kwargs["learning_preferences"] = {}
+        return self._user_cls(**kwargs)
+
+    def get_by_id(self, user_id: int):
+        """Retrieve a user by id."""
+        users = self._fetch(_SELECT_BY_ID, (user_id,))
+        return users[0] if users else None
+
+    def get_by_username(self, username: str):
+        """Retrieve a user by username."""
+        users = self._fetch(_SELECT_BY_USERNAME, (username,))
+        return users[0] if users else None
+
+    def get_many_by_ids(self, user_ids: Iterable[int]) -> Dict[int, Any]:
+        """
+        Retrieve several users in as few statements as possible.
+
+        Args:
+            user_ids: Ids to look up (duplicates and unknown ids are ignored)
+
+        Returns:
+            Dict mapping user id to User
+        """
+        unique_ids = list(dict.fromkeys(user_ids))
+        users: Dict[int, Any] = {}
+        start = 0
+        while start < len(unique_ids):
+            remaining = len(unique_ids) - start
+            size = next((s for s in _BATCH_SIZES if s >= remaining), _BATCH_SIZES[-1])
+            chunk = unique_ids[start:start + size]
+            params = chunk + [None] * (size - len(chunk))
+            for user in self._fetch(_SELECT_BY_IDS[size], params):
+                users[user.id] = user
+            start += size
+        return users
+
+    def get_all(self):
+        """Retrieve all users, newest first."""
+        return self._fetch(_SELECT_ALL)
+
+
+_repositories: Dict[str, UserRepository] = {}
+_repositories_lock = threading.Lock()
+
+
+def get_user_repository(db_path) -> UserRepository:
+    """Return the shared repository for a database file."""
+    key = os.path.abspath(str(db_path))
+    with _repositories_lock:
+        repository = _repositories.get(key)
+        if repository is None:
+            repository = UserRepository(key)
+            _repositories[key] = repository
+        return repository
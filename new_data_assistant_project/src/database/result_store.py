@@ -0,0 +1,219 @@
+"""
+Content-addressed store for query result sets.
+
+Chat sessions used to embed the full result as a markdown table in
+``system_response``. Result sets are now written once to ``query_results`` as
+zstd-compressed Parquet and referenced from ``chat_sessions.result_id``. The id
+is the SHA-256 of the result contents, so asking the same question twice stores
+the data only once, and a stored result never changes once written.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import buffered_write, flush_pending_writes
+    from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+except ImportError:
+    from src.database.write_behind import buffered_write, flush_pending_writes
+    from src.utils.metrics_collector import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+# Results larger than this are truncated before they are stored
+MAX_RESULT_ROWS = int(os.getenv("DATA_ASSISTANT_RESULT_MAX_ROWS", "10000"))
+MAX_RESULT_BYTES = int(os.getenv("DATA_ASSISTANT_RESULT_MAX_BYTES", str(5 * 1024 * 1024)))
+
+RESULT_FORMAT = "parquet-zstd"
+
+# Unreferenced results younger than this are kept: their chat session may still be queued
+PRUNE_GRACE_SECONDS = int(os.getenv("DATA_ASSISTANT_RESULT_PRUNE_GRACE", "600"))
+
+# Decoded frames kept in memory; results are immutable, so entries never go stale
+_CACHE_SIZE = 32
+_frame_cache: "OrderedDict[Tuple[str, str], pd.DataFrame]" = OrderedDict()
+_frame_cache_lock = threading.Lock()
+
+
+@dataclass
+class StoredResult:
+    """Metadata of a stored result set."""
+    id: str
+    row_count: int
+    stored_row_count: int
+    column_count: int
+    byte_size: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.stored_row_count < self.row_count
+
+
+def result_hash(df: pd.DataFrame) -> str:
+    """Hash column names, dtypes and cell values of a result set."""
+    digest = hashlib.sha256()
+    for column, dtype in df.dtypes.items():
+        digest.update(f"{column}\x1f{dtype}\x1e".encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _encode(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, engine="pyarrow", compression="zstd", index=False)
+    return buffer.getvalue()
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Give the frame string column names and a clean index so Parquet accepts it."""
+    df = df.reset_index(drop=True)
+    df.columns = [str(column) for column in df.columns]
+    return df
+
+
+def encode_result(df: pd.DataFrame, max_rows: int = MAX_RESULT_ROWS,
+                  max_bytes: int = MAX_RESULT_BYTES) -> Tuple[bytes, int]:
+    """
+    Serialize a result set within the configured size caps.
+
+    Returns:
+        (payload, stored_row_count); rows are dropped from the end until both caps hold
+    """
+    stored = df.head(max_rows)
+    payload = _encode(stored)
+    while len(payload) > max_bytes and len(stored) > 1:
+        stored = stored.head(max(1, len(stored) * max_bytes // len(payload) * 9 // 10))
+        payload = _encode(stored)
+    return payload, len(stored)
+
+
+def store_result(db_path: str, df: pd.DataFrame) -> Optional[StoredResult]:
+    """
+    Persist a result set unless an identical one is already stored.
+
+    The insert goes through the write-behind buffer ahead of the chat session that
+    references it, so both land in the same batch without blocking the request.
+
+    Returns:
+        StoredResult with the content hash as id, or None if nothing could be stored
+    """
+    if df is None or df.empty:
+        return None
+    try:
+        df = _prepare(df)
+        result_id = result_hash(df)
+        payload, stored_rows = encode_result(df)
+        if len(payload) > MAX_RESULT_BYTES:
+            logger.warning(f"Result {result_id[:12]} exceeds {MAX_RESULT_BYTES} bytes even as one row; not stored")
+            return None
+
+        buffered_write(db_path, """
+            INSERT OR IGNORE INTO query_results
+                (id, format, row_count, stored_row_count, column_count, byte_size, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (result_id, RESULT_FORMAT, len(df), stored_rows, len(df.columns), len(payload),
+              sqlite3.Binary(payload)), wait=False)
+
+        if stored_rows == len(df):
+            # Seed the cache so rendering the fresh result needs no round trip
+            _cache_put(db_path, result_id, df)
+        return StoredResult(result_id, len(df), stored_rows, len(df.columns), len(payload))
+    except Exception as e:
+        logger.error(f"Error storing query result: {e}")
+        return None
+
+
+def load_result(db_path: str, result_id: str) -> Optional[pd.DataFrame]:
+    """Load a stored result set as a DataFrame (None if it does not exist)."""
+    key = (os.path.abspath(str(db_path)), result_id)
+    with _frame_cache_lock:
+        df = _frame_cache.get(key)
+        if df is not None:
+            _frame_cache.move_to_end(key)
+    get_metrics_collector().record_cache_access("result_frames", hit=df is not None)
+    if df is not None:
+        return df
+
+    flush_pending_writes(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT format, data FROM query_results WHERE id = ?", (result_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    if row[0] != RESULT_FORMAT:
+        logger.error(f"Unsupported result format {row[0]!r} for result {result_id[:12]}")
+        return None
+
+    df = pd.read_parquet(io.BytesIO(row[1]), engine="pyarrow")
+    _cache_put(db_path, result_id, df)
+    return df
+
+
+def get_result_info(db_path: str, result_id: str) -> Optional[StoredResult]:
+    """Return size metadata of a stored result without decoding it."""
+    flush_pending_writes(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("""
+            SELECT id, row_count, stored_row_count, column_count, byte_size
+            FROM query_results WHERE id = ?
+        """, (result_id,)).fetchone()
+    finally:
+        conn.close()
+    return StoredResult(*row) if row else None
+
+
+def prune_unreferenced_results(db_path: str, result_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Delete stored results no chat session points to any more.
+
+    Args:
+        db_path: Path to the SQLite database
+        result_ids: Only consider these results (e.g. those of just-deleted sessions);
+            None considers all of them
+
+    Results stored within the last PRUNE_GRACE_SECONDS are kept, since the chat
+    session that references a fresh result is written separately from it.
+    """
+    flush_pending_writes(db_path)
+    max_age = f"-{PRUNE_GRACE_SECONDS} seconds"
+    conn = sqlite3.connect(db_path)
+    try:
+        if result_ids is None:
+            cursor = conn.execute("""
+                DELETE FROM query_results
+                WHERE id NOT IN (SELECT result_id FROM chat_sessions WHERE result_id IS NOT NULL)
+                  AND created_at < datetime('now', ?)
+            """, (max_age,))
+        else:
+            cursor = conn.executemany("""
+                DELETE FROM query_results
+                WHERE id = ?
+                  AND NOT EXISTS (SELECT 1 FROM chat_sessions WHERE result_id = query_results.id)
+                  AND created_at < datetime('now', ?)
+            """, [(result_id, max_age) for result_id in set(result_ids)])
+        conn.commit()
+        return max(cursor.rowcount, 0)
+    finally:
+        conn.close()
+
+
+def _cache_put(db_path: str, result_id: str, df: pd.DataFrame):
+    key = (os.path.abspath(str(db_path)), result_id)
+    with _frame_cache_lock:
+        _frame_cache[key] = df
+        _frame_cache.move_to_end(key)
+        while len(_frame_cache) > _CACHE_SIZE:
+            _frame_cache.popitem(last=False)
@@ -44,10 +44,30 @@ def create_tables(db_path: str = "src/database/superstore.db"):
         sql_query TEXT,
         explanation_given BOOLEAN DEFAULT FALSE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        result_id TEXT,
         FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
     )
     ''')
     
+    # Databases created before result_id existed get the column added in place
+    chat_columns = {row[1] for row in cursor.execute("PRAGMA table_info(chat_sessions)")}
+    if 'result_id' not in chat_columns:
+        cursor.execute("ALTER TABLE chat_sessions ADD COLUMN result_id TEXT")
+    
+    # Create query_results table (compressed result sets, keyed by content hash)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS query_results (
+        id TEXT PRIMARY KEY,
+        format TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        stored_row_count INTEGER NOT NULL,
+        column_count INTEGER NOT NULL,
+        byte_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
     # Create explanation_feedback table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS explanation_feedback (
@@ -88,9 +108,31 @@ def create_tables(db_path: str = "src/database/superstore.db"):
     )
     ''')
     
+    # Create CLT-CFT user profile tables, the chat history search index, prediction tracking
+    # LLM call accounting and the SQL candidate log
+    try:
+        from new_data_assistant_project.src.database.profile_store import create_profile_tables
+        from new_data_assistant_project.src.database.chat_search import create_chat_search_index
+        from new_data_assistant_project.src.database.prediction_accuracy import create_prediction_accuracy_tables
+        from new_data_assistant_project.src.database.llm_calls import create_llm_call_tables
+        from new_data_assistant_project.src.database.sql_candidates import create_sql_candidate_tables
+    except ImportError:
+        from src.database.profile_store import create_profile_tables
+        from src.database.chat_search import create_chat_search_index
+        from src.database.prediction_accuracy import create_prediction_accuracy_tables
+        from src.database.llm_calls import create_llm_call_tables
+        from src.database.sql_candidates import create_sql_candidate_tables
+    create_profile_tables(cursor)
+    create_chat_search_index(cursor)
+    create_prediction_accuracy_tables(cursor)
+    create_llm_call_tables(cursor)
+    create_sql_candidate_tables(cursor)
+    
     # Create indexes for better performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id ON chat_sessions(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_created_at ON chat_sessions(created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_id_id ON chat_sessions(user_id, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_sessions_result_id ON chat_sessions(result_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_explanation_feedback_user_id ON explanation_feedback(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_explanation_feedback_session_id ON explanation_feedback(session_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_comprehensive_feedback_user_id ON comprehensive_feedback(user_id)')
@@ -0,0 +1,83 @@
+"""
+Log of SQL candidates from multi-candidate generation.
+
+With ``DATA_ASSISTANT_SQL_CANDIDATES`` > 1 the ReAct agent asks for several SQL
+candidates per question and runs only the one with the cheapest query plan (see
+``src/agents/sql_planner.py``). Every candidate is kept in ``sql_candidates``
+with its plan, estimated cost, validity and whether it was chosen, for offline
+analysis of the generation and the cost model. Rows are written through the
+write-behind buffer and tagged with the request (trace) id, like ``llm_calls``.
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.database.write_behind import buffered_write, flush_pending_writes
+except ImportError:
+    from src.database.write_behind import buffered_write, flush_pending_writes
+
+logger = logging.getLogger(__name__)
+
+_INSERT_CANDIDATE = """
+    INSERT INTO sql_candidates (request_id, user_query, model, candidate_index, sql_query, valid,
+                                chosen, plan_cost, full_scans, query_plan, error, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def create_sql_candidate_tables(cursor: sqlite3.Cursor):
+    """Create the sql_candidates table and its indexes."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sql_candidates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        request_id TEXT,
+        user_query TEXT NOT NULL,
+        model TEXT,
+        candidate_index INTEGER NOT NULL,
+        sql_query TEXT NOT NULL,
+        valid BOOLEAN NOT NULL,
+        chosen BOOLEAN NOT NULL DEFAULT FALSE,
+        plan_cost REAL,
+        full_scans INTEGER,
+        query_plan TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sql_candidates_request_id ON sql_candidates(request_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sql_candidates_created_at ON sql_candidates(created_at)')
+
+
+def record_sql_candidates(db_path: str, user_query: str, model: Optional[str], candidates: List[Any],
+                          chosen_index: Optional[int], request_id: Optional[str] = None):
+    """Queue one sql_candidates row per candidate (never blocks the request)."""
+    created_at = datetime.now().isoformat()
+    try:
+        for candidate in candidates:
+            buffered_write(db_path, _INSERT_CANDIDATE, (
+                request_id, user_query, model, candidate.index, candidate.sql_query, bool(candidate.valid),
+                candidate.index == chosen_index, candidate.cost if candidate.valid else None,
+                candidate.full_scans if candidate.valid else None, candidate.plan, candidate.error, created_at
+            ), wait=False)
+    except Exception as e:
+        logger.error(f"Error recording SQL candidates: {e}")
+
+
+def get_sql_candidates(db_path: str, request_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+    """Most recent candidates first, optionally only those of one request."""
+    flush_pending_writes(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if request_id is not None:
+            rows = conn.execute("SELECT * FROM sql_candidates WHERE request_id = ? ORDER BY candidate_index",
+                                (request_id,)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM sql_candidates ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
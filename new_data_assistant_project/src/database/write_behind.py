@@ -0,0 +1,317 @@
+"""
+Write-behind buffer for the app database.
+
+Inserts on the request path (chat sessions, feedback, prediction logs) are queued
+and committed by a single background writer in periodic transactions instead of
+opening a connection and committing once per row. Every queued statement gets a
+PendingWrite handle, so callers that need the new row id (e.g. feedback forms that
+reference a chat session) can still resolve it. Should the writer die (e.g. the
+database cannot be opened), the writes still queued fail, later ones are written
+synchronously, and callers never wait longer than
+``DATA_ASSISTANT_WRITE_BEHIND_TIMEOUT`` seconds.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Set DATA_ASSISTANT_WRITE_BEHIND=0 to fall back to synchronous writes
+WRITE_BEHIND_ENABLED = os.getenv("DATA_ASSISTANT_WRITE_BEHIND", "1") != "0"
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("DATA_ASSISTANT_WRITE_BEHIND_INTERVAL", "0.5"))
+DEFAULT_MAX_BATCH_SIZE = 200
+# Longest a caller blocks on a buffered write it waits for
+WRITE_TIMEOUT = float(os.getenv("DATA_ASSISTANT_WRITE_BEHIND_TIMEOUT", "30"))
+
+_STOP = object()
+
+
+class PendingWrite:
+    """Handle for a buffered statement that resolves to its row id once committed."""
+
+    def __init__(self, sql: Optional[str], params: Sequence[Any] = ()):
+        self.sql = sql
+        self.params = tuple(params)
+        self._done = threading.Event()
+        self._rowid: Optional[int] = None
+        self._rowcount: Optional[int] = None
+        self._error: Optional[BaseException] = None
+        self._wake_writer: Optional[threading.Event] = None
+
+    def _resolve(self, rowid: Optional[int] = None, error: Optional[BaseException] = None,
+                 rowcount: Optional[int] = None):
+        self._rowid = rowid
+        self._rowcount = rowcount
+        self._error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        """Return True once the statement has been committed (or failed)."""
+        return self._done.is_set()
+
+    def result(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Wait for the commit and return the row id of the inserted row."""
+        if not self._done.is_set() and self._wake_writer is not None:
+            # Someone is blocked on this row now, so don't wait for the next periodic flush
+            self._wake_writer.set()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Buffered write not committed within {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._rowid
+
+    @property
+    def rowcount(self) -> Optional[int]:
+        """Number of rows the statement changed, once it has been committed."""
+        return self._rowcount
+
+
+class WriteBehindBuffer:
+    """Single-writer queue that batches statements into periodic transactions."""
+
+    def __init__(self, db_path: str, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE):
+        self.db_path = str(db_path)
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._urgent = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"write-behind:{os.path.basename(self.db_path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: Sequence[Any] = (), urgent: bool = False) -> PendingWrite:
+        """Queue a statement; pass urgent=True when the caller will block on the row id."""
+        pending = PendingWrite(sql, params)
+        pending._wake_writer = self._urgent
+        with self._lock:
+            if self._closed:
+                # After shutdown we still must not lose data: write through synchronously
+                _execute_now(self.db_path, pending)
+                return pending
+            self._queue.put(pending)
+        if urgent or self._queue.qsize() >= self.max_batch_size:
+            self._urgent.set()
+        return pending
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until everything queued so far has been committed."""
+        barrier = PendingWrite(None)
+        with self._lock:
+            # Checked together with the put, so the barrier cannot land behind the stop marker
+            if self._closed:
+                return
+            self._queue.put(barrier)
+        self._urgent.set()
+        barrier.result(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Drain the queue, commit durably and stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._urgent.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Write-behind writer for {self.db_path} did not stop within {timeout}s")
+
+    def _run(self):
+        conn = None
+        batch: list = []
+        error: Optional[BaseException] = None
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            # Every commit is fsynced, so a finished flush survives a crash
+            conn.execute("PRAGMA synchronous=FULL")
+            while True:
+                first = self._queue.get()
+                batch = [first]
+                if first is not _STOP:
+                    # Give other requests a chance to join this transaction
+                    self._urgent.wait(self.flush_interval)
+                self._urgent.clear()
+                while len(batch) < self.max_batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = any(item is _STOP for item in batch)
+                self._write_batch(conn, [item for item in batch if item is not _STOP])
+                if stop:
+                    # Pick up anything that raced in before the stop marker
+                    remaining = []
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _STOP:
+                            remaining.append(item)
+                    self._write_batch(conn, remaining)
+                    self._checkpoint(conn)
+                    break
+        except Exception as e:
+            error = e
+            logger.error(f"Write-behind writer for {self.db_path} crashed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+            self._abandon(batch, error)
+
+    def _abandon(self, batch: list, error: Optional[BaseException]):
+        """
+        After the writer has stopped: fail whatever it did not write and switch the
+        buffer to synchronous writes, so no caller waits on a dead writer.
+        """
+        with self._lock:
+            self._closed = True
+        leftovers = [item for item in batch if item is not _STOP]
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        error = error or RuntimeError(f"Write-behind writer for {self.db_path} stopped")
+        for pending in leftovers:
+            if not pending.done():
+                # Barriers only wait for the writer, and there is nothing left for it to do
+                pending._resolve(None, error if pending.sql is not None else None)
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list):
+        statements = [item for item in batch if item.sql is not None]
+        barriers = [item for item in batch if item.sql is None]
+        if statements:
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for pending in statements:
+                    # A failing row must not roll back the rows batched with it
+                    conn.execute("SAVEPOINT write_behind_row")
+                    try:
+                        cursor = conn.execute(pending.sql, pending.params)
+                        conn.execute("RELEASE SAVEPOINT write_behind_row")
+                        results.append((pending, cursor.lastrowid, cursor.rowcount, None))
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO SAVEPOINT write_behind_row")
+                        conn.execute("RELEASE SAVEPOINT write_behind_row")
+                        logger.error(f"Buffered write failed: {e}")
+                        results.append((pending, None, None, e))
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                logger.error(f"Write-behind batch of {len(statements)} statements failed: {e}")
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                results = [(pending, None, None, e) for pending in statements]
+            for pending, rowid, rowcount, error in results:
+                pending._resolve(rowid, error, rowcount)
+        for barrier in barriers:
+            barrier._resolve()
+
+    def _checkpoint(self, conn: sqlite3.Connection):
+        """Move WAL content into the main database file before the process exits."""
+        try:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if str(journal_mode).lower() == "wal":
+                conn.execute("PRAGMA wal_checkpoint(FULL)")
+        except sqlite3.Error as e:
+            logger.warning(f"WAL checkpoint on shutdown failed: {e}")
+
+
+def _execute_now(db_path: str, pending: PendingWrite):
+    """Synchronous write used when write-behind is disabled or already shut down."""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.execute(pending.sql, pending.params)
+        conn.commit()
+        pending._resolve(cursor.lastrowid, rowcount=cursor.rowcount)
+    except sqlite3.Error as e:
+        if conn is not None:
+            conn.rollback()
+        pending._resolve(None, e)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+_buffers: Dict[str, WriteBehindBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def _buffer_key(db_path) -> str:
+    return os.path.abspath(str(db_path))
+
+
+def get_write_buffer(db_path) -> WriteBehindBuffer:
+    """Return the process-wide write buffer for a database file."""
+    key = _buffer_key(db_path)
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is None:
+            buffer = WriteBehindBuffer(key)
+            _buffers[key] = buffer
+        return buffer
+
+
+def buffered_write(db_path, sql: str, params: Sequence[Any] = (), wait: bool = True) -> PendingWrite:
+    """
+    Queue an INSERT/UPDATE for the given database.
+
+    Args:
+        db_path: Path to the SQLite database
+        sql: Statement to execute
+        params: Statement parameters
+        wait: If True, block until the row is committed (needed when the caller uses the row id)
+
+    Returns:
+        PendingWrite handle; ``result()`` returns the row id
+    """
+    if not WRITE_BEHIND_ENABLED:
+        pending = PendingWrite(sql, params)
+        _execute_now(str(db_path), pending)
+        if wait:
+            pending.result(WRITE_TIMEOUT)
+        return pending
+
+    pending = get_write_buffer(db_path).submit(sql, params, urgent=wait)
+    if wait:
+        pending.result(WRITE_TIMEOUT)
+    return pending
+
+
+def flush_pending_writes(db_path=None, timeout: Optional[float] = 30.0):
+    """Commit everything buffered for one database (or all of them) before reading."""
+    with _buffers_lock:
+        if db_path is None:
+            buffers = list(_buffers.values())
+        else:
+            buffer = _buffers.get(_buffer_key(db_path))
+            buffers = [buffer] if buffer else []
+    for buffer in buffers:
+        buffer.flush(timeout)
+
+
+def shutdown_write_buffers():
+    """Flush and close all buffers; registered with atexit."""
+    with _buffers_lock:
+        buffers = list(_buffers.values())
+        _buffers.clear()
+    for buffer in buffers:
+        buffer.close()
+
+
+atexit.register(shutdown_write_buffers)
@@ -12,30 +12,48 @@ def robust_import_modules():
     # Strategy 1: Try absolute imports (local development)
     try:
         from new_data_assistant_project.src.database.models import ChatSession, ExplanationFeedback, User
+        from new_data_assistant_project.src.database.result_store import store_result, load_result
+        from new_data_assistant_project.src.database.llm_calls import link_llm_calls_to_session
         from new_data_assistant_project.src.agents.clt_cft_agent import CLTCFTAgent
+        from new_data_assistant_project.src.agents.lazy_explanation import ExplanationHandle
         from new_data_assistant_project.src.utils.path_utils import get_absolute_path
+        from new_data_assistant_project.src.utils.tracing import start_span
+        from new_data_assistant_project.src.utils.deadline import request_deadline
         print("✅ Chat Manager: Absolute imports successful")
-        return ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path
+        return (ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path, store_result, load_result,
+                start_span, link_llm_calls_to_session, ExplanationHandle, request_deadline)
     except ImportError as e:
         print(f"❌ Absolute imports failed: {e}")
     
     # Strategy 2: Try direct imports (Docker/production - new structure)
     try:
         from src.database.models import ChatSession, ExplanationFeedback, User
+        from src.database.result_store import store_result, load_result
+        from src.database.llm_calls import link_llm_calls_to_session
         from src.agents.clt_cft_agent import CLTCFTAgent
+        from src.agents.lazy_explanation import ExplanationHandle
         from src.utils.path_utils import get_absolute_path
+        from src.utils.tracing import start_span
+        from src.utils.deadline import request_deadline
         print("✅ Chat Manager: Direct imports successful")
-        return ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path
+        return (ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path, store_result, load_result,
+                start_span, link_llm_calls_to_session, ExplanationHandle, request_deadline)
     except ImportError as e:
         print(f"❌ Direct imports failed: {e}")
     
     # Strategy 3: Try relative imports (fallback)
     try:
         from ..database.models import ChatSession, ExplanationFeedback, User
+        from ..database.result_store import store_result, load_result
+        from ..database.llm_calls import link_llm_calls_to_session
         from ..agents.clt_cft_agent import CLTCFTAgent
+        from ..agents.lazy_explanation import ExplanationHandle
         from .path_utils import get_absolute_path
+        from .tracing import start_span
+        from .deadline import request_deadline
         print("✅ Chat Manager: Relative imports successful")
-        return ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path
+        return (ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path, store_result, load_result,
+                start_span, link_llm_calls_to_session, ExplanationHandle, request_deadline)
     except ImportError as e:
         print(f"❌ Relative imports failed: {e}")
     
@@ -47,17 +65,25 @@ def robust_import_modules():
             sys.path.insert(0, str(project_root))
         
         from new_data_assistant_project.src.database.models import ChatSession, ExplanationFeedback, User
+        from new_data_assistant_project.src.database.result_store import store_result, load_result
+        from new_data_assistant_project.src.database.llm_calls import link_llm_calls_to_session
         from new_data_assistant_project.src.agents.clt_cft_agent import CLTCFTAgent
+        from new_data_assistant_project.src.agents.lazy_explanation import ExplanationHandle
         from new_data_assistant_project.src.utils.path_utils import get_absolute_path
+        from new_data_assistant_project.src.utils.tracing import start_span
+        from new_data_assistant_project.src.utils.deadline import request_deadline
         print("✅ Chat Manager: Manual path imports successful")
-        return ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path
+        return (ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path, store_result, load_result,
+                start_span, link_llm_calls_to_session, ExplanationHandle, request_deadline)
     except ImportError as e:
         print(f"❌ Manual path imports failed: {e}")
         st.error(f"❌ Could not import required modules: {e}")
         st.stop()
 
 # Import modules
-ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path = robust_import_modules()
+(ChatSession, ExplanationFeedback, User, CLTCFTAgent, get_absolute_path,
+ store_result, load_result, start_span, link_llm_calls_to_session,
+ ExplanationHandle, request_deadline) = robust_import_modules()
 
 logger = logging.getLogger(__name__)
 
@@ -91,7 +117,12 @@ class ChatManager:
     def _clear_user_chat_history(self, user_id: int):
         """Clear chat history for specific user."""
         chat_key = self._get_user_chat_key(user_id)
+        for chat in st.session_state.get(chat_key, []):
+            # Nobody will open the explanations still being generated
+            if chat.get('explanation_handle') is not None:
+                chat['explanation_handle'].cancel()
         st.session_state[chat_key] = []
+        st.session_state.pop(self._get_history_cursor_key(user_id), None)
         # Also clear the database chat history for this user
         try:
             from new_data_assistant_project.src.database.models import ChatSession
@@ -159,8 +190,27 @@ class ChatManager:
                 education_level=user.education_level or "Bachelor"
             )
     
+    def _get_history_cursor_key(self, user_id: int) -> str:
+        """Session state key holding the keyset cursor (oldest loaded id) for a user."""
+        return f'{self._get_user_chat_key(user_id)}_cursor'
+    
+    def _headers_to_history(self, headers) -> list:
+        """Convert chat session headers to history entries with unloaded responses."""
+        return [
+            {
+                'session_id': header.id,
+                'user_message': header.user_message,
+                'system_response': None,  # Loaded on demand
+                'response_length': header.response_length,
+                'result_id': header.result_id,
+                'explanation_given': header.explanation_given,
+                'timestamp': header.created_at
+            }
+            for header in reversed(headers)  # Oldest first
+        ]
+    
     def load_user_chat_history(self, user_id: int, limit: int = 20):
-        """Load recent chat history for user from database."""
+        """Load the most recent page of chat history headers for user from database."""
         try:
             # Check if we're switching users - if so, clear session state
             if st.session_state.current_user_id != user_id:
@@ -175,38 +225,120 @@ class ChatManager:
             if existing_history:
                 return  # Already loaded
             
-            # Load from database
-            sessions = ChatSession.get_user_sessions(self.db_path, user_id, limit)
-            
-            chat_history = []
-            for session in sessions:
-                chat_history.append({
-                    'session_id': session.id,
-                    'user_message': session.user_message,
-                    'system_response': session.system_response,
-                    'explanation_given': session.explanation_given,
-                    'timestamp': session.created_at
-                })
+            # Load headers only; response bodies are fetched when a message is shown
+            headers = ChatSession.get_user_session_headers(self.db_path, user_id, limit=limit)
             
-            # Reverse to show oldest first and store in user-specific session state
-            self._set_user_chat_history(user_id, list(reversed(chat_history)))
+            self._set_user_chat_history(user_id, self._headers_to_history(headers))
+            st.session_state[self._get_history_cursor_key(user_id)] = {
+                'before_id': headers[-1].id if headers else None,
+                'has_more': len(headers) == limit
+            }
             
         except Exception as e:
             logger.error(f"Error loading chat history for user {user_id}: {e}")
             self._set_user_chat_history(user_id, [])
     
+    def load_older_chat_history(self, user_id: int, limit: int = 20):
+        """Prepend the next older page of chat history headers."""
+        cursor = st.session_state.get(self._get_history_cursor_key(user_id))
+        if not cursor or not cursor['has_more']:
+            return
+        
+        try:
+            headers = ChatSession.get_user_session_headers(
+                self.db_path, user_id, before_id=cursor['before_id'], limit=limit
+            )
+            history = self._headers_to_history(headers) + self._get_user_chat_history(user_id)
+            self._set_user_chat_history(user_id, history)
+            st.session_state[self._get_history_cursor_key(user_id)] = {
+                'before_id': headers[-1].id if headers else cursor['before_id'],
+                'has_more': len(headers) == limit
+            }
+        except Exception as e:
+            logger.error(f"Error loading older chat history for user {user_id}: {e}")
+    
+    def _get_chat_response(self, chat: Dict[str, Any]) -> str:
+        """Return the response body of a history entry, loading it from the database once."""
+        if chat.get('system_response') is None:
+            try:
+                chat['system_response'] = ChatSession.get_response(self.db_path, chat['session_id']) or ""
+            except Exception as e:
+                logger.error(f"Error loading response for session {chat.get('session_id')}: {e}")
+                return "❌ Could not load this response."
+        return chat['system_response']
+    
+    @staticmethod
+    def _format_explanation(explanation_text: str) -> str:
+        """Explanation section as appended to a response."""
+        return f"---\n\n**💡 Explanation:**\n\n{explanation_text}"
+    
+    def _render_chat_response(self, chat: Dict[str, Any]):
+        """Render a response body followed by its stored result table and pending explanation, if any."""
+        st.markdown(self._get_chat_response(chat))
+        self._render_result_table(chat)
+        if chat.get('explanation_handle') is not None:
+            self._render_lazy_explanation(chat)
+    
+    def _render_lazy_explanation(self, chat: Dict[str, Any]):
+        """Show a background explanation, waiting for it only once the user opens it."""
+        handle = chat['explanation_handle']
+        label = "💡 Show explanation" if handle.status == "ready" else "💡 Show explanation (loading…)"
+        if not st.toggle(label, key=f"show_explanation_{chat['session_uuid']}"):
+            return
+        
+        handle.mark_viewed()
+        with st.spinner("Explanation loading…"):
+            explanation = handle.result()
+        if explanation is None or not explanation.explanation_text:
+            st.caption("Sorry, I couldn't generate an explanation at this time.")
+            return
+        
+        # Store it with the response so the history shows it like an eagerly generated one
+        section = "\n\n" + self._format_explanation(explanation.explanation_text)
+        ChatSession.append_response(self.db_path, chat['session_uuid'], section)
+        link_llm_calls_to_session(self.db_path, handle.request_id, chat['session_uuid'])
+        chat['system_response'] = (chat.get('system_response') or "") + section
+        chat['explanation_handle'] = None
+        st.markdown(section)
+    
+    def _render_result_table(self, chat: Dict[str, Any]):
+        result_id = chat.get('result_id')
+        if not result_id:
+            return
+        try:
+            df = load_result(self.db_path, result_id)
+        except Exception as e:
+            logger.error(f"Error loading stored result {result_id[:12]}: {e}")
+            df = None
+        if df is None:
+            st.caption("Result data is no longer available.")
+            return
+        st.dataframe(df, hide_index=True, use_container_width=True)
+    
     def process_user_message(self, user: User, user_message: str) -> Tuple[str, bool, Optional[int]]:
         """
         Process user message and return response.
         Returns: (response_text, explanation_given, session_id)
+        
+        The chat session is written through the write-behind buffer, so session_id is
+        None while the insert is still queued; the history entry resolves it on render.
+        Each call is traced as one "request" span with the pipeline stages below it, and
+        bounded by the request deadline (DATA_ASSISTANT_REQUEST_BUDGET): stages that would
+        overrun it degrade, and an explanation may arrive later as a lazy one.
         """
+        with start_span("request", user_id=user.id, message_length=len(user_message)) as span, \
+                request_deadline():
+            return self._process_user_message(user, user_message, span)
+    
+    def _process_user_message(self, user: User, user_message: str, span) -> Tuple[str, bool, Optional[int]]:
         try:
             # SQL validation removed - all queries are now allowed
             # The agent only receives instructions and does not share user information
             
             # First, assess task complexity using CLT-CFT framework
             user_profile = self._get_or_create_user_profile(user)
-            task_assessment = self.agent._assess_task_complexity(user_message, user_profile)
+            with start_span("clt.task_assessment"):
+                task_assessment = self.agent._assess_task_complexity(user_message, user_profile)
             
             # Execute query using CLT-CFT agent with complexity assessment
             result = self.agent.execute_query(user.username, user_message, include_debug_info=False)
@@ -215,28 +347,35 @@ class ChatManager:
             # Build response
             response_parts = []
             explanation_given = False
+            stored_result = None
             
             if modified_result.success and modified_result.data is not None:
                 response_parts.append(f"**SQL Query:**")
                 response_parts.append(f"```sql\n{modified_result.sql_query}\n```")
                 response_parts.append(f"**Results:** {len(modified_result.data)} rows retrieved")
                 
-                # Display data in a nice format
+                # The data itself goes to the results store and is rendered as a table
                 if len(modified_result.data) > 0:
                     import pandas as pd
-                    df = pd.DataFrame(modified_result.data)
-                    response_parts.append("**Data:**")
-                    response_parts.append(df.to_markdown(index=False))
+                    with start_span("chat.store_result", rows=len(modified_result.data)) as store_span:
+                        stored_result = store_result(self.db_path, pd.DataFrame(modified_result.data))
+                        if stored_result:
+                            store_span.set_attributes(bytes=stored_result.byte_size,
+                                                      truncated=stored_result.truncated)
+                    if stored_result and stored_result.truncated:
+                        response_parts.append(f"_Showing the first {stored_result.stored_row_count:,} rows._")
             else:
                 response_parts.append("❌ **Error:** Unable to process your query.")
                 if modified_result.error_message:
                     response_parts.append(f"Details: {modified_result.error_message}")
             
-            # Add explanation if provided
-            if explanation_content and explanation_content.explanation_text:
-                response_parts.append("---")
-                response_parts.append("**💡 Explanation:**")
-                response_parts.append(explanation_content.explanation_text)
+            # Add explanation if provided; a lazy one is rendered once the user opens it
+            explanation_handle = None
+            if isinstance(explanation_content, ExplanationHandle):
+                explanation_handle = explanation_content
+                explanation_given = True
+            elif explanation_content and explanation_content.explanation_text:
+                response_parts.append(self._format_explanation(explanation_content.explanation_text))
                 explanation_given = True
             
             response_text = '\n\n'.join(response_parts)
@@ -247,25 +386,37 @@ class ChatManager:
                 user_message=user_message,
                 system_response=response_text,
                 sql_query=modified_result.sql_query if modified_result.success else None,
-                explanation_given=explanation_given
+                explanation_given=explanation_given,
+                result_id=stored_result.id if stored_result else None
             )
-            chat_session.save(self.db_path)
+            with start_span("chat.save_session"):
+                chat_session.save(self.db_path, wait=False)
+            link_llm_calls_to_session(self.db_path, span.trace_id, chat_session.session_uuid)
             
             # Add to user-specific session state
             current_history = self._get_user_chat_history(user.id)
             current_history.append({
                 'session_id': chat_session.id,
+                'pending_session': chat_session,
+                'session_uuid': chat_session.session_uuid,
+                'explanation_handle': explanation_handle,
                 'user_message': user_message,
                 'system_response': response_text,
+                'result_id': chat_session.result_id,
                 'explanation_given': explanation_given,
                 'timestamp': datetime.now()
             })
             self._set_user_chat_history(user.id, current_history)
             
+            span.set_attributes(explanation_given=explanation_given,
+                                rows=len(modified_result.data) if modified_result.data is not None else 0)
+            if not modified_result.success:
+                span.set_error(modified_result.error_message or "Query failed")
             return response_text, explanation_given, chat_session.id
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
+            span.set_error(f"{type(e).__name__}: {e}")
             error_response = "❌ **System Error:** I'm experiencing technical difficulties. Please try again in a moment."
             
             # Still save error session
@@ -276,11 +427,22 @@ class ChatManager:
                     system_response=error_response,
                     explanation_given=False
                 )
-                chat_session.save(self.db_path)
+                chat_session.save(self.db_path, wait=False)
+                link_llm_calls_to_session(self.db_path, span.trace_id, chat_session.session_uuid)
                 return error_response, False, chat_session.id
             except:
                 return error_response, False, None
     
+    def _resolve_session_id(self, chat: Dict[str, Any]) -> Optional[int]:
+        """Resolve the database id of a history entry whose insert may still be buffered."""
+        if chat.get('session_id') is None and chat.get('pending_session') is not None:
+            try:
+                chat['session_id'] = chat['pending_session'].resolve_id()
+                chat.pop('pending_session', None)
+            except Exception as e:
+                logger.error(f"Could not resolve chat session id: {e}")
+        return chat.get('session_id')
+    
     def render_feedback_form(self, session_id: int, explanation_given: bool, user_id: int):
         """Render feedback form for a specific session."""
         feedback_key = f"feedback_{session_id}"
@@ -324,7 +486,7 @@ class ChatManager:
                             was_needed=was_needed == "Yes",
                             was_helpful=was_helpful == "Yes" if was_helpful else None
                         )
-                        feedback.save(self.db_path)
+                        feedback.save(self.db_path, wait=False)
                         
                         feedback_state['submitted'] = True
                         st.success("Thank you for your feedback!")
@@ -347,7 +509,7 @@ class ChatManager:
                             explanation_given=False,
                             would_have_been_needed=would_have_been_needed == "Yes"
                         )
-                        feedback.save(self.db_path)
+                        feedback.save(self.db_path, wait=False)
                         
                         feedback_state['submitted'] = True
                         st.success("Thank you for your feedback!")
@@ -372,7 +534,15 @@ class ChatManager:
         if user_chat_history:
             st.markdown("### 📜 Chat History")
             
+            history_cursor = st.session_state.get(self._get_history_cursor_key(user.id))
+            if history_cursor and history_cursor['has_more']:
+                if st.button("⬆️ Load older messages", key=f"load_older_{user.id}"):
+                    self.load_older_chat_history(user.id)
+                    st.rerun()
+            
             for i, chat in enumerate(user_chat_history):
+                is_recent = i >= len(user_chat_history) - 3
+
                 # User message
                 with st.container():
                     col1, col2 = st.columns([1, 10])
@@ -387,10 +557,18 @@ class ChatManager:
                     with col1:
                         st.markdown("**🤖**")
                     with col2:
-                        st.markdown(chat['system_response'])
+                        # Recent responses are in view and shown directly; older ones
+                        # are only loaded from the database when the user opens them
+                        if is_recent or chat.get('system_response') is not None:
+                            self._render_chat_response(chat)
+                        elif st.toggle(
+                            f"Show response ({chat.get('response_length', 0):,} characters)",
+                            key=f"show_response_{chat['session_id']}"
+                        ):
+                            self._render_chat_response(chat)
                 
                 # Feedback form for recent messages (last 3)
-                if i >= len(user_chat_history) - 3 and chat.get('session_id'):
+                if is_recent and self._resolve_session_id(chat):
                     self.render_feedback_form(
                         chat['session_id'], 
                         chat['explanation_given'], 
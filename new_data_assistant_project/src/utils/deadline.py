@@ -0,0 +1,145 @@
+"""
+Request deadlines.
+
+A chat request gets an overall time budget (``DATA_ASSISTANT_REQUEST_BUDGET``
+seconds, default 30; 0 disables it). The deadline is held in a
+``contextvars.ContextVar`` like the current tracing span, so every stage below
+``request_deadline`` sees it without passing it around, and hedged calls that
+copy the context inherit it. Background work that outlives the request (lazy
+explanations) runs under ``no_deadline``.
+
+Stages ask ``has_time_for(stage)`` before optional work and degrade instead of
+overrunning the budget, least important work first:
+
+- explanation generation: serve a cached explanation, or defer it to the
+  background (``ExplanationHandle``)
+- explanation decision: use the heuristic ``_fallback_decision``
+- complexity tie-breaker: keep the local score
+
+A stage's expected duration is the p90 of its ``llm.<stage>`` span over the
+last 15 minutes, or a default until enough samples exist. LLM calls are also
+bounded: ``LLMClient`` does not start or retry a call past the deadline and
+passes the remaining time as the request timeout. Degradations are traced as
+``deadline.action`` on the stage span and counted in the metrics collector
+(``degradation_stats``).
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import numpy as np
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+    from new_data_assistant_project.src.utils.tracing import set_span_attributes
+except ImportError:
+    from src.utils.metrics_collector import get_metrics_collector
+    from src.utils.tracing import set_span_attributes
+
+logger = logging.getLogger(__name__)
+
+REQUEST_BUDGET = float(os.getenv("DATA_ASSISTANT_REQUEST_BUDGET", "30"))
+
+# Expected seconds per stage until its latency history has enough samples
+DEFAULT_STAGE_SECONDS = {
+    "explanation_decision": 3.0,
+    "task_assessment": 3.0,
+    "explanation_generation": 12.0,
+}
+STAGE_PERCENTILE = 90
+STAGE_MIN_SAMPLES = 5
+STAGE_WINDOW_SECONDS = 15 * 60
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started after the request deadline has passed."""
+
+
+class Deadline:
+    """A point in time (monotonic clock) by which the request should be answered."""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (0 once expired)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current deadline, or None without one."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float] = REQUEST_BUDGET) -> Iterator[Optional[Deadline]]:
+    """
+    Bound the work inside the block to seconds from now.
+
+    Nested deadlines never extend an outer one; seconds of None or 0 keep the
+    outer deadline (if any) unchanged.
+    """
+    outer = _current_deadline.get()
+    if not seconds or seconds <= 0:
+        yield outer
+        return
+    deadline = Deadline(seconds)
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """Run the block without the request's deadline (for work that outlives the request)."""
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def expected_seconds(stage: str) -> float:
+    """Recent p90 duration of an LLM stage, or its default without enough history."""
+    samples = get_metrics_collector().latency_samples(f"llm.{stage}", STAGE_WINDOW_SECONDS)
+    latencies = [sample.seconds for sample in samples if sample.success]
+    if len(latencies) < STAGE_MIN_SAMPLES:
+        return DEFAULT_STAGE_SECONDS.get(stage, 0.0)
+    return float(np.percentile(latencies, STAGE_PERCENTILE))
+
+
+def has_time_for(stage: str) -> bool:
+    """True without a deadline, or if the stage is expected to finish before it."""
+    remaining = remaining_time()
+    return remaining is None or remaining >= expected_seconds(stage)
+
+
+def record_degradation(stage: str, action: str):
+    """Note on the current span and in the metrics that a stage was cut short."""
+    remaining = remaining_time()
+    set_span_attributes(**{"deadline.action": action,
+                           "deadline.remaining_ms": round((remaining or 0.0) * 1000, 2)})
+    get_metrics_collector().record_degradation(stage, action)
+    logger.info(f"Request deadline: {stage} -> {action} ({remaining or 0.0:.1f}s left)")
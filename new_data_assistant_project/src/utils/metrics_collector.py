@@ -0,0 +1,286 @@
+"""
+In-process metrics for the System Metrics dashboard tab.
+
+Streamlit serves every session from one process, so a module-level collector sees
+all requests. The following series are kept, all in fixed-size ring buffers or
+counters so memory stays bounded no matter how long the app runs:
+
+- Stage latencies. Every finished tracing span is recorded under its name (see
+  ``src/utils/tracing.py``); ``timed``/``record_latency`` can be used directly.
+- Process and host resource samples (CPU, memory, threads) taken by a daemon
+  thread with psutil every few seconds.
+- Hit/miss counters of the in-memory caches (``record_cache_access``).
+- Outcomes of speculative explanation generation with the time saved or wasted
+  (``record_speculation``).
+- Outcomes of hedged LLM requests per stage (``record_hedge``).
+- Stages cut short by the request deadline, per action (``record_degradation``).
+
+Nothing is persisted; the series start empty when the process restarts.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; latency metrics work without it
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per stage
+LATENCY_BUFFER_SIZE = int(os.getenv("DATA_ASSISTANT_METRICS_LATENCY_SAMPLES", "2048"))
+# Seconds between resource samples, and how many samples are kept (1 hour at 5s)
+RESOURCE_SAMPLE_INTERVAL = float(os.getenv("DATA_ASSISTANT_METRICS_SAMPLE_INTERVAL", "5"))
+RESOURCE_BUFFER_SIZE = int(os.getenv("DATA_ASSISTANT_METRICS_RESOURCE_SAMPLES", "720"))
+
+# Stage names used by the pipeline, in execution order
+REQUEST_STAGE = "request"
+PIPELINE_STAGES = (
+    "clt.task_assessment",
+    "react.execute_query",
+    "react.sql_generation",
+    "react.sql_execution",
+    "clt.explanation_decision",
+    "clt.explanation_generation",
+    "chat.store_result",
+    "chat.save_session",
+)
+
+
+@dataclass
+class LatencySample:
+    timestamp: float
+    seconds: float
+    success: bool
+
+
+class MetricsCollector:
+    """Ring-buffered latency and resource time series for one process."""
+
+    def __init__(self, latency_buffer_size: int = LATENCY_BUFFER_SIZE,
+                 resource_buffer_size: int = RESOURCE_BUFFER_SIZE,
+                 sample_interval: float = RESOURCE_SAMPLE_INTERVAL):
+        self.latency_buffer_size = latency_buffer_size
+        self.sample_interval = sample_interval
+        self.started_at = time.time()
+        self._latencies: Dict[str, Deque[LatencySample]] = {}
+        self._resources: Deque[Dict[str, float]] = deque(maxlen=resource_buffer_size)
+        self._cache_counts: Dict[str, List[int]] = {}
+        self._speculation: Dict[str, List[float]] = {}
+        self._hedges: Dict[str, Dict[str, int]] = {}
+        self._degradations: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # cpu_percent() is measured between calls on the same Process object
+        self._process = psutil.Process() if psutil is not None else None
+
+    # Latencies
+
+    def record_latency(self, stage: str, seconds: float, success: bool = True):
+        """Append one latency observation for a stage."""
+        sample = LatencySample(time.time(), float(seconds), bool(success))
+        with self._lock:
+            buffer = self._latencies.get(stage)
+            if buffer is None:
+                buffer = deque(maxlen=self.latency_buffer_size)
+                self._latencies[stage] = buffer
+            buffer.append(sample)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Record the wall time of the block; exceptions count as failures and propagate."""
+        started = time.perf_counter()
+        success = True
+        try:
+            yield
+        except BaseException:
+            success = False
+            raise
+        finally:
+            self.record_latency(stage, time.perf_counter() - started, success)
+
+    def stages(self) -> List[str]:
+        with self._lock:
+            return list(self._latencies)
+
+    def latency_samples(self, stage: str, window_seconds: Optional[float] = None) -> List[LatencySample]:
+        """Samples of a stage, optionally only those from the last window_seconds."""
+        with self._lock:
+            samples = list(self._latencies.get(stage, ()))
+        if window_seconds is not None:
+            cutoff = time.time() - window_seconds
+            samples = [sample for sample in samples if sample.timestamp >= cutoff]
+        return samples
+
+    def latency_summary(self, stage: str, window_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Count, mean, p50/p95/p99 (seconds) and error rate of a stage."""
+        samples = self.latency_samples(stage, window_seconds)
+        if not samples:
+            return {'stage': stage, 'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None,
+                    'max': None, 'error_rate': 0.0}
+        values = np.fromiter((sample.seconds for sample in samples), dtype=float, count=len(samples))
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        errors = sum(1 for sample in samples if not sample.success)
+        return {
+            'stage': stage,
+            'count': len(samples),
+            'mean': float(values.mean()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(values.max()),
+            'error_rate': errors / len(samples),
+        }
+
+    # Caches
+
+    def record_cache_access(self, cache: str, hit: bool):
+        """Count one lookup of a named cache."""
+        with self._lock:
+            counts = self._cache_counts.setdefault(cache, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hits, misses and hit rate per cache since the process started."""
+        with self._lock:
+            counts = {cache: tuple(value) for cache, value in self._cache_counts.items()}
+        return {
+            cache: {'hits': hits, 'misses': misses,
+                    'hit_rate': hits / (hits + misses) if hits + misses else None}
+            for cache, (hits, misses) in counts.items()
+        }
+
+    # Speculative explanations
+
+    def record_speculation(self, outcome: str, seconds: float):
+        """
+        Count one speculative explanation.
+
+        Args:
+            outcome: "used" (the decision wanted it) or "discarded"
+            seconds: Time saved for a used one, generation time wasted for a discarded one
+        """
+        with self._lock:
+            totals = self._speculation.setdefault(outcome, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def speculation_stats(self) -> Dict[str, Any]:
+        """Used/discarded counts with the total seconds saved and wasted since the process started."""
+        with self._lock:
+            used, saved = self._speculation.get("used", (0, 0.0))
+            discarded, wasted = self._speculation.get("discarded", (0, 0.0))
+        return {'used': used, 'discarded': discarded,
+                'hit_rate': used / (used + discarded) if used + discarded else None,
+                'saved_seconds': saved, 'wasted_seconds': wasted}
+
+    # Hedged requests
+
+    def record_hedge(self, stage: str, outcome: str):
+        """Count one hedgeable LLM call (not_needed, over_budget, won, lost or failed)."""
+        with self._lock:
+            outcomes = self._hedges.setdefault(stage, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def hedge_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Outcome counts per stage with the share of fired hedges that won."""
+        with self._lock:
+            hedges = {stage: dict(outcomes) for stage, outcomes in self._hedges.items()}
+        stats = {}
+        for stage, outcomes in hedges.items():
+            fired = outcomes.get('won', 0) + outcomes.get('lost', 0)
+            stats[stage] = dict(outcomes, fired=fired,
+                                win_rate=outcomes.get('won', 0) / fired if fired else None)
+        return stats
+
+    # Deadline degradations
+
+    def record_degradation(self, stage: str, action: str):
+        """Count one stage that degraded to meet the request deadline."""
+        with self._lock:
+            actions = self._degradations.setdefault(stage, {})
+            actions[action] = actions.get(action, 0) + 1
+
+    def degradation_stats(self) -> Dict[str, Dict[str, int]]:
+        """Degradation counts per stage and action."""
+        with self._lock:
+            return {stage: dict(actions) for stage, actions in self._degradations.items()}
+
+    # Resources
+
+    def start_sampling(self):
+        """Start the background resource sampler (no-op without psutil or if running)."""
+        if self._process is None:
+            return
+        with self._lock:
+            if self._sampler is not None and self._sampler.is_alive():
+                return
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="metrics-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop_sampling(self):
+        self._stop.set()
+
+    def sample_resources(self) -> Optional[Dict[str, float]]:
+        """Take one resource sample now and append it to the buffer."""
+        if self._process is None:
+            return None
+        try:
+            process = self._process
+            with process.oneshot():
+                memory = process.memory_info()
+                sample = {
+                    'timestamp': time.time(),
+                    'process_cpu_percent': process.cpu_percent(None),
+                    'process_rss_mb': memory.rss / (1024 * 1024),
+                    'process_threads': process.num_threads(),
+                    'system_cpu_percent': psutil.cpu_percent(None),
+                    'system_memory_percent': psutil.virtual_memory().percent,
+                }
+        except Exception as e:
+            logger.warning(f"Resource sampling failed: {e}")
+            return None
+        with self._lock:
+            self._resources.append(sample)
+        return sample
+
+    def resource_samples(self, window_seconds: Optional[float] = None) -> List[Dict[str, float]]:
+        with self._lock:
+            samples = list(self._resources)
+        if window_seconds is not None:
+            cutoff = time.time() - window_seconds
+            samples = [sample for sample in samples if sample['timestamp'] >= cutoff]
+        return samples
+
+    def _sample_loop(self):
+        # cpu_percent(None) measures since the previous call, so the first reading is discarded
+        if self._process is not None:
+            self._process.cpu_percent(None)
+            psutil.cpu_percent(None)
+        while not self._stop.wait(self.sample_interval):
+            self.sample_resources()
+
+
+_collector: Optional[MetricsCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_metrics_collector() -> MetricsCollector:
+    """Return the process-wide collector, starting its resource sampler on first use."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = MetricsCollector()
+            _collector.start_sampling()
+        return _collector
@@ -0,0 +1,330 @@
+"""
+Lightweight request tracing.
+
+A trace is a tree of spans for one chat request: the root span is opened by the
+chat manager, and every stage below it (task assessment, SQL generation, query
+execution, the explanation decision, explanation generation, result storage,
+session save) opens a child span with ``start_span``. The current span is held
+in a ``contextvars.ContextVar``, so nesting follows the call stack without
+passing span objects around. Spans carry attributes such as token counts, row
+counts and cache hits.
+
+Finished spans are queued and appended by a background thread to a JSONL file.
+Each line has the OTLP/JSON ``resourceSpans`` shape, so the file can be fed to
+an OpenTelemetry collector (otlpjsonfile receiver) or read back by
+``load_recent_traces`` for the trace viewer in the admin dashboard. Every
+finished span is also recorded as a stage latency in the metrics collector.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.utils.metrics_collector import get_metrics_collector
+except ImportError:
+    from src.utils.metrics_collector import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+# Set DATA_ASSISTANT_TRACING=0 to disable span export (spans still feed the metrics)
+TRACING_ENABLED = os.getenv("DATA_ASSISTANT_TRACING", "1") != "0"
+DEFAULT_TRACE_FILE = Path(__file__).resolve().parents[2] / "logs" / "traces.jsonl"
+TRACE_FILE = Path(os.getenv("DATA_ASSISTANT_TRACE_FILE", str(DEFAULT_TRACE_FILE)))
+# The trace file is rotated to <name>.1 once it exceeds this size
+MAX_TRACE_FILE_BYTES = int(os.getenv("DATA_ASSISTANT_TRACE_FILE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+SERVICE_NAME = "data-assistant"
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_ns: int = 0
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status_code: int = STATUS_UNSET
+    status_message: str = ""
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self.end_time_ns if self.end_time_ns is not None else time.time_ns()
+        return (end - self.start_time_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(message)[:500]
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON representation of the span."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _from_otlp_value(value: Dict[str, Any]) -> Any:
+    if "boolValue" in value:
+        return value["boolValue"]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "doubleValue" in value:
+        return value["doubleValue"]
+    return value.get("stringValue")
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSONL file from a background thread."""
+
+    def __init__(self, path: Path = TRACE_FILE, max_bytes: int = MAX_TRACE_FILE_BYTES,
+                 flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def flush(self):
+        """Write everything queued so far (used before reading the file back)."""
+        self._write(self._drain())
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._write(self._drain())
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                return spans
+
+    def _write(self, spans: List[Span]):
+        if not spans:
+            return
+        lines = []
+        for span in spans:
+            lines.append(json.dumps({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp()]}],
+            }]}))
+        try:
+            with self._write_lock:
+                self._append(lines)
+        except OSError as e:
+            logger.warning(f"Could not write {len(spans)} spans to {self.path}: {e}")
+
+    def _append(self, lines: List[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+_exporter: Optional[JsonlSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Optional[JsonlSpanExporter]:
+    """Return the process-wide exporter (None when tracing export is disabled)."""
+    global _exporter
+    if not TRACING_ENABLED:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = JsonlSpanExporter()
+            atexit.register(_exporter.flush)
+        return _exporter
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the active request (also used as its request id)."""
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def set_span_attributes(**attributes):
+    """Add attributes to the active span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attributes(**attributes)
+
+
+def record_llm_usage(response: Any, model: Optional[str] = None):
+    """Copy model and token usage of an Anthropic response onto the active span."""
+    usage = getattr(response, "usage", None)
+    set_span_attributes(**{
+        "llm.model": model or getattr(response, "model", None),
+        "llm.input_tokens": getattr(usage, "input_tokens", None),
+        "llm.output_tokens": getattr(usage, "output_tokens", None),
+        "llm.cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None),
+    })
+
+
+@contextmanager
+def start_span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Open a span as a child of the active one (or as the root of a new trace).
+
+    Exceptions mark the span as failed and propagate. Call ``span.set_error`` to
+    mark a handled failure.
+    """
+    parent = _current_span.get()
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent else None,
+        start_time_ns=time.time_ns(),
+    )
+    span.set_attributes(**attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_time_ns = time.time_ns()
+        if span.status_code == STATUS_UNSET:
+            span.status_code = STATUS_OK
+        get_metrics_collector().record_latency(name, span.duration_seconds,
+                                               success=span.status_code != STATUS_ERROR)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(span)
+
+
+# Reading traces back for the dashboard
+
+def _read_tail(path: Path, max_bytes: int) -> List[str]:
+    if not path.exists():
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - max_bytes))
+        data = f.read()
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    # The first line may be cut in half when reading from the middle of the file
+    return lines[1:] if size > max_bytes else lines
+
+
+def _parse_line(line: str) -> List[Dict[str, Any]]:
+    spans = []
+    try:
+        for resource_spans in json.loads(line).get("resourceSpans", []):
+            for scope_spans in resource_spans.get("scopeSpans", []):
+                for span in scope_spans.get("spans", []):
+                    spans.append({
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_span_id": span.get("parentSpanId"),
+                        "name": span["name"],
+                        "start_ns": int(span["startTimeUnixNano"]),
+                        "end_ns": int(span["endTimeUnixNano"]),
+                        "attributes": {item["key"]: _from_otlp_value(item["value"])
+                                       for item in span.get("attributes", [])},
+                        "status": span.get("status", {}).get("code", STATUS_UNSET),
+                        "status_message": span.get("status", {}).get("message", ""),
+                    })
+    except (ValueError, KeyError, TypeError):
+        pass
+    return spans
+
+
+def load_recent_traces(limit: int = 50, path: Optional[Path] = None,
+                       max_bytes: int = 5 * 1024 * 1024) -> List[Dict[str, Any]]:
+    """
+    Read the newest traces from the JSONL file, newest first.
+
+    Only the last max_bytes of the file are parsed. Traces whose root span has
+    not been written yet (still running) are skipped.
+
+    Returns:
+        Dicts with trace_id, root (span dict), spans (sorted by start time) and duration_ms
+    """
+    exporter = get_exporter()
+    if exporter is not None and path is None:
+        exporter.flush()
+    path = Path(path) if path is not None else TRACE_FILE
+
+    by_trace: Dict[str, List[Dict[str, Any]]] = {}
+    for line in _read_tail(path, max_bytes):
+        for span in _parse_line(line):
+            by_trace.setdefault(span["trace_id"], []).append(span)
+
+    traces = []
+    for trace_id, spans in by_trace.items():
+        root = next((span for span in spans if not span["parent_span_id"]), None)
+        if root is None:
+            continue
+        spans.sort(key=lambda span: span["start_ns"])
+        traces.append({
+            "trace_id": trace_id,
+            "root": root,
+            "spans": spans,
+            "duration_ms": (root["end_ns"] - root["start_ns"]) / 1e6,
+        })
+    traces.sort(key=lambda trace: trace["root"]["start_ns"], reverse=True)
+    return traces[:limit]
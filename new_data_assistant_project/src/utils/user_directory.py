@@ -0,0 +1,215 @@
+"""
+Indexed access to the participant list in users.csv.
+
+The CSV file stays the source of truth, but it is parsed once into an in-memory
+hash index keyed by username. Updates are appended as a full row instead of
+rewriting the file, and the latest row for a username wins. Once superseded rows
+outnumber live ones, the file is compacted by writing the live rows to a temporary
+file and swapping it in with os.replace. Appends made by other processes are picked
+up incrementally by checking the file size before each lookup.
+"""
+
+import csv
+import io
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Compact once at least this many rows are superseded (and they outnumber live rows)
+DEFAULT_COMPACT_THRESHOLD = 200
+
+
+@lru_cache(maxsize=None)
+def find_project_root() -> Path:
+    """Locate the new_data_assistant_project directory (computed once per process)."""
+    current_file = Path(__file__).resolve()
+
+    # Find the new_data_assistant_project directory (the actual project)
+    project_root = current_file
+    while project_root.name != 'new_data_assistant_project' and project_root.parent != project_root:
+        project_root = project_root.parent
+
+    # If we didn't find new_data_assistant_project by going up, try workspace root approach
+    if project_root.name != 'new_data_assistant_project':
+        workspace_root = current_file
+        while workspace_root.parent != workspace_root:
+            new_project = workspace_root / 'new_data_assistant_project'
+            if new_project.exists() and (new_project / 'src').exists():
+                project_root = new_project
+                break
+            workspace_root = workspace_root.parent
+
+    # Verify we found the correct project root by checking for src directory
+    if not (project_root / 'src').exists():
+        raise FileNotFoundError(f"Could not find new_data_assistant_project with src/ directory. Current path: {current_file}")
+
+    return project_root
+
+
+class UserDirectory:
+    """Username -> CSV record index with append-only updates and periodic compaction."""
+
+    def __init__(self, csv_path: Path, fieldnames: Sequence[str],
+                 compact_threshold: int = DEFAULT_COMPACT_THRESHOLD):
+        """
+        Args:
+            csv_path: Path to the users CSV file
+            fieldnames: Column order used when the file is (re)written
+            compact_threshold: Minimum number of superseded rows before compacting
+        """
+        self.csv_path = Path(csv_path)
+        self.fieldnames = list(fieldnames)
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict[str, str]] = {}
+        self._header: List[str] = []
+        self._superseded = 0
+        self._offset = 0
+        self._file_id = None
+        self._reload()
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        """Return a copy of the latest record for a username."""
+        with self._lock:
+            self._refresh()
+            record = self._index.get(username)
+            return dict(record) if record is not None else None
+
+    def __contains__(self, username: str) -> bool:
+        return self.get(username) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def upsert(self, record: Dict[str, object]):
+        """Append a full record; it replaces any earlier record for the same username."""
+        with self._lock:
+            self._refresh()
+            if self._header != self.fieldnames:
+                # Older files lack some columns; rewrite once so appended rows line up
+                self.compact()
+
+            row = {name: '' if record.get(name) is None else str(record.get(name)) for name in self.fieldnames}
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=self.fieldnames).writerow(row)
+            data = buffer.getvalue().encode('utf-8')
+            with open(self.csv_path, 'ab') as f:
+                f.write(data)
+
+            if row['username'] in self._index:
+                self._superseded += 1
+            self._index[row['username']] = row
+            self._offset += len(data)
+            self._file_id = self._stat_id()
+
+            if self._superseded >= self.compact_threshold and self._superseded > len(self._index):
+                self.compact()
+
+    def update(self, username: str, **changes) -> bool:
+        """Append an updated copy of an existing record. Returns False if unknown."""
+        with self._lock:
+            record = self.get(username)
+            if record is None:
+                return False
+            record.update(changes)
+            self.upsert(record)
+            return True
+
+    def compact(self):
+        """Rewrite the file with one row per username and swap it in atomically."""
+        with self._lock:
+            tmp_path = self.csv_path.with_name(f"{self.csv_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction='ignore')
+                writer.writeheader()
+                for record in self._index.values():
+                    writer.writerow({name: record.get(name, '') for name in self.fieldnames})
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.csv_path)
+            logger.info(f"Compacted {self.csv_path.name}: dropped {self._superseded} superseded rows")
+            self._reload()
+
+    def _stat_id(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _refresh(self):
+        """Pick up changes made by other processes since the last read."""
+        file_id = self._stat_id()
+        if file_id == self._file_id:
+            return
+        if file_id is None:
+            self._reload()
+        elif self._file_id is not None and file_id[0] == self._file_id[0] and file_id[1] > self._offset:
+            # Same file, only grown: parse just the appended rows
+            self._read_from(self._offset)
+        else:
+            # Replaced (compacted) or truncated by someone else
+            self._reload()
+
+    def _reload(self):
+        self._index = {}
+        self._header = []
+        self._superseded = 0
+        self._offset = 0
+        self._file_id = None
+        if self.csv_path.exists():
+            self._read_from(0)
+
+    def _read_from(self, offset: int):
+        with open(self.csv_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+            file_id = (os.fstat(f.fileno()).st_ino, offset + len(data))
+
+        # Only consume complete lines; a row being appended right now is read next time
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        rows = csv.reader(io.StringIO(data[:end].decode('utf-8'), newline=''))
+        if offset == 0:
+            self._header = next(rows, [])
+        for values in rows:
+            if not values:
+                continue
+            record = dict(zip(self._header, values))
+            username = record.get('username')
+            if not username:
+                continue
+            if username in self._index:
+                self._superseded += 1
+            self._index[username] = record
+
+        self._offset = offset + end
+        self._file_id = file_id if end == len(data) else (file_id[0], self._offset)
+
+
+_directories: Dict[str, UserDirectory] = {}
+_directories_lock = threading.Lock()
+
+
+def get_user_directory(csv_path, fieldnames: Sequence[str]) -> UserDirectory:
+    """Return the shared directory for a CSV file."""
+    key = os.path.abspath(str(csv_path))
+    with _directories_lock:
+        directory = _directories.get(key)
+        if directory is None:
+            directory = UserDirectory(Path(key), fieldnames)
+            _directories[key] = directory
+        return directory
@@ -5,6 +5,12 @@ from datetime import datetime
 from typing import Dict, Optional, List
 from pathlib import Path
 
+# Docker-compatible imports
+try:
+    from new_data_assistant_project.src.utils.user_directory import find_project_root, get_user_directory
+except ImportError:
+    from src.utils.user_directory import find_project_root, get_user_directory
+
 class UserManager:
     """Manages user authentication and profiles."""
     
@@ -23,28 +29,8 @@ class UserManager:
         Args:
             csv_path: Path to users.csv file. If None, uses default path
         """
-        # Get project root directory - handle nested new_data_assistant_project structure
-        current_file = Path(__file__).resolve()
-        
-        # Find the new_data_assistant_project directory (the actual project)
-        project_root = current_file
-        while project_root.name != 'new_data_assistant_project' and project_root.parent != project_root:
-            project_root = project_root.parent
-        
-        # If we didn't find new_data_assistant_project by going up, try workspace root approach
-        if project_root.name != 'new_data_assistant_project':
-            # We might be at workspace root, look for new_data_assistant_project
-            workspace_root = current_file
-            while workspace_root.parent != workspace_root:
-                new_project = workspace_root / 'new_data_assistant_project'
-                if new_project.exists() and (new_project / 'src').exists():
-                    project_root = new_project
-                    break
-                workspace_root = workspace_root.parent
-        
-        # Verify we found the correct project root by checking for src directory
-        if not (project_root / 'src').exists():
-            raise FileNotFoundError(f"Could not find new_data_assistant_project with src/ directory. Current path: {current_file}")
+        # Project root lookup walks the directory tree, so it is cached per process
+        project_root = find_project_root()
         
         # Set default path relative to project root
         default_path = project_root / 'data' / 'user_profiles'
@@ -60,6 +46,7 @@ class UserManager:
             self.csv_path.parent.mkdir(parents=True, exist_ok=True)
         
         self._ensure_csv_exists()
+        self.directory = get_user_directory(self.csv_path, self.CSV_HEADERS)
     
     def _ensure_csv_exists(self):
         """Ensure the users CSV file exists with headers."""
@@ -94,16 +81,17 @@ class UserManager:
         if self.get_user_profile(username):
             return False
         
-        with open(self.csv_path, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                username,
-                self._hash_password(password),
-                email,
-                sql_expertise_level,
-                age, gender, profession, education_level,
-                datetime.now().isoformat()
-            ])
+        self.directory.upsert({
+            'username': username,
+            'password_hash': self._hash_password(password),
+            'email': email,
+            'sql_expertise_level': sql_expertise_level,
+            'age': age,
+            'gender': gender,
+            'profession': profession,
+            'education_level': education_level,
+            'last_login': datetime.now().isoformat()
+        })
         return True
     
     def authenticate_user(self, username: str, password: str) -> bool:
@@ -133,47 +121,25 @@ class UserManager:
         Returns:
             Dict with user data or None if not found
         """
-        if not self.csv_path.exists():
+        row = self.directory.get(username)
+        if row is None:
             return None
         
-        with open(self.csv_path, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['username'] == username:
-                    return {
-                        'username': row['username'],
-                        'password_hash': row['password_hash'],
-                        'email': row['email'],
-                        'sql_expertise_level': int(row['sql_expertise_level']),
-                        'age': int(row.get('age', 25)),
-                        'gender': row.get('gender', 'Not specified'),
-                        'profession': row.get('profession', 'Student'),
-                        'education_level': row.get('education_level', 'Bachelor'),
-                        'last_login': row['last_login']
-                    }
-        return None
+        return {
+            'username': row['username'],
+            'password_hash': row['password_hash'],
+            'email': row['email'],
+            'sql_expertise_level': int(row['sql_expertise_level']),
+            'age': int(row.get('age') or 25),
+            'gender': row.get('gender') or 'Not specified',
+            'profession': row.get('profession') or 'Student',
+            'education_level': row.get('education_level') or 'Bachelor',
+            'last_login': row['last_login']
+        }
     
     def update_last_login(self, username: str):
-        """Update user's last login timestamp."""
-        if not self.csv_path.exists():
-            return
-        
-        rows: List[Dict[str, str]] = []
-        updated = False
-        
-        with open(self.csv_path, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row['username'] == username:
-                    row['last_login'] = datetime.now().isoformat()
-                    updated = True
-                rows.append(row)
-        
-        if updated:
-            with open(self.csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=self.CSV_HEADERS)
-                writer.writeheader()
-                writer.writerows(rows)
+        """Update user's last login timestamp (appended; the file is compacted periodically)."""
+        self.directory.update(username, last_login=datetime.now().isoformat())
     
     def create_test_users(self):
         """Create test users with different expertise levels."""
@@ -0,0 +1,60 @@
+"""Tests for the LLM circuit breaker (src/agents/circuit_breaker.py) as used by LLMClient."""
+
+import time
+
+import anthropic
+import pytest
+
+from new_data_assistant_project.src.agents.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from new_data_assistant_project.src.agents.llm_client import LLMClient
+from new_data_assistant_project.src.utils.deadline import request_deadline
+
+REQUEST = {"model": "test-model", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+
+
+class HangingTransport:
+    """Never answers: waits out the request timeout like the HTTP client would."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(kwargs["timeout"])
+        raise anthropic.APITimeoutError(request=None)
+
+
+def _client(breaker):
+    transport = HangingTransport()
+    client = LLMClient(transport, max_retries=0)
+    client.breaker = breaker
+    return client, transport
+
+
+def test_deadline_bounded_timeouts_open_the_circuit():
+    # The deadline timeout (0.2s) is far below slow_call_seconds, as in the default configuration
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=30, cooldown_seconds=60,
+                             enabled=True, min_timeout_seconds=0.1)
+    client, transport = _client(breaker)
+
+    for _ in range(2):
+        with request_deadline(0.2), pytest.raises(anthropic.APITimeoutError):
+            client.create("sql_generation", **REQUEST)
+
+    assert breaker.state == OPEN
+    with request_deadline(0.2), pytest.raises(CircuitOpenError):
+        client.create("sql_generation", **REQUEST)
+    assert transport.calls == 2
+
+
+def test_short_deadline_timeouts_are_neutral():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=30, cooldown_seconds=60,
+                             enabled=True, min_timeout_seconds=5)
+    client, _ = _client(breaker)
+
+    for _ in range(3):
+        with request_deadline(0.05), pytest.raises(anthropic.APITimeoutError):
+            client.create("sql_generation", **REQUEST)
+
+    assert breaker.stats()["consecutive_failures"] == 0
+    assert breaker.state != OPEN
@@ -0,0 +1,41 @@
+"""Tests for the question/SQL cache used while the LLM is unavailable (src/agents/sql_cache.py)."""
+
+import pytest
+
+from new_data_assistant_project.src.agents import sql_cache
+from new_data_assistant_project.src.agents.sql_cache import cache_sql, get_cached_sql
+from new_data_assistant_project.src.database.models import ChatSession
+from new_data_assistant_project.src.database.schema import create_tables
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(sql_cache, "_cache", sql_cache.OrderedDict())
+    path = str(tmp_path / "app.db")
+    create_tables(path)
+    return path
+
+
+def _ask(db_path, question, sql_query):
+    ChatSession.create_session(1, question, "answer", sql_query=sql_query).save(db_path)
+
+
+def test_only_read_only_sql_is_cached(db_path):
+    cache_sql("How many users?", "SELECT COUNT(*) FROM users", db_path)
+    cache_sql("Remove all users", "DELETE FROM users", db_path)
+
+    assert get_cached_sql("how many users?", db_path) == "SELECT COUNT(*) FROM users"
+    assert get_cached_sql("Remove all users", db_path) is None
+
+
+def test_history_fallback_skips_statements_that_write(db_path):
+    _ask(db_path, "Show users", "SELECT username FROM users")
+    _ask(db_path, "Show users", "DROP TABLE users")
+
+    assert get_cached_sql("Show users", db_path) == "SELECT username FROM users"
+
+
+def test_history_fallback_without_read_only_sql(db_path):
+    _ask(db_path, "Clean up", "DELETE FROM chat_sessions")
+
+    assert get_cached_sql("Clean up", db_path) is None
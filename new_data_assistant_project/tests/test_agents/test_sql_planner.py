@@ -0,0 +1,96 @@
+"""Tests for ranking SQL candidates by query-plan cost (src/agents/sql_planner.py)."""
+
+import sqlite3
+
+import pytest
+
+from new_data_assistant_project.src.agents import sql_planner
+from new_data_assistant_project.src.agents.sql_planner import choose_candidate, query_limit
+
+ROWS = 5000
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "orders.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, sales REAL)")
+    conn.executemany("INSERT INTO orders (region, sales) VALUES (?, ?)",
+                     [(f"region {i % 4}", float(i)) for i in range(ROWS)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _row_count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("statement", [
+    "DROP TABLE orders",
+    "DELETE FROM orders",
+    "UPDATE orders SET sales = 0",
+    "INSERT INTO orders (region, sales) VALUES ('x', 1)",
+    "PRAGMA table_info(orders)",
+])
+def test_write_candidate_is_never_chosen(db_path, statement):
+    best, plans = choose_candidate(db_path, [
+        "SELECT region, SUM(sales) FROM orders GROUP BY region",
+        statement,
+    ])
+
+    assert best is not None and best.index == 0
+    assert not plans[1].valid and not plans[1].read_only
+    assert plans[1].error.startswith("Not ranked")
+    assert _row_count(db_path) == ROWS  # planning never runs a candidate
+
+
+def test_only_write_candidates_leaves_choice_to_caller(db_path):
+    best, plans = choose_candidate(db_path, ["DELETE FROM orders", "DROP TABLE orders"])
+
+    assert best is None
+    assert not any(plan.valid for plan in plans)
+
+
+def test_limit_is_costed_below_a_full_scan(db_path):
+    best, plans = choose_candidate(db_path, [
+        "SELECT sales FROM orders",
+        "SELECT sales FROM orders LIMIT 1",
+        "SELECT sales FROM orders ORDER BY sales LIMIT 1",
+    ])
+
+    full_scan, limited, sorted_limited = plans
+    assert full_scan.cost == ROWS
+    assert limited.cost < 10
+    assert sorted_limited.cost > ROWS  # every row is read before the sort
+    assert best.index == 1
+
+
+@pytest.mark.parametrize("sql_query, expected", [
+    ("SELECT * FROM orders LIMIT 10", 10),
+    ("SELECT * FROM orders LIMIT 10 OFFSET 20;", 30),
+    ("SELECT * FROM orders LIMIT 20, 10", 30),
+    ("SELECT COUNT(*) FROM orders LIMIT 1", None),
+    ("SELECT * FROM orders WHERE id IN (SELECT id FROM orders LIMIT 1)", None),
+])
+def test_query_limit(sql_query, expected):
+    assert query_limit(sql_query) == expected
+
+
+def test_row_counts_are_recounted_after_ttl(db_path, monkeypatch):
+    conn = sqlite3.connect(db_path)
+    try:
+        assert sql_planner.table_row_counts(db_path, conn)["orders"] == ROWS
+        conn.execute("DELETE FROM orders WHERE id > 10")
+        conn.commit()
+        assert sql_planner.table_row_counts(db_path, conn)["orders"] == ROWS  # still cached
+
+        monkeypatch.setattr(sql_planner, "ROW_COUNT_TTL", 0)
+
+        assert sql_planner.table_row_counts(db_path, conn)["orders"] == 10
+    finally:
+        conn.close()
@@ -0,0 +1,85 @@
+"""Tests for the versioned profile store (src/database/profile_store.py)."""
+
+from dataclasses import dataclass, field
+from typing import List
+
+import pytest
+
+from new_data_assistant_project.src.database import profile_store
+from new_data_assistant_project.src.database.profile_store import ProfileStore
+
+
+@dataclass
+class Profile:
+    user_id: str
+    level: int = 1
+    history: List[str] = field(default_factory=list)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # Cached copies are trusted until they are explicitly out of date
+    monkeypatch.setattr(profile_store, "REVALIDATE_SECONDS", 3600)
+    return str(tmp_path / "app.db")
+
+
+def test_stale_worker_does_not_overwrite_newer_save(db_path):
+    worker_a = ProfileStore(db_path, Profile)
+    worker_b = ProfileStore(db_path, Profile)
+    worker_a["u1"] = Profile("u1")
+    stale = worker_b["u1"]
+
+    fresh = worker_a["u1"]
+    fresh.level = 3
+    assert worker_a.save("u1", fresh)
+
+    stale.history.append("b")
+    assert not worker_b.save("u1", stale)
+    assert worker_b["u1"].level == 3  # reloaded instead of the stale copy
+    assert ProfileStore(db_path, Profile)["u1"] == Profile("u1", level=3)
+
+
+def test_update_reapplies_change_to_newer_version(db_path):
+    worker_a = ProfileStore(db_path, Profile)
+    worker_b = ProfileStore(db_path, Profile)
+    worker_a["u1"] = Profile("u1")
+    worker_b["u1"]  # cached by worker b
+
+    worker_a.update("u1", lambda profile: profile.history.append("a"))
+    worker_b.update("u1", lambda profile: profile.history.append("b"))
+
+    assert ProfileStore(db_path, Profile)["u1"].history == ["a", "b"]
+
+
+def test_stale_cache_is_revalidated(db_path, monkeypatch):
+    worker_a = ProfileStore(db_path, Profile)
+    worker_b = ProfileStore(db_path, Profile)
+    worker_a["u1"] = Profile("u1")
+    worker_b["u1"]
+    worker_a.update("u1", lambda profile: setattr(profile, "level", 2))
+
+    monkeypatch.setattr(profile_store, "REVALIDATE_SECONDS", 0)
+
+    assert worker_b["u1"].level == 2
+
+
+def test_save_writes_evicted_profile(db_path):
+    store = ProfileStore(db_path, Profile, cache_size=1)
+    store["u1"] = Profile("u1")
+    profile = store["u1"]
+    store["u2"] = Profile("u2")  # evicts u1
+
+    profile.level = 4
+    assert store.save("u1", profile)
+    assert ProfileStore(db_path, Profile)["u1"].level == 4
+    assert [entry["reason"] for entry in store.history("u1")] == ["update", "create"]
+
+
+def test_create_keeps_profile_created_by_another_worker(db_path):
+    worker_a = ProfileStore(db_path, Profile)
+    worker_b = ProfileStore(db_path, Profile)
+    worker_a["u1"] = Profile("u1", level=5)
+
+    worker_b["u1"] = Profile("u1")
+
+    assert worker_b["u1"].level == 5
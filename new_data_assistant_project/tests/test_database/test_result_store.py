@@ -0,0 +1,63 @@
+"""Tests for pruning stored result sets (src/database/result_store.py)."""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from new_data_assistant_project.src.database import result_store
+from new_data_assistant_project.src.database.models import ChatSession
+from new_data_assistant_project.src.database.result_store import load_result, store_result
+from new_data_assistant_project.src.database.schema import create_tables
+from new_data_assistant_project.src.database.write_behind import flush_pending_writes
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    create_tables(path)
+    monkeypatch.setattr(result_store, "PRUNE_GRACE_SECONDS", 0)
+    return path
+
+
+def _age_results(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE query_results SET created_at = datetime('now', '-1 hour')")
+    conn.commit()
+    conn.close()
+
+
+def _result_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT id FROM query_results")}
+    finally:
+        conn.close()
+
+
+def _session(db_path, user_id, result):
+    ChatSession.create_session(user_id, "question", "answer", result_id=result.id if result else None).save(db_path)
+
+
+def test_clearing_chat_keeps_other_users_results(db_path):
+    own = store_result(db_path, pd.DataFrame({"a": [1]}))
+    shared = store_result(db_path, pd.DataFrame({"a": [2]}))
+    _session(db_path, 1, own)
+    _session(db_path, 1, shared)
+    _session(db_path, 2, shared)
+    # Another user's result whose chat session is not written yet
+    unsaved = store_result(db_path, pd.DataFrame({"a": [3]}))
+    flush_pending_writes(db_path)
+    _age_results(db_path)
+
+    ChatSession.delete_user_sessions(db_path, 1)
+
+    assert _result_ids(db_path) == {shared.id, unsaved.id}
+
+
+def test_prune_keeps_fresh_results(db_path, monkeypatch):
+    monkeypatch.setattr(result_store, "PRUNE_GRACE_SECONDS", 600)
+    fresh = store_result(db_path, pd.DataFrame({"a": [1]}))
+
+    assert result_store.prune_unreferenced_results(db_path) == 0
+    assert load_result(db_path, fresh.id) is not None
@@ -0,0 +1,108 @@
+"""Tests for the write-behind buffer (src/database/write_behind.py)."""
+
+import sqlite3
+
+import pytest
+
+from new_data_assistant_project.src.database import write_behind
+from new_data_assistant_project.src.database.write_behind import (
+    WriteBehindBuffer, buffered_write, flush_pending_writes, get_write_buffer
+)
+
+INSERT = "INSERT INTO notes (text) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "app.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, text TEXT NOT NULL UNIQUE)")
+    conn.commit()
+    conn.close()
+    yield path
+    buffer = write_behind._buffers.pop(write_behind._buffer_key(path), None)
+    if buffer is not None:
+        buffer.close()
+
+
+@pytest.fixture
+def buffer(db_path):
+    # A long interval, so only urgent writes, flushes and close() commit anything
+    buffer = WriteBehindBuffer(db_path, flush_interval=60)
+    yield buffer
+    buffer.close()
+
+
+def _texts(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT text FROM notes ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_buffered_write_returns_row_ids(db_path):
+    first = buffered_write(db_path, INSERT, ("a",))
+    second = buffered_write(db_path, INSERT, ("b",), wait=False)
+
+    assert first.done() and first.result() == 1
+    assert second.result(5) == 2
+
+
+def test_flush_makes_writes_readable(db_path):
+    for text in ("a", "b", "c"):
+        buffered_write(db_path, INSERT, (text,), wait=False)
+
+    flush_pending_writes(db_path)
+
+    assert _texts(db_path) == ["a", "b", "c"]
+
+
+def test_failing_statement_does_not_poison_its_batch(buffer, db_path):
+    good = buffer.submit(INSERT, ("a",))
+    duplicate = buffer.submit(INSERT, ("a",))
+    also_good = buffer.submit(INSERT, ("b",))
+    buffer.flush(5)
+
+    assert good.result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result()
+    assert also_good.result() is not None
+    assert _texts(db_path) == ["a", "b"]
+
+
+def test_close_drains_the_queue(buffer, db_path):
+    pending = [buffer.submit(INSERT, (str(i),)) for i in range(50)]
+
+    buffer.close()
+
+    assert all(write.done() for write in pending)
+    assert len(_texts(db_path)) == 50
+
+
+def test_submit_after_writer_died_writes_through(buffer, db_path):
+    def crash(conn, batch):
+        raise RuntimeError("disk on fire")
+
+    buffer._write_batch = crash
+    lost = buffer.submit(INSERT, ("lost",), urgent=True)
+    with pytest.raises(RuntimeError, match="disk on fire"):
+        lost.result(5)
+
+    later = buffer.submit(INSERT, ("later",))
+
+    assert later.done()  # written synchronously, no writer to wait for
+    assert later.result(0) is not None
+    assert _texts(db_path) == ["later"]
+    buffer.flush(1)  # returns at once instead of waiting on the dead writer
+
+
+def test_unopenable_database_fails_writes_instead_of_hanging(tmp_path):
+    buffer = get_write_buffer(str(tmp_path))  # a directory cannot be opened as a database
+    try:
+        pending = buffer.submit(INSERT, ("a",), urgent=True)
+        with pytest.raises(sqlite3.Error):
+            pending.result(5)
+    finally:
+        write_behind._buffers.pop(write_behind._buffer_key(str(tmp_path)), None)
+        buffer.close()